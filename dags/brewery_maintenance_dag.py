@@ -0,0 +1,77 @@
+# Bibliotecas
+from datetime import timedelta
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+from airflow.utils.dates import days_ago
+from airflow.utils.log.logging_mixin import LoggingMixin
+logger = LoggingMixin().log
+
+
+# TAREFA DE MANUTENÇÃO DO BANCO DE MÉTRICAS
+# rollups diários -> downsampling do bruto -> expiração do tier horário -> VACUUM
+def metrics_maintenance(**context):
+    from src.monitoring.metrics_retention import run_maintenance
+
+    result = run_maintenance()
+    logger.info(f"[METRICS MAINTENANCE] {result}")
+    return result
+
+
+# TAREFA DE MANUTENÇÃO DAS PARTIÇÕES DE AUDITORIA
+# cria as partições mensais futuras de audit.task_events e aplica a retenção
+def audit_partitions_maintenance(**context):
+    from src.monitoring.audit_store import ensure_task_event_partitions, drop_old_task_event_partitions
+
+    result = {
+        "partitions_created": ensure_task_event_partitions(),
+        "partitions_dropped": drop_old_task_event_partitions(),
+    }
+    logger.info(f"[AUDIT MAINTENANCE] {result}")
+    return result
+
+
+# TAREFA DE RETENÇÃO DOS MANIFESTOS DE EXECUÇÃO (datalake/_manifests)
+def run_manifests_maintenance(**context):
+    from src.monitoring.run_manifest import purge_run_manifests
+
+    result = {"manifests_removed": purge_run_manifests()}
+    logger.info(f"[MANIFEST MAINTENANCE] {result}")
+    return result
+
+
+# CONFIGURAÇÕES PADRÃO
+default_args = {
+    "owner": "data-engineering",
+    "depends_on_past": False,
+    "retries": 1,
+    "retry_delay": timedelta(minutes=5),
+    "email_on_failure": False,
+    "email_on_retry": False,
+}
+
+# DEFINIÇÃO DA DAG
+with DAG(
+    dag_id="brewery_datalake_maintenance",
+    default_args=default_args,
+    description="Manutenção periódica: retenção do banco de métricas, das partições de auditoria e dos manifestos de execução",
+    schedule="0 3 * * 0",  # todo domingo às 03:00
+    start_date=days_ago(1),
+    catchup=False,
+    max_active_runs=1,
+    tags=["brewery", "maintenance"],
+) as dag:
+
+    metrics_task = PythonOperator(
+        task_id="metrics_retention",
+        python_callable=metrics_maintenance,
+    )
+
+    audit_partitions_task = PythonOperator(
+        task_id="audit_partitions",
+        python_callable=audit_partitions_maintenance,
+    )
+
+    run_manifests_task = PythonOperator(
+        task_id="run_manifests_retention",
+        python_callable=run_manifests_maintenance,
+    )
@@ -1,7 +1,7 @@
 # Bibliotecas
 import os
 import socket
-import requests
+from contextlib import contextmanager
 from datetime import timedelta
 from airflow import DAG
 from airflow.operators.python import PythonOperator
@@ -14,14 +14,18 @@ from airflow.utils.log.logging_mixin import LoggingMixin
 logger = LoggingMixin().log
 
 
-# Imports dos scripts
-from src.ingestion.extract_api import extract_breweries
-from src.transformation.silver_transform import transform_to_silver
-from src.transformation.gold_transform import transform_to_gold
-from src.monitoring.audit_store import upsert_dag_run, insert_task_event
+# Imports dos scripts: feitos dentro das funções das tasks. O scheduler reprocessa
+# este arquivo a cada loop de parse, então o topo do módulo só importa Airflow
+# (nada de pandas/pyarrow/psycopg2/requests nem consultas a Variables/.env).
+# Benchmark: `make bench-dag-parse`.
 
-# Definição de variaveis
-ALERT_EMAIL = Variable.get("ALERT_EMAIL", default_var="fallback@email.com")
+# E-mail de alerta: resolvido só na execução (Variable.get no topo consultaria o
+# banco de metadados a cada parse). No EmailOperator vai como template Jinja.
+ALERT_EMAIL_DEFAULT = "fallback@email.com"
+ALERT_EMAIL_TEMPLATE = "{{ var.value.get('ALERT_EMAIL', '" + ALERT_EMAIL_DEFAULT + "') }}"
+
+def _alert_email():
+    return Variable.get("ALERT_EMAIL", default_var=ALERT_EMAIL_DEFAULT)
 
 # Função para converter um datetime para string ISO
 def _iso(dt):
@@ -45,13 +49,26 @@ def notify_failure(context):
     <b>Exception:</b><br>
     <pre>{context.get("exception")}</pre>
     """
-    send_email(ALERT_EMAIL, subject, body)
+    send_email(_alert_email(), subject, body)
+
+# Função para gravar dados na tabela audit.task_events.
+# Com `buffer`, o evento é acumulado e gravado junto com os demais no flush do buffer.
+# Com AUDIT_ASYNC=true (padrão) a gravação é feita em background pelo audit_emitter;
+# eventos finais (success/failed) esperam a entrega por até AUDIT_FLUSH_TIMEOUT segundos
+# e o que não for entregue fica no spool local.
+def _audit_task_event(context, status="started", message=None, metrics=None, buffer=None):
+    from src.monitoring.audit_store import insert_task_event
+    from src.monitoring.audit_emitter import audit_async_enabled, get_audit_emitter, flush_audit
 
-# Função para gravar dados na tabela audit.task_events
-def _audit_task_event(context, status="started", message=None, metrics=None):
     ti = context["task_instance"]
     execution_date = context.get("logical_date") or context.get("execution_date")
-    insert_task_event(
+    if buffer is not None:
+        write = buffer.add
+    elif audit_async_enabled():
+        write = get_audit_emitter().emit_task_event
+    else:
+        write = insert_task_event
+    write(
         dag_id=ti.dag_id,
         run_id=ti.run_id,
         task_id=ti.task_id,
@@ -63,9 +80,28 @@ def _audit_task_event(context, status="started", message=None, metrics=None):
         log_url=ti.log_url,
         execution_date=execution_date,
     )
+    if buffer is None and status in ("success", "failed"):
+        flush_audit()
+
+# Eventos de auditoria de uma task: acumulados e entregues juntos na saída do bloco
+# (também em caso de falha), seguidos do flush do emissor assíncrono
+@contextmanager
+def _task_audit():
+    from src.monitoring.audit_store import AuditEventBuffer
+    from src.monitoring.audit_emitter import audit_async_enabled, get_audit_emitter, flush_audit
+
+    sink = get_audit_emitter().emit_task_events if audit_async_enabled() else None
+    try:
+        with AuditEventBuffer(sink=sink) as audit_events:
+            yield audit_events
+    finally:
+        flush_audit()
 
 # Função para gravar dados na tabela audit.dag_runs
 def _audit_dag_upsert(context, status, metrics=None, error=None):
+    from src.monitoring.audit_store import upsert_dag_run
+    from src.monitoring.audit_emitter import audit_async_enabled, get_audit_emitter, flush_audit
+
     dag_run = context.get("dag_run")
     if not dag_run:
         return
@@ -74,7 +110,8 @@ def _audit_dag_upsert(context, status, metrics=None, error=None):
     if dag_run.start_date and dag_run.end_date:
         duration = (dag_run.end_date - dag_run.start_date).total_seconds()
 
-    upsert_dag_run(
+    write = get_audit_emitter().emit_dag_run if audit_async_enabled() else upsert_dag_run
+    write(
         dag_id=dag_run.dag_id,
         run_id=dag_run.run_id,
         status=status,
@@ -88,9 +125,20 @@ def _audit_dag_upsert(context, status, metrics=None, error=None):
         metrics=metrics or {},
         error=error,
     )
+    flush_audit()
+
+# Grava o resultado completo da etapa no manifesto da execução (datalake/_manifests)
+# e devolve só o resumo com a referência, que é o que vai para o XCom
+def _publish_result(context, stage, result):
+    from src.monitoring.run_manifest import publish_stage_result
+
+    ti = context["task_instance"]
+    return publish_stage_result(ti.dag_id, ti.run_id, stage, result)
 
 # Função para testar disponibilidade da API
 def check_api_health(**context):
+    import requests
+
     _audit_task_event(context, status="started")
 
     api_url = os.getenv('URL_API', "https://api.openbrewerydb.org/v1/breweries?per_page=200")
@@ -188,12 +236,16 @@ def _parse_duration_to_seconds(duration_str: str) -> float:
 
 
 def quality_checks(**context):
+    from src.monitoring.perf_regression import check_regressions, current_values, describe_regression
+    from src.monitoring.run_manifest import lazy_result
+
     thresholds = Variable.get("QUALITY_THRESHOLDS", default_var="{}", deserialize_json=True)
     ti = context["ti"]
 
-    bronze = ti.xcom_pull(task_ids="bronze_ingestion")
-    silver = ti.xcom_pull(task_ids="silver_transformation")
-    gold = ti.xcom_pull(task_ids="gold_transformation")
+    # resumos do XCom; campos fora do resumo carregam o manifesto da etapa sob demanda
+    bronze = lazy_result(ti.xcom_pull(task_ids="bronze_ingestion"))
+    silver = lazy_result(ti.xcom_pull(task_ids="silver_transformation"))
+    gold = lazy_result(ti.xcom_pull(task_ids="gold_transformation"))
 
     # Se algo anterior falhou, aqui a DAG nem deveria chegar,
     # mas mantemos proteção pra mensagens melhores.
@@ -215,8 +267,9 @@ def quality_checks(**context):
 
     # Schema flags
     schema_changed = bool(silver.get("schema_changed", False))
-    schema_missing_cols = silver.get("schema_missing_cols") or []
-    schema_extra_cols = silver.get("schema_extra_cols") or []
+    # listas de colunas só existem no manifesto: lidas apenas quando o schema mudou
+    schema_missing_cols = (silver.get("schema_missing_cols") or []) if schema_changed else []
+    schema_extra_cols = (silver.get("schema_extra_cols") or []) if schema_changed else []
 
     violations = []
 
@@ -248,13 +301,19 @@ def quality_checks(**context):
     if invalid_brewery_type > max_invalid_brewery_type:
         violations.append(f"brewery_type inválido alto: {invalid_brewery_type:.2f}% > {max_invalid_brewery_type:.2f}%")
 
+    # Quase duplicados (entity resolution) - só valida se o limite estiver configurado
+    max_fuzzy_dup = thresholds.get("max_fuzzy_duplicate_pct")
+    fuzzy_duplicate_pct = float(silver.get("fuzzy_duplicate_pct", 0.0))
+    if max_fuzzy_dup is not None and fuzzy_duplicate_pct > float(max_fuzzy_dup):
+        violations.append(f"Quase duplicados alto: {fuzzy_duplicate_pct:.2f}% > {float(max_fuzzy_dup):.2f}%")
+
     # Tempo execução
     max_dur = float(thresholds.get("max_duration_seconds", 180))
     if silver_duration_sec > max_dur:
         violations.append(f"Duração acima: {silver_duration_sec:.2f}s > {max_dur:.2f}s")
 
     min_dur = float(thresholds.get("min_duration_seconds", 0.1)) 
-    if silver_duration_sec < min_dur: 
+    if silver_duration_sec < min_dur and not silver.get("skipped"):
         logger.warning(f"Duração abaixo: {silver_duration_sec:.2f}s < {min_dur:.2f}s (suspeito)")
 
     # Schema regression/change (configurável)
@@ -267,6 +326,33 @@ def quality_checks(**context):
     if schema_extra_cols and fail_on_schema_extra:
         violations.append(f"Schema change (colunas novas): {schema_extra_cols}")
 
+    # Regressão de performance: compara cada etapa com a mediana/MAD das últimas N execuções
+    # perf_regression_mode: "warn" (padrão, só loga), "fail" (vira violação) ou "off"
+    perf_mode = str(thresholds.get("perf_regression_mode", "warn")).lower()
+    perf = {"regressions": [], "checked": [], "skipped": [], "slowed_stages": []}
+    if perf_mode != "off":
+        try:
+            perf = check_regressions(
+                current_values(bronze, silver, gold),
+                last_n=int(thresholds.get("perf_baseline_runs", 20)),
+                factor=float(thresholds.get("perf_mad_factor", 3.0)),
+                min_relative_change=float(thresholds.get("perf_min_relative_change", 0.25)),
+                min_history=int(thresholds.get("perf_min_history", 5)),
+                exclude_run_ids={
+                    "bronze": bronze.get("run_id"),
+                    "silver": silver.get("run_id"),
+                    "gold": gold.get("run_id"),
+                },
+            )
+        except Exception as e:
+            logger.warning(f"[PERF] Falha ao calcular baselines de performance: {e}")
+
+    for entry in perf["regressions"]:
+        if perf_mode == "fail":
+            violations.append(describe_regression(entry))
+        else:
+            logger.warning(f"[PERF] {describe_regression(entry)}")
+
     # Resultado
     if violations:
         msg = "QUALITY CHECK FAILED:\n- " + "\n- ".join(violations)
@@ -281,6 +367,8 @@ def quality_checks(**context):
         "schema_changed": schema_changed,
         "schema_missing_cols": schema_missing_cols,
         "schema_extra_cols": schema_extra_cols,
+        "perf_regressions": perf["regressions"],
+        "slowed_stages": perf["slowed_stages"],
         "violations": [],
     }
 
@@ -304,20 +392,31 @@ with DAG(
 
     # TASK 1 — INGESTÃO (BRONZE)
     def ingestion_task(**context):
+        from src.ingestion.extract_api import extract_breweries
+        from src.monitoring.metrics_client import flush_metrics
+        from src.utils_log import flush_logs
+
         _audit_task_event(context, status="started")
 
-        execution_date = context["ds"]
-        result = extract_breweries(per_page=200, max_pages=500, execution_date=execution_date)
+        # métricas e status final vão para o Postgres em um único comando no fim da task (ou na falha)
+        with _task_audit() as audit_events:
+            execution_date = context["ds"]
+            result = extract_breweries(per_page=200, max_pages=500, execution_date=execution_date)
+            # garante a gravação das métricas enfileiradas (METRICS_ASYNC) antes do fim da task
+            flush_metrics()
+            flush_logs()
 
-        # grava métricas retornadas pelo script
-        _audit_task_event(context, status="metrics", metrics=result)
+            # resultado completo no manifesto; XCom e auditoria recebem o resumo
+            summary = _publish_result(context, "bronze", result)
+            _audit_task_event(context, status="metrics", metrics=summary, buffer=audit_events)
 
-        if not result["success"]:
-            _audit_task_event(context, status="failed", message=result.get("error", "Falha na ingestão Bronze"), metrics=result)
-            raise Exception("Falha na ingestão Bronze")
+            if not result["success"]:
+                _audit_task_event(context, status="failed", message=result.get("error", "Falha na ingestão Bronze"), metrics=result, buffer=audit_events)
+                raise Exception("Falha na ingestão Bronze")
 
-        _audit_task_event(context, status="success")
-        return result
+            _audit_task_event(context, status="success", buffer=audit_events)
+
+        return summary
 
     ingest = PythonOperator(
         task_id="bronze_ingestion",
@@ -328,19 +427,34 @@ with DAG(
 
     # TASK 2 — TRANSFORMAÇÃO SILVER
     def silver_task(**context):
+        from src.transformation.silver_transform import transform_to_silver
+        from src.monitoring.metrics_client import flush_metrics
+        from src.utils_log import flush_logs
+
         _audit_task_event(context, status="started")
 
-        execution_date = context["ds"]
-        result = transform_to_silver(execution_date=execution_date)
+        # métricas e status final vão para o Postgres em um único comando no fim da task (ou na falha)
+        with _task_audit() as audit_events:
+            execution_date = context["ds"]
+            result = transform_to_silver(execution_date=execution_date)
+            # garante a gravação das métricas enfileiradas (METRICS_ASYNC) antes do fim da task
+            flush_metrics()
+            flush_logs()
 
-        _audit_task_event(context, status="metrics", metrics=result)
+            summary = _publish_result(context, "silver", result)
+            _audit_task_event(context, status="metrics", metrics=summary, buffer=audit_events)
 
-        if not result.get("success"):
-            _audit_task_event(context, status="failed", message=result.get("error", "Erro na Silver"), metrics=result)
-            raise Exception(result.get("error", "Erro na Silver"))
+            if not result.get("success"):
+                _audit_task_event(context, status="failed", message=result.get("error", "Erro na Silver"), metrics=result, buffer=audit_events)
+                raise Exception(result.get("error", "Erro na Silver"))
 
-        _audit_task_event(context, status="success")
-        return result
+            # entrada inalterada desde o último sucesso: saída anterior reaproveitada
+            if result.get("skipped"):
+                _audit_task_event(context, status="skipped", message=f"Silver pulada: entrada inalterada desde {result.get('reused_from')}", metrics={"fingerprint": result.get("fingerprint")}, buffer=audit_events)
+
+            _audit_task_event(context, status="success", buffer=audit_events)
+
+        return summary
 
     silver = PythonOperator(
         task_id="silver_transformation",
@@ -351,19 +465,34 @@ with DAG(
 
     # TASK 3 — TRANSFORMAÇÃO GOLD
     def gold_task(**context):
+        from src.transformation.gold_transform import transform_to_gold
+        from src.monitoring.metrics_client import flush_metrics
+        from src.utils_log import flush_logs
+
         _audit_task_event(context, status="started")
 
-        execution_date = context["ds"]
-        result = transform_to_gold(execution_date=execution_date)
+        # métricas e status final vão para o Postgres em um único comando no fim da task (ou na falha)
+        with _task_audit() as audit_events:
+            execution_date = context["ds"]
+            result = transform_to_gold(execution_date=execution_date)
+            # garante a gravação das métricas enfileiradas (METRICS_ASYNC) antes do fim da task
+            flush_metrics()
+            flush_logs()
 
-        _audit_task_event(context, status="metrics", metrics=result)
+            summary = _publish_result(context, "gold", result)
+            _audit_task_event(context, status="metrics", metrics=summary, buffer=audit_events)
 
-        if not result.get("success"):
-            _audit_task_event(context, status="failed", message=result.get("error", "Erro na Gold"), metrics=result)
-            raise Exception(result.get("error", "Erro na Gold"))
+            if not result.get("success"):
+                _audit_task_event(context, status="failed", message=result.get("error", "Erro na Gold"), metrics=result, buffer=audit_events)
+                raise Exception(result.get("error", "Erro na Gold"))
 
-        _audit_task_event(context, status="success")
-        return result
+            # entrada inalterada desde o último sucesso: saída anterior reaproveitada
+            if result.get("skipped"):
+                _audit_task_event(context, status="skipped", message=f"Gold pulada: entrada inalterada desde {result.get('reused_from')}", metrics={"fingerprint": result.get("fingerprint")}, buffer=audit_events)
+
+            _audit_task_event(context, status="success", buffer=audit_events)
+
+        return summary
 
     gold = PythonOperator(
         task_id="gold_transformation",
@@ -371,6 +500,39 @@ with DAG(
         provide_context=True,
     )
 
+    # TASK 3.1 — SÉRIES TEMPORAIS GOLD (todas as partições Silver, incremental)
+    def gold_timeseries_task(**context):
+        from src.transformation.gold_timeseries import build_gold_timeseries
+        from src.monitoring.metrics_client import flush_metrics
+        from src.utils_log import flush_logs
+
+        _audit_task_event(context, status="started")
+
+        # métricas e status final vão para o Postgres em um único comando no fim da task (ou na falha)
+        with _task_audit() as audit_events:
+            execution_date = context["ds"]
+            result = build_gold_timeseries(execution_date=execution_date)
+            # garante a gravação das métricas enfileiradas (METRICS_ASYNC) antes do fim da task
+            flush_metrics()
+            flush_logs()
+
+            summary = _publish_result(context, "gold_timeseries", result)
+            _audit_task_event(context, status="metrics", metrics=summary, buffer=audit_events)
+
+            if not result.get("success"):
+                _audit_task_event(context, status="failed", message=result.get("error", "Erro nas séries Gold"), metrics=result, buffer=audit_events)
+                raise Exception(result.get("error", "Erro nas séries Gold"))
+
+            _audit_task_event(context, status="success", buffer=audit_events)
+
+        return summary
+
+    gold_ts = PythonOperator(
+        task_id="gold_timeseries",
+        python_callable=gold_timeseries_task,
+        provide_context=True,
+    )
+
     # TASK 4 — QUALITY CHECKS
     quality = PythonOperator(
         task_id="quality_checks",
@@ -379,31 +541,90 @@ with DAG(
     )
 
 
-    # TASK 5 — TESTES AUTOMATIZADOS (pytest)
+    # TASK 4.1 — CONTRATO DE DADOS (schemas, chaves e reconciliação Gold x Silver nos arquivos)
+    # roda em paralelo com os quality checks
+    def data_contract_task(**context):
+        from src.quality.data_contract import validate_data_contract
+        from src.monitoring.metrics_client import flush_metrics
+        from src.utils_log import flush_logs
+
+        _audit_task_event(context, status="started")
+
+        with _task_audit() as audit_events:
+            result = validate_data_contract(execution_date=context["ds"])
+            flush_metrics()
+            flush_logs()
+
+            if not result["success"]:
+                msg = "DATA CONTRACT FAILED:\n- " + "\n- ".join(result["violations"])
+                _audit_task_event(context, status="failed", message=msg, metrics=result, buffer=audit_events)
+                raise Exception(msg)
+
+            _audit_task_event(context, status="success", metrics=result, buffer=audit_events)
+
+        return result
+
+    data_contract = PythonOperator(
+        task_id="data_contract",
+        python_callable=data_contract_task,
+        provide_context=True,
+    )
+
+
+    # TASK 5 — TESTES AUTOMATIZADOS (pytest) — ramo opcional, fora do caminho crítico
+    # Só roda com a Variable RUN_UNIT_TESTS_IN_PIPELINE=true (os testes são de código:
+    # o lugar deles é o CI) e nunca com a Gold pulada (skip-if-unchanged).
     run_tests = BashOperator(
         task_id="run_unit_tests",
-        bash_command="pytest /opt/airflow/tests/ --maxfail=1 --disable-warnings",
+        bash_command=(
+            "{% if var.value.get('RUN_UNIT_TESTS_IN_PIPELINE', 'false') | lower != 'true' %}"
+            "echo 'RUN_UNIT_TESTS_IN_PIPELINE desligado: testes pulados'"
+            "{% elif (ti.xcom_pull(task_ids='gold_transformation') or {}).get('skipped') %}"
+            "echo 'Gold inalterada desde o último sucesso: testes pulados'"
+            "{% else %}"
+            "pytest /opt/airflow/tests/ --maxfail=1 --disable-warnings"
+            "{% endif %}"
+        ),
     )
 
 
     # TASK 6 — AUDITORIA FINAL
     def audit_task(**context):
+        from src.monitoring.metrics_query import refresh_daily_rollups
+        from src.monitoring.audit_reporting import refresh_stage_runs
+
         ti = context["ti"]
 
-        # puxa XComs dos tasks anteriores (retornos dict)
+        # puxa XComs dos tasks anteriores (resumos; o resultado completo fica no manifesto referenciado em "manifest")
         bronze = ti.xcom_pull(task_ids="bronze_ingestion")
         silver_r = ti.xcom_pull(task_ids="silver_transformation")
         gold_r = ti.xcom_pull(task_ids="gold_transformation")
+        gold_ts_r = ti.xcom_pull(task_ids="gold_timeseries")
+        contract_r = ti.xcom_pull(task_ids="data_contract")
 
         consolidated = {
             "bronze": bronze or {},
             "silver": silver_r or {},
             "gold": gold_r or {},
+            "gold_timeseries": gold_ts_r or {},
+            "data_contract": {k: v for k, v in (contract_r or {}).items() if k != "violations"},
         }
 
         # marca o dag_run como success + salva métricas consolidadas
         _audit_dag_upsert(context, status="success", metrics=consolidated)
 
+        # atualiza os rollups diários do banco de métricas (falha aqui não derruba a auditoria)
+        try:
+            refresh_daily_rollups()
+        except Exception as e:
+            logger.warning(f"[METRICS] Falha ao atualizar rollups diários: {e}")
+
+        # atualiza a camada de relatórios (audit.stage_runs / audit.stage_sla_daily)
+        try:
+            refresh_stage_runs()
+        except Exception as e:
+            logger.warning(f"[AUDIT] Falha ao atualizar relatórios de SLA: {e}")
+
         print("Pipeline executado com sucesso!")
         print("Auditoria consolidada no Postgres (audit.dag_runs.metrics)")
 
@@ -420,7 +641,7 @@ with DAG(
     # TASK 7 — EMAIL DE SUCESSO
     success_email = EmailOperator(
         task_id="send_success_email",
-        to=[ALERT_EMAIL],
+        to=ALERT_EMAIL_TEMPLATE,
         subject="Brewery Pipeline executado com sucesso!",
         html_content="""
         <h3>Pipeline Finalizado</h3>
@@ -435,4 +656,5 @@ with DAG(
 
 
     # ORQUESTRAÇÃO FINAL
-    api_health >> ingest >> silver >> gold >> quality >> run_tests >> audit >> success_email
+    api_health >> ingest >> silver >> gold >> [quality, data_contract, gold_ts] >> audit >> success_email
+    quality >> run_tests
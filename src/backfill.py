@@ -0,0 +1,267 @@
+# Scripts
+from src.transformation.silver_transform import transform_to_silver
+from src.transformation.gold_transform import transform_to_gold
+from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id, metrics_run_source
+from src.monitoring.metrics_client import flush_metrics
+from src.utils_log import flush_logs
+
+# Bibliotecas
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta, datetime
+from dotenv import load_dotenv
+
+# Backfill / reprocessamento de várias datas em paralelo.
+#
+# Cada data roda as etapas selecionadas (na ordem silver -> gold) em um processo
+# do pool: uma data com erro não afeta as outras. O progresso fica em
+# DATALAKE_PATH/_state/backfill/<id>.json, gravado a cada data concluída; rodar o
+# mesmo intervalo/etapas de novo retoma só as datas que não terminaram com
+# sucesso (com --force roda todas de novo). No fim grava o relatório (<id>_report.json) e métricas agregadas
+# (layer "backfill") no banco de métricas.
+#
+# A Bronze não entra: a API só devolve os dados atuais, então o backfill
+# reprocessa os JSONs já gravados. Datas sem a entrada da primeira etapa ficam
+# como "no_input" e não são tentadas.
+#
+# Uso:
+#   python -m src.backfill --start 2026-01-01 --end 2026-01-31
+#   python -m src.backfill --start 2026-01-01 --end 2026-12-31 --stages gold --workers 8 --force
+
+STAGES = ("silver", "gold")
+
+_STAGE_FUNCTIONS = {
+    "silver": transform_to_silver,
+    "gold": transform_to_gold,
+}
+
+# Campos do resultado de cada etapa guardados no estado/relatório
+_SUMMARY_KEYS = ("success", "skipped", "records", "records_received", "records_gold", "output_file", "error")
+
+
+def date_range(start_date: str, end_date: str) -> list:
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError(f"Intervalo inválido: {start_date} > {end_date}")
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+def backfill_id(start_date: str, end_date: str, stages) -> str:
+    return f"{start_date}_{end_date}_{'-'.join(stages)}"
+
+def _backfill_folder(datalake_root: str) -> str:
+    return os.path.join(datalake_root, "_state", "backfill")
+
+# Entrada da primeira etapa existe para a data?
+def _has_input(datalake_root: str, first_stage: str, execution_date: str) -> bool:
+    if first_stage == "silver":
+        return os.path.isdir(os.path.join(datalake_root, "raw", f"ingestion_date={execution_date}"))
+    return os.path.exists(os.path.join(datalake_root, "silver", f"processing_date={execution_date}", "breweries.parquet"))
+
+def _load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Gravação atômica (tmp + rename): um processo interrompido não corrompe o estado
+def _write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, default=str)
+    os.replace(tmp_path, path)
+
+# Executa as etapas de uma data (roda no processo do pool)
+def process_date(execution_date: str, stages: list, force: bool = False) -> dict:
+    # --force: reprocessa mesmo com a entrada inalterada (desliga o skip-if-unchanged).
+    # Partições reaproveitadas são hard-links de outra data; as etapas gravam com
+    # temporário + os.replace, então regravar esta data não altera as outras.
+    previous_skip = os.environ.get("SKIP_IF_UNCHANGED")
+    if force:
+        os.environ["SKIP_IF_UNCHANGED"] = "false"
+
+    start_time = time.time()
+    result = {"execution_date": execution_date, "status": "success", "stages": {}}
+    try:
+        # run_id com prefixo "backfill_": fora das baselines de performance da DAG
+        with metrics_run_source("backfill"):
+            for stage in stages:
+                stage_result = _STAGE_FUNCTIONS[stage](execution_date=execution_date)
+                result["stages"][stage] = {k: stage_result[k] for k in _SUMMARY_KEYS if k in stage_result}
+                if not stage_result.get("success"):
+                    result["status"] = "failed"
+                    result["error"] = f"{stage}: {stage_result.get('error', 'erro desconhecido')}"
+                    break
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"Erro fatal inesperado: {e}"
+    finally:
+        # o processo do pool não roda atexit: garante a gravação das métricas e logs enfileirados
+        flush_metrics()
+        flush_logs()
+        if force:
+            if previous_skip is None:
+                os.environ.pop("SKIP_IF_UNCHANGED", None)
+            else:
+                os.environ["SKIP_IF_UNCHANGED"] = previous_skip
+
+    result["duration_seconds"] = round(time.time() - start_time, 3)
+    return result
+
+# Executa o backfill de [start_date, end_date]. workers=0 roda tudo no processo atual.
+def run_backfill(start_date: str, end_date: str, stages=STAGES, workers: int = None, resume: bool = True, force: bool = False) -> dict:
+    load_dotenv(".env", override=False)
+    datalake_root = os.getenv("DATALAKE_PATH", "/opt/airflow/datalake")
+    stages = [s for s in STAGES if s in stages]
+    if not stages:
+        return {"success": False, "error": f"Nenhuma etapa válida (use {', '.join(STAGES)})"}
+    workers = int(os.getenv("BACKFILL_WORKERS", str(os.cpu_count() or 2))) if workers is None else workers
+
+    dates = date_range(start_date, end_date)
+    bf_id = backfill_id(start_date, end_date, stages)
+    state_path = os.path.join(_backfill_folder(datalake_root), f"{bf_id}.json")
+    report_path = os.path.join(_backfill_folder(datalake_root), f"{bf_id}_report.json")
+
+    state = _load_state(state_path) if resume else {}
+    state.setdefault("backfill_id", bf_id)
+    state.setdefault("stages", stages)
+    state.setdefault("created_at", datetime.now().isoformat())
+    date_results = state.setdefault("dates", {})
+
+    # Retomada: datas já concluídas com sucesso não rodam de novo. Com --force todas
+    # as datas rodam (reprocessar o intervalo depois de uma mudança de lógica).
+    resumed = [] if force else [d for d in dates if date_results.get(d, {}).get("status") == "success"]
+    pending = []
+    for d in dates:
+        if d in resumed:
+            continue
+        if not _has_input(datalake_root, stages[0], d):
+            date_results[d] = {"execution_date": d, "status": "no_input", "stages": {}}
+            continue
+        pending.append(d)
+
+    start_time = time.time()
+
+    def _record(result: dict):
+        date_results[result["execution_date"]] = result
+        state["updated_at"] = datetime.now().isoformat()
+        _write_json(state_path, state)
+
+    _write_json(state_path, state)
+    if workers <= 0 or len(pending) <= 1:
+        for d in pending:
+            _record(process_date(d, stages, force))
+    else:
+        # spawn: processos novos, sem herdar threads/conexões abertas do processo atual
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context) as executor:
+            futures = {executor.submit(process_date, d, stages, force): d for d in pending}
+            for future in as_completed(futures):
+                d = futures[future]
+                try:
+                    _record(future.result())
+                except Exception as e:
+                    # processo do pool morreu (ex.: OOM): a data fica como falha e é retomada na próxima execução
+                    _record({"execution_date": d, "status": "failed", "stages": {}, "error": f"Processo do backfill falhou: {e}"})
+
+    elapsed_seconds = time.time() - start_time
+    report = _build_report(state, dates, resumed, elapsed_seconds, workers)
+    report["state_file"] = state_path
+    report["report_file"] = report_path
+    _write_json(report_path, report)
+    _save_backfill_metrics(report)
+    return report
+
+# Relatório consolidado do intervalo
+def _build_report(state: dict, dates: list, resumed: list, elapsed_seconds: float, workers: int) -> dict:
+    date_results = state["dates"]
+    statuses = {d: date_results.get(d, {}).get("status") for d in dates}
+    failed = [d for d in dates if statuses[d] == "failed"]
+    processed = [d for d in dates if d not in resumed and statuses[d] in ("success", "failed")]
+
+    totals = {}
+    skipped_stages = 0
+    for d in processed:
+        for stage, stage_result in date_results[d].get("stages", {}).items():
+            if stage_result.get("skipped"):
+                skipped_stages += 1
+            for key in ("records", "records_gold"):
+                if stage_result.get(key) is not None:
+                    totals[f"{stage}_{key}"] = totals.get(f"{stage}_{key}", 0) + int(stage_result[key])
+
+    return {
+        "success": not failed,
+        "backfill_id": state["backfill_id"],
+        "stages": state["stages"],
+        "start_date": dates[0],
+        "end_date": dates[-1],
+        "workers": workers,
+        "dates_total": len(dates),
+        "dates_processed": len(processed),
+        "dates_succeeded": sum(1 for d in processed if statuses[d] == "success"),
+        "dates_failed": len(failed),
+        "dates_resumed": len(resumed),
+        "dates_no_input": sum(1 for d in dates if statuses[d] == "no_input"),
+        "stages_skipped_unchanged": skipped_stages,
+        "failed_dates": {d: date_results[d].get("error") for d in failed},
+        "totals": totals,
+        "duration": str(timedelta(seconds=elapsed_seconds)),
+        "dates_per_minute": round(len(processed) / elapsed_seconds * 60, 2) if elapsed_seconds > 0 else None,
+        "finished_at": datetime.now().isoformat(),
+    }
+
+# Métricas agregadas do backfill (uma linha por métrica, layer "backfill")
+def _save_backfill_metrics(report: dict):
+    init_db()
+    metrics = {
+        "dates_total": report["dates_total"],
+        "dates_processed": report["dates_processed"],
+        "dates_failed": report["dates_failed"],
+        "dates_resumed": report["dates_resumed"],
+        "dates_no_input": report["dates_no_input"],
+        "stages_skipped_unchanged": report["stages_skipped_unchanged"],
+        "backfill_duration": report["duration"],
+        "dates_per_minute": report["dates_per_minute"],
+    }
+    metrics.update(report["totals"])
+    # execution_date é uma data (consultas/retenção comparam datas): a última do intervalo;
+    # o início do intervalo vai como métrica
+    metrics["backfill_start_date"] = report["start_date"]
+    save_metrics_dict(generate_run_id(), report["end_date"], "backfill", metrics)
+
+def _print_report(report: dict):
+    print(f"Backfill {report['backfill_id']} ({report['start_date']} -> {report['end_date']}, {report['workers']} workers)")
+    print(f"  processadas: {report['dates_processed']} | sucesso: {report['dates_succeeded']} | falhas: {report['dates_failed']}"
+          f" | retomadas: {report['dates_resumed']} | sem entrada: {report['dates_no_input']}")
+    print(f"  etapas puladas (entrada inalterada): {report['stages_skipped_unchanged']}")
+    print(f"  duração: {report['duration']} ({report['dates_per_minute']} datas/min)")
+    for d, error in report["failed_dates"].items():
+        print(f"  FALHA {d}: {error}")
+    print(f"  relatório: {report['report_file']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill/reprocessamento paralelo de várias datas (Silver/Gold)")
+    parser.add_argument("--start", required=True, help="data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="data final (YYYY-MM-DD, inclusiva)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="etapas separadas por vírgula (silver,gold)")
+    parser.add_argument("--workers", type=int, default=None, help="processos em paralelo (0 = sem pool)")
+    parser.add_argument("--restart", action="store_true", help="ignora o progresso salvo e roda todas as datas")
+    parser.add_argument("--force", action="store_true", help="reprocessa todas as datas, mesmo as já concluídas e com a entrada inalterada")
+    args = parser.parse_args()
+
+    report = run_backfill(
+        args.start, args.end,
+        stages=[s.strip() for s in args.stages.split(",") if s.strip()],
+        workers=args.workers, resume=not args.restart, force=args.force,
+    )
+    if "backfill_id" in report:
+        _print_report(report)
+    else:
+        print(report["error"])
+    raise SystemExit(0 if report["success"] else 1)
@@ -1,10 +1,16 @@
 # SCRIPTS
-from src.utils_log import configurar_logger, print_log
-from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id
+from src.utils_log import configurar_logger, print_log, bind_log_context
+from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id, metrics_async_enabled
+from src.monitoring.metrics_client import get_metrics_client
+from src.transformation.stage_fingerprint import write_bronze_manifest
+from src.monitoring.stage_trace import StageTrace
+from src.monitoring.stage_profiler import StageProfiler
+from src.monitoring.memory_usage import MemoryTracker
 
 # BIBLIOTECAS
 import requests
 import json
+import hashlib
 import os
 import time
 from datetime import timedelta, datetime
@@ -17,9 +23,16 @@ def _resolve_execution_date(execution_date: str = None) -> str:
     return os.getenv("AIRFLOW_CTX_EXECUTION_DATE", datetime.now().strftime("%Y-%m-%d"))[:10]
 
 
+# Grava uma página JSON já serializada
+def _write_page(file_path: str, content: bytes):
+    with open(file_path, "wb") as f:
+        f.write(content)
+
 # Função para extrair todos os dados da API até retornar lista vazia
-# Salva cada página como JSON bruto na camada Bronze
-def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
+# Salva cada página como JSON bruto na camada Bronze.
+# Execução em processo (src.pipeline_runner): `records` recebe os registros de todas as
+# páginas (a Silver não relê os JSONs) e `writer` grava as páginas em background.
+def extract_breweries(per_page=200, max_pages=500, execution_date: str = None, records: list = None, writer=None):
     # CARREGA VARIAVEIS
     # Carrega .env somente quando a função roda (evita side-effects em testes/import)
     load_dotenv(".env", override=False)
@@ -53,8 +66,18 @@ def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
     latencies = []
     total_records = 0
     page = 1
-    latencies = []
+    pages_manifest = {}
+    manifest_hash = None
+    page_writes = []
     folder = os.path.join(output_path, f"ingestion_date={execution_date}")
+    run_id = generate_run_id()
+    bind_log_context(logger, stage="bronze", run_id=run_id, execution_date=execution_date)
+    trace = StageTrace("bronze", execution_date)
+    profiler = StageProfiler("bronze", execution_date).start()
+    memory = MemoryTracker()
+
+    # Métricas por página só com emissão assíncrona (METRICS_ASYNC=true): enfileirar não bloqueia o loop
+    page_metrics = get_metrics_client() if metrics_async_enabled() else None
 
     try:
         # Criando pasta para ingestão
@@ -71,50 +94,55 @@ def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
                 success = True
                 break
 
-            print_log(logger, f"Buscando página {page}...", 'info')
+            print_log(logger, f"Buscando página {page}...", 'info', page=page)
         
             try:
                 # Request para API
                 request_start = time.time() # Inicio da chamada
-                response = requests.get(
-                    api_url,
-                    params={"page": page, "per_page": per_page},
-                    timeout=10
-                )
+                with trace.span("fetch_page", page=page):
+                    response = requests.get(
+                        api_url,
+                        params={"page": page, "per_page": per_page},
+                        timeout=10
+                    )
                 request_end = time.time() # Fim da chamada
 
                 # Calcula o tempo de latencia
                 latency_ms = (request_end - request_start) * 1000
                 latencies.append(latency_ms)
-                print_log(logger, f"Latência API página {page}: {latency_ms:.2f} ms","info")
+                print_log(logger, f"Latência API página {page}: {latency_ms:.2f} ms","info", page=page)
+                if page_metrics:
+                    page_metrics.emit(run_id, execution_date, "bronze", "page_latency_ms", latency_ms)
 
                 # Valida status da chamada
                 response.raise_for_status()
                 # Converte JSON
-                data = response.json()
+                with trace.span("parse_page", page=page) as span:
+                    data = response.json()
+                    span["rows"] = len(data) if isinstance(data, list) else None
 
             except requests.exceptions.Timeout:
-                print_log(logger, f"Timeout na página {page}.", 'error')
+                print_log(logger, f"Timeout na página {page}.", 'error', page=page)
                 success = False
                 break
 
             except requests.exceptions.HTTPError as e:
-                print_log(logger, f"Erro HTTP na página {page}: {e}", 'error')
+                print_log(logger, f"Erro HTTP na página {page}: {e}", 'error', page=page)
                 success = False
                 break
 
             except requests.exceptions.RequestException as e:
-                print_log(logger, f"Erro de conexão na página {page}: {e}", 'error')
+                print_log(logger, f"Erro de conexão na página {page}: {e}", 'error', page=page)
                 success = False
                 break
 
             except json.JSONDecodeError:
-                print_log(logger, f"Erro ao interpretar JSON da página {page}", 'error')
+                print_log(logger, f"Erro ao interpretar JSON da página {page}", 'error', page=page)
                 success = False
                 break
 
             except Exception as e:
-                print_log(logger, f"Erro inesperado na página {page}: {e}", 'error')
+                print_log(logger, f"Erro inesperado na página {page}: {e}", 'error', page=page)
                 success = False
                 break
 
@@ -130,20 +158,44 @@ def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
             file_path = os.path.join(folder, file_name)
 
             try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4)
-
-                print_log(logger, f"Página {page} salva ({len(data)} registros)", 'success')
+                with trace.span("write_page", page=page, background=writer is not None) as span:
+                    content = json.dumps(data, indent=4).encode("utf-8")
+                    span["bytes"] = len(content)
+                    if writer is not None:
+                        page_writes.append((file_name, writer.submit(_write_page, file_path, content)))
+                    else:
+                        _write_page(file_path, content)
+                # sha256/tamanho da página para o manifesto (skip-if-unchanged nas etapas seguintes)
+                pages_manifest[file_name] = {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+
+                print_log(logger, f"Página {page} salva ({len(data)} registros)", 'success', page=page)
                 success = True
 
             except Exception as e:
-                print_log(logger, f"Erro ao salvar arquivo da página {page}: {e}", 'error')
+                print_log(logger, f"Erro ao salvar arquivo da página {page}: {e}", 'error', page=page)
                 success = False
                 break
 
             total_records += len(data)
+            if records is not None:
+                records.extend(data)
             page += 1
 
+        # Páginas gravadas em background: o manifesto só é escrito depois de todas no disco
+        if page_writes:
+            with trace.span("wait_page_writes", pages=len(page_writes)):
+                for file_name, future in page_writes:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print_log(logger, f"Erro ao salvar arquivo {file_name}: {e}", 'error')
+                        success = False
+
+        # Manifesto das páginas gravadas: impressão digital da entrada da Silver
+        if success:
+            with trace.span("write_manifest", pages=len(pages_manifest)):
+                manifest_hash = write_bronze_manifest(folder, pages_manifest)
+
     # Erro geral fatal
     except Exception as e:
         print_log(logger, f"Erro fatal inesperado: {e}", "error")
@@ -152,7 +204,10 @@ def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
 
     # Finalização do script
     finally:
-        duration = str(timedelta(seconds=(time.time() - start_time)))
+        profiler.stop()
+        memory_report = memory.report()
+        elapsed_seconds = time.time() - start_time
+        duration = str(timedelta(seconds=elapsed_seconds))
         avg_latency = (sum(latencies) / len(latencies)) if latencies else None # KPI Final: média de latência
 
         #if latencies:
@@ -169,17 +224,27 @@ def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
             print_log(logger, f'Script finalizado com erro. Tempo de Execucao: {duration}', 'error')
 
         # Salvar métricas no SQLite
-        run_id = generate_run_id()
         init_db()
 
         metrics = {
             "pages_processed": page - 1,
             "total_records": total_records,
             "ingestion_duration": duration,
-            "api_latency_ms": avg_latency
+            "api_latency_ms": avg_latency,
+            "records_per_second": total_records / elapsed_seconds if elapsed_seconds > 0 else None,
         }
+        # Tempo por sub-fase (spans) junto com as métricas da etapa
+        metrics.update(trace.metrics())
+        metrics.update(profiler.summary)
+        metrics.update(memory_report)
 
         save_metrics_dict(run_id, execution_date, "bronze", metrics)
+        if profiler.files:
+            print_log(logger, f"Profiling da Bronze gravado em: {profiler.files}", 'info')
+
+        trace_file, trace_error = trace.export(run_id)
+        if trace_error:
+            print_log(logger, f"Falha ao gravar trace da Bronze: {trace_error}", 'warning')
 
             
         return {
@@ -190,6 +255,11 @@ def extract_breweries(per_page=200, max_pages=500, execution_date: str = None):
             "ingestion_duration": duration,
             "ingestion_date": execution_date,
             "api_latency_ms": round(avg_latency, 2) if avg_latency else None,
+            "manifest_hash": manifest_hash,
+            "spans": trace.summary(),
+            "trace_file": trace_file,
+            "profile": profiler.result(),
+            **memory_report,
             "run_id": run_id
         }
 
@@ -0,0 +1,110 @@
+# Scripts
+from src.monitoring import audit_store
+from src.monitoring.spool_writer import SpoolingWriter
+
+# Bibliotecas
+import os
+import uuid
+import atexit
+import threading
+from datetime import datetime, timezone
+
+# Emissor de auditoria "fire-and-forget".
+#
+# emit_task_event()/emit_dag_run() só colocam o registro em uma fila em memória e
+# retornam; uma thread em background entrega em lote ao Postgres. Se o banco
+# estiver lento ou fora do ar, o lote vai para um arquivo de spool (JSON lines,
+# append-only) que é reprocessado na próxima entrega bem-sucedida (fila, thread e
+# spool em src.monitoring.spool_writer).
+# O reprocessamento é idempotente: cada evento carrega um event_uid e o insert em
+# audit.task_events ignora uids já gravados; dag_runs já é um upsert.
+
+# Liga/desliga a emissão assíncrona (padrão: ligada)
+def audit_async_enabled() -> bool:
+    return os.getenv("AUDIT_ASYNC", "true").lower() == "true"
+
+# Arquivo de spool padrão (fora do Postgres, no volume do datalake)
+def _default_spool_path() -> str:
+    datalake = os.getenv("DATALAKE_PATH", "/opt/airflow/datalake")
+    return os.path.join(datalake, "audit", "spool", "audit_spool.jsonl")
+
+
+class AuditEmitter(SpoolingWriter):
+
+    thread_name = "audit-writer"
+    spill_on_timeout = True
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, spool_path: str = None):
+        super().__init__(
+            batch_size=batch_size or int(os.getenv("AUDIT_BATCH_SIZE", "200")),
+            flush_interval=flush_interval if flush_interval is not None else float(os.getenv("AUDIT_FLUSH_INTERVAL", "1")),
+            spool_path=spool_path or os.getenv("AUDIT_SPOOL_PATH") or _default_spool_path(),
+            max_attempts=int(os.getenv("AUDIT_SPOOL_MAX_ATTEMPTS", "5")),
+        )
+
+    @property
+    def records_written(self) -> int:
+        return self.written
+
+    @property
+    def records_spilled(self) -> int:
+        return self.spilled
+
+    # Enfileira um evento de task (mesmos campos de audit_store.insert_task_event)
+    def emit_task_event(self, **event):
+        self.emit_task_events([event])
+
+    # Enfileira vários eventos (ex.: o conteúdo de um AuditEventBuffer)
+    def emit_task_events(self, events: list):
+        for event in events:
+            event.setdefault("event_time", datetime.now(timezone.utc).isoformat())
+            event.setdefault("event_uid", uuid.uuid4().hex)
+        self._put([("event", event) for event in events])
+
+    # Enfileira um upsert em audit.dag_runs (mesmos campos de audit_store.upsert_dag_run)
+    def emit_dag_run(self, **dag_run):
+        self._put([("dag_run", dag_run)])
+
+    # Entrega um lote: eventos em um único comando, depois os upserts de dag_runs
+    def _deliver(self, items: list):
+        events = [payload for kind, payload in items if kind == "event"]
+        if events:
+            audit_store.insert_task_events_batch(events)
+        for kind, payload in items:
+            if kind == "dag_run":
+                audit_store.upsert_dag_run(**payload)
+
+    def _encode(self, item) -> dict:
+        kind, payload = item
+        return {"kind": kind, "payload": payload}
+
+    def _decode(self, record):
+        return record["kind"], record["payload"]
+
+    # Conexão/pool (psycopg2 OperationalError/InterfaceError, pool esgotado) não conta tentativa
+    def _is_transient(self, error: Exception) -> bool:
+        return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in ("OperationalError", "InterfaceError")
+
+
+_emitter = None
+_emitter_pid = None
+_emitter_lock = threading.Lock()
+
+# Emissor único por processo (recriado após fork); flush garantido no exit
+def get_audit_emitter() -> AuditEmitter:
+    global _emitter, _emitter_pid
+    with _emitter_lock:
+        if _emitter is None or _emitter_pid != os.getpid():
+            _emitter = AuditEmitter()
+            _emitter_pid = os.getpid()
+            atexit.register(_emitter.close)
+        return _emitter
+
+# Atalho para o fim das tasks: espera a entrega por no máximo AUDIT_FLUSH_TIMEOUT
+# segundos e manda o restante para o spool (não cria emissor se não existir)
+def flush_audit(timeout: float = None) -> bool:
+    if _emitter is None or _emitter_pid != os.getpid():
+        return True
+    if timeout is None:
+        timeout = float(os.getenv("AUDIT_FLUSH_TIMEOUT", "5"))
+    return _emitter.flush(timeout)
@@ -0,0 +1,71 @@
+# Scripts
+from src.monitoring.audit_store import fetch_all
+
+# Consultas da camada de relatórios da auditoria (sql/audit_reporting.sql).
+# audit.stage_runs tem uma linha tipada por (run, etapa) e é indexada por
+# (stage, execution_date): as consultas de SLA viram varreduras de índice em vez
+# de extrair JSON de todos os audit.dag_runs.
+
+STAGES = ("bronze", "silver", "gold", "gold_timeseries")
+
+_STAGE_COLUMNS = [
+    "dag_id", "run_id", "stage", "execution_date", "run_status", "success",
+    "duration_seconds", "records", "records_per_second", "api_latency_ms",
+]
+
+_SLA_COLUMNS = [
+    "stage", "day", "runs", "failures", "duration_p50", "duration_p95",
+    "duration_max", "records_per_second_avg", "api_latency_ms_avg",
+]
+
+# Campos de stage_runs/stage_sla_daily que podem ser usados em percentis
+_NUMERIC_FIELDS = ("duration_seconds", "records", "records_per_second", "api_latency_ms")
+
+
+# Atualiza audit.stage_runs (incremental) e o resumo diário de SLA
+def refresh_stage_runs(full_refresh: bool = False) -> int:
+    rows = fetch_all("SELECT audit.refresh_stage_runs(%(full)s)", {"full": full_refresh})
+    return rows[0][0]
+
+# Percentil de uma métrica da etapa nos últimos `days` dias (só execuções com sucesso).
+# Ex.: stage_percentile("silver", 95) -> p95 da duração da Silver nos últimos 30 dias
+def stage_percentile(stage: str, pct: float, field: str = "duration_seconds", days: int = 30):
+    if field not in _NUMERIC_FIELDS:
+        raise ValueError(f"Campo inválido: {field}. Use um de {_NUMERIC_FIELDS}")
+
+    rows = fetch_all(f"""
+        SELECT percentile_cont(%(fraction)s) WITHIN GROUP (ORDER BY {field})
+          FROM audit.stage_runs
+         WHERE stage = %(stage)s
+           AND execution_date >= NOW() - make_interval(days => %(days)s)
+           AND success
+    """, {"fraction": pct / 100.0, "stage": stage, "days": days})
+    return rows[0][0] if rows else None
+
+# Execuções de uma etapa nos últimos `days` dias (mais recente primeiro)
+def stage_runs(stage: str, days: int = 30) -> list:
+    rows = fetch_all(f"""
+        SELECT {", ".join(_STAGE_COLUMNS)}
+          FROM audit.stage_runs
+         WHERE stage = %(stage)s
+           AND execution_date >= NOW() - make_interval(days => %(days)s)
+         ORDER BY execution_date DESC
+    """, {"stage": stage, "days": days})
+    return [dict(zip(_STAGE_COLUMNS, r)) for r in rows]
+
+# Resumo diário de SLA (todas as etapas ou uma só) nos últimos `days` dias
+def stage_sla(stage: str = None, days: int = 30) -> list:
+    rows = fetch_all(f"""
+        SELECT {", ".join(_SLA_COLUMNS)}
+          FROM audit.stage_sla_daily
+         WHERE (%(stage)s::text IS NULL OR stage = %(stage)s)
+           AND day >= (NOW() - make_interval(days => %(days)s))::date
+         ORDER BY stage, day
+    """, {"stage": stage, "days": days})
+    return [dict(zip(_SLA_COLUMNS, r)) for r in rows]
+
+
+if __name__ == "__main__":
+    print(refresh_stage_runs())
+    for s in STAGES:
+        print(s, "p95 duração (30d):", stage_percentile(s, 95))
@@ -1,13 +1,21 @@
 # Biliotecas
 import json
 import os
-from datetime import datetime
-from typing import Any, Dict, Optional
-import psycopg2
-import psycopg2.extras
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
 
 # Conecta no Postgres do docker-compose.
+# psycopg2 é importado aqui (e não no topo) para o módulo poder ser importado e
+# testado com um driver DB-API falso, sem o driver real instalado.
 def _get_conn():
+    import psycopg2
 
     host = os.getenv("AUDIT_DB_HOST", "airflow_postgres")
     port = int(os.getenv("AUDIT_DB_PORT", "5432"))
@@ -21,8 +29,178 @@ def _get_conn():
         dbname=db,
         user=user,
         password=password,
+        connect_timeout=int(os.getenv("AUDIT_DB_CONNECT_TIMEOUT", "5")),
     )
 
+
+# Pool de conexões do processo: reaproveita conexões entre eventos de auditoria
+# (evita um handshake TCP + autenticação por chamada). Conexões ociosas há mais
+# de `health_check_seconds` são validadas com SELECT 1 antes de voltar ao uso.
+class _ConnectionPool:
+
+    def __init__(self, factory: Callable, max_size: int, timeout: float, health_check_seconds: float):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        self._idle = deque()   # (conexão, instante em que voltou ao pool)
+        self._size = 0         # conexões abertas (ociosas + em uso)
+        self._cond = threading.Condition()
+
+    # Verifica se a conexão ainda responde (só quando ficou ociosa por muito tempo)
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if getattr(conn, "closed", 0):
+            return False
+        if time.monotonic() - idle_since < self.health_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    # Retira uma conexão do pool (ou abre uma nova se houver espaço)
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    conn, idle_since = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Pool de auditoria esgotado ({self.max_size} conexões em uso)")
+                    self._cond.wait(remaining)
+                    continue
+
+            if conn is None:
+                try:
+                    return self.factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(conn, idle_since):
+                return conn
+            self._discard(conn)
+
+    # Devolve a conexão ao pool (ou descarta, se quebrada)
+    def release(self, conn, broken: bool = False):
+        if broken or getattr(conn, "closed", 0):
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    # Fecha todas as conexões ociosas
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# Pool único por processo. Após fork o pool do pai é abandonado sem fechar
+# (fechar no filho derrubaria as conexões que o pai ainda usa).
+def _get_pool() -> _ConnectionPool:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = _ConnectionPool(
+                factory=lambda: _get_conn(),
+                max_size=int(os.getenv("AUDIT_DB_POOL_SIZE", "4")),
+                timeout=float(os.getenv("AUDIT_DB_POOL_TIMEOUT", "30")),
+                health_check_seconds=float(os.getenv("AUDIT_DB_HEALTHCHECK_SECONDS", "30")),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+# Fecha as conexões do pool do processo (ex.: fim da task ou testes)
+def close_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close_all()
+        _pool, _pool_pid = None, None
+
+# Empresta uma conexão do pool durante o bloco `with`
+@contextmanager
+def _connection():
+    pool = _get_pool()
+    conn = pool.acquire()
+    broken = False
+    try:
+        yield conn
+    except Exception:
+        # conexão que caiu no meio do uso não volta para o pool
+        broken = bool(getattr(conn, "closed", 0))
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        raise
+    finally:
+        pool.release(conn, broken=broken)
+
+# Executa um comando em uma transação usando o pool
+def _execute(sql: str, payload: Dict[str, Any]) -> None:
+    with _connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, payload)
+
+# Executa uma consulta (ou função) em uma transação e devolve todas as linhas
+def fetch_all(sql: str, params: Dict[str, Any] = None) -> list:
+    with _connection() as conn:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params or {})
+                return cur.fetchall()
+
+
+# (dag_id, run_id) cujo "pai" em audit.dag_runs já foi gravado por este processo.
+# Eventos desses runs vão direto para audit.task_events, sem repetir o upsert do pai.
+_KNOWN_DAG_RUNS = set()
+_known_lock = threading.Lock()
+
+def _mark_dag_run_known(dag_id: str, run_id: str) -> None:
+    with _known_lock:
+        _KNOWN_DAG_RUNS.add((dag_id, run_id))
+
+def _is_dag_run_known(dag_id: str, run_id: str) -> bool:
+    with _known_lock:
+        return (dag_id, run_id) in _KNOWN_DAG_RUNS
+
 # Inserta os dados na tabela audit.dag_runs
 def upsert_dag_run(
     dag_id: str,
@@ -83,13 +261,8 @@ def upsert_dag_run(
         "error": error,
     }
 
-    conn = _get_conn()
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, payload)
-    finally:
-        conn.close()
+    _execute(sql, payload)
+    _mark_dag_run_known(dag_id, run_id)
 
 # Função para garantir que a linha “pai” em dag_runs exista antes de inserir qualquer evento de task.
 def ensure_dag_run_exists(
@@ -128,16 +301,29 @@ def ensure_dag_run_exists(
         "host": host,
     }
 
-    conn = _get_conn()
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, payload)
-    finally:
-        conn.close()
+    _execute(sql, payload)
+    _mark_dag_run_known(dag_id, run_id)
 
 
-# Inserta os dados na tabela audit.task_events
+# Upsert do "pai" reaproveitado pelos inserts de eventos (mesmo efeito de ensure_dag_run_exists)
+_PARENT_UPSERT = """
+    INSERT INTO audit.dag_runs (
+        dag_id, run_id, status, execution_date, logical_date,
+        start_time, metrics, error, updated_at, created_at
+    )
+    SELECT DISTINCT ON (p.dag_id, p.run_id)
+        p.dag_id, p.run_id, 'running', p.execution_date, p.execution_date,
+        NOW(), '{{}}'::jsonb, NULL, NOW(), NOW()
+    FROM {source}
+    ON CONFLICT (dag_id, run_id)
+    DO UPDATE SET
+        updated_at = NOW()
+"""
+
+# Inserta os dados na tabela audit.task_events.
+# Na primeira chamada de um (dag_id, run_id) o upsert do pai e o insert do evento
+# vão em um único comando (CTE); nas seguintes, só o insert do evento.
+# A FK é validada no fim do comando, quando o pai já foi gravado pela CTE.
 def insert_task_event(
     dag_id: str,
     run_id: str,
@@ -149,29 +335,35 @@ def insert_task_event(
     map_index: int = None,
     log_url: str = None,
     execution_date=None,
+    event_time: str = None,
+    event_uid: str = None,
 ):
     if metrics is None:
         metrics = {}
 
-    # ✅ GARANTE que o "pai" existe antes do evento da task (evita FK violation)
-    ensure_dag_run_exists(
-        dag_id=dag_id,
-        run_id=run_id,
-        execution_date=execution_date,
-        status="running",
-    )
-
-    sql = """
+    insert_sql = """
     INSERT INTO audit.task_events (
         dag_id, run_id, task_id, status, message, metrics,
-        try_number, map_index, log_url, event_time
+        try_number, map_index, log_url, event_time, event_uid
     )
     VALUES (
         %(dag_id)s, %(run_id)s, %(task_id)s, %(status)s, %(message)s, %(metrics)s::jsonb,
-        %(try_number)s, %(map_index)s, %(log_url)s, NOW()
-    );
+        %(try_number)s, %(map_index)s, %(log_url)s, COALESCE(%(event_time)s::timestamptz, NOW()), %(event_uid)s
+    )
+    ON CONFLICT DO NOTHING;
     """
 
+    parent_known = _is_dag_run_known(dag_id, run_id)
+    if parent_known:
+        sql = insert_sql
+    else:
+        # ✅ GARANTE que o "pai" existe antes do evento da task (evita FK violation)
+        parent_sql = _PARENT_UPSERT.format(
+            source="(SELECT %(dag_id)s::text AS dag_id, %(run_id)s::text AS run_id, "
+                   "%(execution_date)s::timestamptz AS execution_date) AS p"
+        )
+        sql = f"WITH parent AS ({parent_sql}) {insert_sql}"
+
     payload = {
         "dag_id": dag_id,
         "run_id": run_id,
@@ -182,12 +374,128 @@ def insert_task_event(
         "try_number": try_number,
         "map_index": map_index,
         "log_url": log_url,
+        "execution_date": execution_date,
+        "event_time": event_time,
+        "event_uid": event_uid,
     }
 
-    conn = _get_conn()
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, payload)
-    finally:
-        conn.close()
\ No newline at end of file
+    _execute(sql, payload)
+    if not parent_known:
+        _mark_dag_run_known(dag_id, run_id)
+
+
+# Inserta vários eventos em um único comando: os eventos vão como um array JSON
+# (jsonb_to_recordset) e os "pais" ainda não conhecidos são garantidos na mesma CTE.
+# Cada evento é um dict com os mesmos campos de insert_task_event; eventos com
+# event_uid já gravado são ignorados (reenvio idempotente).
+def insert_task_events_batch(events: List[Dict[str, Any]]) -> int:
+    if not events:
+        return 0
+
+    rows = []
+    for event in events:
+        row = {
+            "dag_id": event["dag_id"],
+            "run_id": event["run_id"],
+            "task_id": event["task_id"],
+            "status": event["status"],
+            "message": event.get("message"),
+            "metrics": event.get("metrics") or {},
+            "try_number": event.get("try_number"),
+            "map_index": event.get("map_index"),
+            "log_url": event.get("log_url"),
+            "execution_date": event.get("execution_date"),
+            "event_time": event.get("event_time"),
+            "event_uid": event.get("event_uid"),
+        }
+        rows.append(row)
+
+    records = """jsonb_to_recordset(%(events)s::jsonb) AS e(
+        dag_id text, run_id text, task_id text, status text, message text, metrics jsonb,
+        try_number integer, map_index integer, log_url text,
+        execution_date timestamptz, event_time timestamptz, event_uid text
+    )"""
+
+    insert_sql = f"""
+    INSERT INTO audit.task_events (
+        dag_id, run_id, task_id, status, message, metrics,
+        try_number, map_index, log_url, event_time, event_uid
+    )
+    SELECT e.dag_id, e.run_id, e.task_id, e.status, e.message, COALESCE(e.metrics, '{{}}'::jsonb),
+           e.try_number, e.map_index, e.log_url, COALESCE(e.event_time, NOW()), e.event_uid
+    FROM {records}
+    ON CONFLICT DO NOTHING;
+    """
+
+    new_parents = {
+        (r["dag_id"], r["run_id"]) for r in rows
+        if not _is_dag_run_known(r["dag_id"], r["run_id"])
+    }
+    if new_parents:
+        parent_sql = _PARENT_UPSERT.format(source=records.replace("AS e(", "AS p(", 1))
+        sql = f"WITH parent AS ({parent_sql}) {insert_sql}"
+    else:
+        sql = insert_sql
+
+    _execute(sql, {"events": json.dumps(rows, default=str)})
+    for dag_id, run_id in new_parents:
+        _mark_dag_run_known(dag_id, run_id)
+    return len(rows)
+
+
+# Buffer de eventos de uma task: acumula os eventos e grava tudo em um único
+# comando no flush (fim da task, ou na saída do `with` em caso de falha).
+# O horário de cada evento é o do momento em que foi adicionado.
+# `sink` substitui a gravação direta (ex.: AuditEmitter.emit_task_events).
+class AuditEventBuffer:
+
+    def __init__(self, sink: Callable = None):
+        self.events = []
+        self.sink = sink or insert_task_events_batch
+
+    def add(self, **event) -> None:
+        event.setdefault("event_time", datetime.now(timezone.utc).isoformat())
+        self.events.append(event)
+
+    def flush(self) -> int:
+        events, self.events = self.events, []
+        if not events:
+            return 0
+        self.sink(events)
+        return len(events)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+            return False
+        # a task já está falhando: grava o que der sem mascarar a exceção original
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning("Falha ao gravar eventos de auditoria: %s", e)
+        return False
+
+
+# Garante as partições mensais de audit.task_events até `months_ahead` meses à frente
+def ensure_task_event_partitions(months_ahead: int = None) -> int:
+    if months_ahead is None:
+        months_ahead = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "3"))
+
+    rows = fetch_all("SELECT audit.ensure_task_event_partitions(%(months)s)", {"months": months_ahead})
+    return rows[0][0]
+
+# Retenção de audit.task_events: desanexa/remove partições mais antigas que `retention_months`
+def drop_old_task_event_partitions(retention_months: int = None, detach_only: bool = None) -> List[str]:
+    if retention_months is None:
+        retention_months = int(os.getenv("AUDIT_RETENTION_MONTHS", "12"))
+    if detach_only is None:
+        detach_only = os.getenv("AUDIT_RETENTION_DETACH_ONLY", "false").lower() == "true"
+
+    rows = fetch_all(
+        "SELECT audit.drop_task_event_partitions(%(months)s, %(detach_only)s)",
+        {"months": retention_months, "detach_only": detach_only},
+    )
+    return [row[0] for row in rows]
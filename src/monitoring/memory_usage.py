@@ -0,0 +1,98 @@
+# Bibliotecas
+import os
+import sys
+
+# Uso de memória das etapas e orçamento de memória.
+#
+# MemoryTracker mede o RSS do processo (pico e variação durante a etapa), o pool
+# de memória do Arrow e o maior DataFrame/tabela observado pela etapa. No Airflow
+# cada task roda em um processo próprio, então o pico de RSS do processo é o
+# pico da etapa; em src.pipeline_runner (várias etapas no mesmo processo) o pico
+# é acumulado desde o início do processo.
+#
+# STAGE_MEMORY_BUDGET_MB define o orçamento de memória para os dados da etapa
+# (0/vazio = sem orçamento). Silver e Gold estimam o tamanho em memória da entrada
+# (bytes em disco x MEMORY_EXPANSION_FACTOR) e, acima do orçamento, processam em
+# lotes com spill para disco em vez de carregar tudo de uma vez.
+# Módulo leve (só stdlib; pyarrow só se já estiver importado).
+
+_MB = 1024 * 1024
+
+
+def memory_budget_bytes() -> int:
+    raw = str(os.getenv("STAGE_MEMORY_BUDGET_MB", "")).strip()
+    return int(float(raw) * _MB) if raw else 0
+
+# Quanto a entrada cresce ao ser carregada (objetos Python/pandas x bytes em disco)
+def memory_expansion_factor() -> float:
+    return float(os.getenv("MEMORY_EXPANSION_FACTOR", "4"))
+
+# Entrada estimada acima do orçamento? Retorna (excede, estimativa em bytes)
+def exceeds_budget(input_bytes: int) -> tuple:
+    estimate = int(input_bytes * memory_expansion_factor())
+    budget = memory_budget_bytes()
+    return (budget > 0 and estimate > budget), estimate
+
+# Bytes de entrada por lote para caber no orçamento (metade: folga para as cópias da transformação)
+def batch_input_bytes() -> int:
+    budget = memory_budget_bytes()
+    return max(1, int(budget / memory_expansion_factor() / 2)) if budget > 0 else 0
+
+# RSS atual (Linux: /proc/self/statm); None onde não houver
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+# Pico de RSS do processo (ru_maxrss: KB no Linux, bytes no macOS); None no Windows
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _arrow_pool():
+    pyarrow = sys.modules.get("pyarrow")
+    return pyarrow.default_memory_pool() if pyarrow is not None else None
+
+def _to_mb(value):
+    return round(value / _MB, 3) if value is not None else None
+
+
+class MemoryTracker:
+    """Mede o uso de memória de uma execução de etapa."""
+
+    def __init__(self):
+        self.rss_start = current_rss_bytes()
+        self.frame_peak = 0
+        self.mode = "in_memory"
+
+    # Registra o tamanho de um DataFrame/tabela Arrow (guarda o maior)
+    def observe(self, data):
+        if data is None:
+            return data
+        try:
+            if hasattr(data, "memory_usage"):
+                size = int(data.memory_usage(index=True, deep=True).sum())
+            else:
+                size = int(data.nbytes)
+        except Exception:
+            return data
+        self.frame_peak = max(self.frame_peak, size)
+        return data
+
+    def report(self) -> dict:
+        rss_end = current_rss_bytes()
+        pool = _arrow_pool()
+        return {
+            "memory_mode": self.mode,
+            "peak_rss_mb": _to_mb(peak_rss_bytes()),
+            "rss_delta_mb": _to_mb(rss_end - self.rss_start) if rss_end is not None and self.rss_start is not None else None,
+            "arrow_peak_mb": _to_mb(pool.max_memory()) if pool is not None else None,
+            "arrow_allocated_mb": _to_mb(pool.bytes_allocated()) if pool is not None else None,
+            "frame_peak_mb": _to_mb(self.frame_peak),
+        }
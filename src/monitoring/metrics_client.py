@@ -0,0 +1,90 @@
+# Scripts
+from src.monitoring import metrics_store
+from src.monitoring.spool_writer import SpoolingWriter
+
+# Bibliotecas
+import os
+import uuid
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+
+# Cliente de métricas não bloqueante.
+#
+# emit()/emit_dict() só colocam o ponto em uma fila em memória; uma thread em
+# background agrupa os pontos (por tamanho ou por tempo) e grava com um único
+# executemany. Se o SQLite estiver travado, o lote vai para um arquivo de spool
+# (JSON lines) que é reprocessado no próximo flush bem-sucedido (fila, thread e
+# spool em src.monitoring.spool_writer).
+# Cada ponto carrega um point_uid (índice único no banco): reprocessar o mesmo
+# spool duas vezes não duplica linhas.
+
+
+class MetricsClient(SpoolingWriter):
+
+    thread_name = "metrics-flusher"
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, spool_path: str = None):
+        super().__init__(
+            batch_size=batch_size or int(os.getenv("METRICS_BATCH_SIZE", "500")),
+            flush_interval=flush_interval if flush_interval is not None else float(os.getenv("METRICS_FLUSH_INTERVAL", "2")),
+            spool_path=spool_path or os.path.join(os.path.dirname(metrics_store.get_db_path()), "spool", "metrics_spool.jsonl"),
+            max_attempts=int(os.getenv("METRICS_SPOOL_MAX_ATTEMPTS", "5")),
+        )
+
+    @property
+    def points_written(self) -> int:
+        return self.written
+
+    @property
+    def points_spilled(self) -> int:
+        return self.spilled
+
+    # Enfileira um ponto (não bloqueia)
+    def emit(self, run_id, execution_date, layer, metric_name, metric_value):
+        self._put([(run_id, execution_date, layer, metric_name, metric_value, datetime.now().isoformat(), uuid.uuid4().hex)])
+
+    # Enfileira todas as métricas de um dict
+    def emit_dict(self, run_id, execution_date, layer, metrics: dict):
+        created_at = datetime.now().isoformat()
+        self._put([
+            (run_id, execution_date, layer, name, value, created_at, uuid.uuid4().hex)
+            for name, value in (metrics or {}).items()
+        ])
+
+    def _deliver(self, rows: list):
+        metrics_store.save_metric_rows(rows)
+
+    def _encode(self, row) -> dict:
+        return {"row": list(row)}
+
+    # Banco travado por outro writer; outros erros (ex.: valor inválido) contam tentativa
+    def _is_transient(self, error: Exception) -> bool:
+        message = str(error).lower()
+        return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+    # Linhas antigas do spool são a lista da linha, sem envelope
+    def _decode(self, record):
+        return tuple(record["row"] if isinstance(record, dict) else record)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+# Cliente único por processo (recriado após fork); flush garantido no exit
+def get_metrics_client() -> MetricsClient:
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MetricsClient()
+            _client_pid = os.getpid()
+            atexit.register(_client.close)
+        return _client
+
+# Atalho: flush do cliente do processo (não cria cliente se não existir)
+def flush_metrics(timeout: float = 10.0) -> bool:
+    if _client is None or _client_pid != os.getpid():
+        return True
+    return _client.flush(timeout)
@@ -0,0 +1,237 @@
+# Scripts
+from src.monitoring import metrics_store
+
+# Bibliotecas
+import math
+from datetime import datetime
+
+# API de leitura do banco de métricas (SQLite).
+# Todas as consultas filtram por (layer, metric_name[, execution_date]) e usam o
+# índice idx_metrics_layer_name_date; os rollups diários ficam em
+# pipeline_metrics_daily e são atualizados de forma incremental.
+
+# Valor numérico da linha: durações em segundos, demais numéricos/bool como estão
+_VALUE_EXPR = "COALESCE(metric_duration_seconds, metric_value)"
+
+# Percentil com interpolação linear (mesmo critério do numpy.percentile)
+def percentile(values: list, pct: float):
+    data = sorted(v for v in values if v is not None)
+    if not data:
+        return None
+    if len(data) == 1:
+        return data[0]
+    rank = (len(data) - 1) * (pct / 100.0)
+    low, high = math.floor(rank), math.ceil(rank)
+    return data[low] + (data[high] - data[low]) * (rank - low)
+
+def _row_to_dict(row) -> dict:
+    run_id, execution_date, metric_type, value, text, created_at, tier = row
+    return {
+        "run_id": run_id,
+        "execution_date": execution_date,
+        "metric_type": metric_type,
+        "value": text if metric_type == "text" else value,
+        "text": text,
+        "created_at": created_at,
+        "tier": tier,
+    }
+
+_SELECT_COLS = f"run_id, execution_date, metric_type, {_VALUE_EXPR}, metric_text, created_at, 'raw'"
+
+# Último valor registrado de uma métrica
+def latest_metric(layer: str, metric_name: str):
+    rows = metrics_store.fetch_all(f"""
+        SELECT {_SELECT_COLS}
+          FROM pipeline_metrics
+         WHERE layer = ? AND metric_name = ?
+         ORDER BY execution_date DESC, id DESC
+         LIMIT 1
+    """, (layer, metric_name))
+    return _row_to_dict(rows[0]) if rows else None
+
+# Valores de uma métrica em um intervalo de execution_date (inclusivo).
+# Lê os tiers de retenção de forma transparente, por bucket:
+#   - bruto: as linhas que ainda existem;
+#   - horário: médias por hora das linhas brutas já removidas (o downsampling move
+#     as linhas, então bruto e horário nunca cobrem os mesmos pontos);
+#   - diário: o resíduo do rollup da data que não está mais nem no bruto nem no
+#     horário (tier horário expirado), com a média só desses pontos.
+# O campo "tier" indica a origem (raw / hourly / daily).
+def metric_range(layer: str, metric_name: str, start_date: str = None, end_date: str = None) -> list:
+    params = (layer, metric_name, start_date, end_date)
+    rows = metrics_store.fetch_all(f"""
+        SELECT {_SELECT_COLS}, 0 AS ord
+          FROM pipeline_metrics
+         WHERE layer = ? AND metric_name = ?
+           AND execution_date >= COALESCE(?, '')
+           AND execution_date <= COALESCE(?, '9999-12-31')
+
+        UNION ALL
+
+        SELECT NULL, h.execution_date, 'numeric', h.value_avg, NULL, h.bucket, 'hourly', 1
+          FROM pipeline_metrics_hourly h
+         WHERE h.layer = ? AND h.metric_name = ?
+           AND h.execution_date >= COALESCE(?, '')
+           AND h.execution_date <= COALESCE(?, '9999-12-31')
+
+        UNION ALL
+
+        SELECT NULL, d.execution_date, 'numeric',
+               (d.value_avg * d.value_count - COALESCE(r.total, 0) - COALESCE(h.total, 0))
+               / (d.value_count - COALESCE(r.n, 0) - COALESCE(h.n, 0)),
+               NULL, d.updated_at, 'daily', 2
+          FROM pipeline_metrics_daily d
+          LEFT JOIN (
+               -- linhas brutas já contadas no rollup (id <= último refresh)
+               SELECT execution_date, COUNT(*) AS n, SUM({_VALUE_EXPR}) AS total
+                 FROM pipeline_metrics
+                WHERE layer = ? AND metric_name = ? AND metric_type != 'text'
+                  AND {_VALUE_EXPR} IS NOT NULL
+                  AND id <= COALESCE((SELECT CAST(value AS INTEGER) FROM pipeline_metrics_meta
+                                       WHERE key = 'rollup_last_id'), 0)
+                GROUP BY execution_date
+          ) r ON r.execution_date = d.execution_date
+          LEFT JOIN (
+               SELECT execution_date, SUM(value_count) AS n, SUM(value_avg * value_count) AS total
+                 FROM pipeline_metrics_hourly
+                WHERE layer = ? AND metric_name = ?
+                GROUP BY execution_date
+          ) h ON h.execution_date = d.execution_date
+         WHERE d.layer = ? AND d.metric_name = ?
+           AND d.execution_date >= COALESCE(?, '')
+           AND d.execution_date <= COALESCE(?, '9999-12-31')
+           AND d.value_count - COALESCE(r.n, 0) - COALESCE(h.n, 0) > 0
+
+         ORDER BY 2, 8, 6
+    """, params * 2 + (layer, metric_name, layer, metric_name) + params)
+    return [_row_to_dict(r[:7]) for r in rows]
+
+# Filtro SQL que deixa só execuções da DAG (run_id sem prefixo de outra origem)
+def _dag_only_filter() -> str:
+    return "".join(
+        f" AND run_id NOT LIKE '{source}\\_%' ESCAPE '\\'" for source in metrics_store.NON_DAG_RUN_SOURCES
+    )
+
+# Últimos N valores numéricos de uma métrica (mais recente primeiro).
+# exclude_run_id ignora as linhas de uma execução (ex.: a execução atual);
+# dag_only ignora as execuções do runner e do backfill
+def last_values(layer: str, metric_name: str, last_n: int, exclude_run_id: str = None, dag_only: bool = False) -> list:
+    rows = metrics_store.fetch_all(f"""
+        SELECT {_VALUE_EXPR}
+          FROM pipeline_metrics
+         WHERE layer = ? AND metric_name = ? AND {_VALUE_EXPR} IS NOT NULL
+           AND (? IS NULL OR run_id IS NOT ?){_dag_only_filter() if dag_only else ""}
+         ORDER BY execution_date DESC, id DESC
+         LIMIT ?
+    """, (layer, metric_name, exclude_run_id, exclude_run_id, last_n))
+    return [r[0] for r in rows]
+
+# Percentil de uma métrica no intervalo (ou nas últimas N execuções)
+def metric_percentile(layer: str, metric_name: str, pct: float, start_date: str = None, end_date: str = None, last_n: int = None):
+    if last_n:
+        values = last_values(layer, metric_name, last_n)
+    else:
+        values = [
+            r["value"] for r in metric_range(layer, metric_name, start_date, end_date)
+            if r["metric_type"] != "text"
+        ]
+    return percentile(values, pct)
+
+# Junta o rollup existente com valores novos (count/min/max/avg exatos;
+# p50/p95 aproximados pela média ponderada dos percentis das duas partes)
+def _merge_rollup(existing: tuple, values: list) -> tuple:
+    count, value_min, value_max, value_avg, p50, p95 = existing
+    total = count + len(values)
+
+    def _weighted(old, new):
+        if old is None:
+            return new
+        return (old * count + new * len(values)) / total
+
+    return (
+        total,
+        min([value_min] + values) if value_min is not None else min(values),
+        max([value_max] + values) if value_max is not None else max(values),
+        _weighted(value_avg, sum(values) / len(values)),
+        _weighted(p50, percentile(values, 50)),
+        _weighted(p95, percentile(values, 95)),
+    )
+
+# Atualiza os rollups diários de forma incremental: só recalcula os grupos
+# (execution_date, layer, metric_name) que receberam linhas desde o último refresh.
+# Se todas as linhas já contadas no rollup ainda estão no bruto, recalcula a data
+# inteira; se parte delas já saiu do bruto (downsample_raw), junta as linhas novas
+# ao rollup existente em vez de sobrescrevê-lo com uma estatística parcial.
+def refresh_daily_rollups() -> int:
+    metrics_store.init_db()
+
+    def _refresh(conn):
+        row = conn.execute("SELECT value FROM pipeline_metrics_meta WHERE key = 'rollup_last_id'").fetchone()
+        last_id = int(row[0]) if row else 0
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM pipeline_metrics").fetchone()[0]
+        if max_id <= last_id:
+            return 0
+
+        groups = conn.execute("""
+            SELECT DISTINCT execution_date, layer, metric_name
+              FROM pipeline_metrics
+             WHERE id > ? AND id <= ? AND metric_type != 'text'
+        """, (last_id, max_id)).fetchall()
+
+        now = datetime.now().isoformat()
+        upserts = []
+        for execution_date, layer, metric_name in groups:
+            rows = conn.execute(f"""
+                SELECT id, {_VALUE_EXPR}
+                  FROM pipeline_metrics
+                 WHERE layer = ? AND metric_name = ? AND execution_date = ?
+                   AND metric_type != 'text' AND {_VALUE_EXPR} IS NOT NULL AND id <= ?
+            """, (layer, metric_name, execution_date, max_id)).fetchall()
+            new_values = [v for row_id, v in rows if row_id > last_id]
+            if not new_values:
+                continue
+
+            existing = conn.execute("""
+                SELECT value_count, value_min, value_max, value_avg, value_p50, value_p95
+                  FROM pipeline_metrics_daily
+                 WHERE execution_date = ? AND layer = ? AND metric_name = ?
+            """, (execution_date, layer, metric_name)).fetchone()
+            counted_in_raw = len(rows) - len(new_values)
+
+            if existing is None or counted_in_raw >= existing[0]:
+                values = [v for _, v in rows]
+                stats = (
+                    len(values), min(values), max(values), sum(values) / len(values),
+                    percentile(values, 50), percentile(values, 95),
+                )
+            else:
+                stats = _merge_rollup(existing, new_values)
+            upserts.append((execution_date, layer, metric_name) + stats + (now,))
+
+        conn.executemany("""
+            INSERT OR REPLACE INTO pipeline_metrics_daily (
+                execution_date, layer, metric_name, value_count,
+                value_min, value_max, value_avg, value_p50, value_p95, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, upserts)
+        conn.execute(
+            "INSERT OR REPLACE INTO pipeline_metrics_meta (key, value) VALUES ('rollup_last_id', ?)",
+            (str(max_id),),
+        )
+        return len(upserts)
+
+    return metrics_store.write_transaction(_refresh)
+
+# Rollups diários de uma métrica no intervalo
+def daily_rollups(layer: str, metric_name: str, start_date: str = None, end_date: str = None) -> list:
+    rows = metrics_store.fetch_all("""
+        SELECT execution_date, value_count, value_min, value_max, value_avg, value_p50, value_p95
+          FROM pipeline_metrics_daily
+         WHERE layer = ? AND metric_name = ?
+           AND execution_date >= COALESCE(?, '')
+           AND execution_date <= COALESCE(?, '9999-12-31')
+         ORDER BY execution_date
+    """, (layer, metric_name, start_date, end_date))
+    keys = ["execution_date", "count", "min", "max", "avg", "p50", "p95"]
+    return [dict(zip(keys, r)) for r in rows]
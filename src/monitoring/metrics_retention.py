@@ -0,0 +1,86 @@
+# Scripts
+from src.monitoring import metrics_store
+from src.monitoring.metrics_query import refresh_daily_rollups
+
+# Bibliotecas
+import os
+import time
+from datetime import datetime, timedelta
+
+# Retenção do banco de métricas em três tiers:
+#   - bruto (pipeline_metrics): mantido por METRICS_RAW_RETENTION_DAYS
+#   - horário (pipeline_metrics_hourly): min/max/avg/count por hora de gravação,
+#     mantido por METRICS_HOURLY_RETENTION_DAYS
+#   - diário (pipeline_metrics_daily): rollups por execution_date, sem expiração
+# metrics_query.metric_range lê os três tiers de forma transparente.
+
+# Agrega linhas brutas antigas no tier horário e remove as linhas brutas
+def downsample_raw(raw_days: int) -> dict:
+    cutoff = (datetime.now() - timedelta(days=raw_days)).isoformat()
+
+    def _downsample(conn):
+        conn.execute("""
+            INSERT INTO pipeline_metrics_hourly (
+                bucket, execution_date, layer, metric_name,
+                value_count, value_min, value_max, value_avg
+            )
+            SELECT substr(created_at, 1, 13) AS bucket, execution_date, layer, metric_name,
+                   COUNT(*), MIN(v), MAX(v), AVG(v)
+              FROM (
+                SELECT created_at, execution_date, layer, metric_name,
+                       COALESCE(metric_duration_seconds, metric_value) AS v
+                  FROM pipeline_metrics
+                 WHERE created_at < ? AND metric_type != 'text'
+                   AND COALESCE(metric_duration_seconds, metric_value) IS NOT NULL
+              )
+             GROUP BY bucket, execution_date, layer, metric_name
+            ON CONFLICT (layer, metric_name, execution_date, bucket) DO UPDATE SET
+                value_avg = (value_avg * value_count + excluded.value_avg * excluded.value_count)
+                            / (value_count + excluded.value_count),
+                value_count = value_count + excluded.value_count,
+                value_min = MIN(value_min, excluded.value_min),
+                value_max = MAX(value_max, excluded.value_max)
+        """, (cutoff,))
+        hourly_rows = conn.execute("SELECT changes()").fetchone()[0]
+        deleted = conn.execute("DELETE FROM pipeline_metrics WHERE created_at < ?", (cutoff,)).rowcount
+        return {"raw_rows_deleted": deleted, "hourly_rows_upserted": hourly_rows}
+
+    return metrics_store.write_transaction(_downsample)
+
+# Remove o tier horário mais antigo que a retenção (o tier diário continua)
+def expire_hourly(hourly_days: int) -> int:
+    cutoff = (datetime.now() - timedelta(days=hourly_days)).strftime("%Y-%m-%dT%H")
+    return metrics_store.write_transaction(
+        lambda conn: conn.execute("DELETE FROM pipeline_metrics_hourly WHERE bucket < ?", (cutoff,)).rowcount
+    )
+
+# Tarefa de manutenção completa: rollups -> downsampling -> expiração -> compactação
+def run_maintenance(raw_days: int = None, hourly_days: int = None, vacuum: bool = True) -> dict:
+    raw_days = raw_days if raw_days is not None else int(os.getenv("METRICS_RAW_RETENTION_DAYS", "90"))
+    hourly_days = hourly_days if hourly_days is not None else int(os.getenv("METRICS_HOURLY_RETENTION_DAYS", "365"))
+    if hourly_days < raw_days:
+        raise ValueError("METRICS_HOURLY_RETENTION_DAYS deve ser >= METRICS_RAW_RETENTION_DAYS")
+
+    start = time.time()
+    db_path = metrics_store.get_db_path()
+    db_size_before = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+
+    # Rollups diários primeiro: garantem que nada sai do bruto sem estar no tier diário
+    daily_groups = refresh_daily_rollups()
+    downsampled = downsample_raw(raw_days)
+    hourly_deleted = expire_hourly(hourly_days)
+    metrics_store.compact_db(vacuum=vacuum)
+
+    return {
+        "daily_groups_refreshed": daily_groups,
+        "raw_rows_deleted": downsampled["raw_rows_deleted"],
+        "hourly_rows_upserted": downsampled["hourly_rows_upserted"],
+        "hourly_rows_deleted": hourly_deleted,
+        "db_size_before": db_size_before,
+        "db_size_after": os.path.getsize(db_path),
+        "duration_seconds": round(time.time() - start, 3),
+    }
+
+
+if __name__ == "__main__":
+    print(run_maintenance())
@@ -1,68 +1,319 @@
 import sqlite3
 import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from dotenv import load_dotenv
 
 
-# Caminho do banco
-load_dotenv('.env')
-DATALAKE_PATH = os.getenv('DATALAKE_PATH', "/opt/airflow/datalake")
-DB_PATH = os.path.join(DATALAKE_PATH, "metrics", "metrics.db")
+# Caminho do banco: resolvido no primeiro uso (o import não lê o .env nem o
+# ambiente, o que deixa barato importar o módulo no parse das DAGs).
+# DB_PATH sobrescreve o caminho padrão (ex.: testes).
+DB_PATH = None
+_env_loaded = False
 
-# Cria o banco e a tabela caso não existam.
-def init_db():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS pipeline_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            run_id TEXT,
-            execution_date TEXT,
-            layer TEXT,
-            metric_name TEXT,
-            metric_value REAL,
-            created_at TEXT
-        )
-    """)
-
-    conn.commit()
-    conn.close()
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv('.env')
+        _env_loaded = True
 
-# Cria um identificador único para cada execução. Exemplo: 20260214_230638
-def generate_run_id():
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
+def get_db_path() -> str:
+    if DB_PATH:
+        return DB_PATH
+    _load_env()
+    datalake_path = os.getenv('DATALAKE_PATH', "/opt/airflow/datalake")
+    return os.path.join(datalake_path, "metrics", "metrics.db")
 
-# Insere uma métrica incrementalmente no banco.
-def save_metric(run_id, execution_date, layer, metric_name, metric_value):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        INSERT INTO pipeline_metrics (
-            run_id,
-            execution_date,
-            layer,
-            metric_name,
-            metric_value,
-            created_at
-        )
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
+# Tempo máximo (ms) esperando lock de outro processo antes de falhar
+def _busy_timeout_ms() -> int:
+    _load_env()
+    return int(os.getenv("METRICS_DB_BUSY_TIMEOUT_MS", "30000"))
+
+# Conexão persistente por processo (recriada após fork ou troca de DB_PATH)
+_conn = None
+_conn_key = None
+_lock = threading.RLock()
+_schema_ready = set()
+
+# OR IGNORE: um ponto reentregue pelo spool (mesmo point_uid) não duplica a linha
+_INSERT_SQL = """
+    INSERT OR IGNORE INTO pipeline_metrics (
         run_id,
         execution_date,
         layer,
         metric_name,
+        metric_type,
         metric_value,
-        datetime.now().isoformat()
-    ))
+        metric_text,
+        metric_duration_seconds,
+        created_at,
+        point_uid
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Colunas adicionadas ao schema original (migração via ALTER TABLE)
+_ADDED_COLUMNS = {
+    "metric_type": "TEXT",
+    "metric_text": "TEXT",
+    "metric_duration_seconds": "REAL",
+    "point_uid": "TEXT",
+}
+
+# Durações no formato de str(timedelta): "0:00:12.345678" ou "1 day, 0:00:01"
+_DURATION_RE = re.compile(r"^(?:(-?\d+) days?, )?(\d+):(\d{2}):(\d{2}(?:\.\d+)?)$")
+
+# Abre (ou reaproveita) a conexão do processo em modo WAL
+def _get_connection():
+    global _conn, _conn_key
+
+    db_path = get_db_path()
+    key = (db_path, os.getpid())
+    if _conn is not None and _conn_key == key:
+        return _conn
 
-    conn.commit()
-    conn.close()
+    busy_timeout_ms = _busy_timeout_ms()
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
 
-# Salva várias métricas de uma vez.
+    _conn, _conn_key = conn, key
+    return conn
+
+# Fecha a conexão persistente (útil em testes e ao final do processo)
+def close_db():
+    global _conn, _conn_key
+    with _lock:
+        if _conn is not None and _conn_key[1] == os.getpid():
+            _conn.close()
+        _conn, _conn_key = None, None
+        _schema_ready.clear()
+
+# Executa uma escrita (transação) com retry quando outro writer segura o lock além do busy_timeout
+def write_transaction(fn, attempts: int = 3):
+    for attempt in range(1, attempts + 1):
+        try:
+            with _lock:
+                conn = _get_connection()
+                with conn:
+                    return fn(conn)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e).lower() and "busy" not in str(e).lower():
+                raise
+            if attempt == attempts:
+                raise
+            time.sleep(0.1 * attempt)
+
+# Converte "H:MM:SS.f" (str de timedelta) em segundos; None se não for duração
+def parse_duration_seconds(value):
+    match = _DURATION_RE.match(str(value).strip())
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0) * 86400 + int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+# Classifica o valor da métrica: (metric_type, metric_value, metric_text, metric_duration_seconds)
+def _typed_value(value):
+    if value is None:
+        return "numeric", None, None, None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()  # escalares numpy
+    if isinstance(value, bool):
+        return "bool", float(value), None, None
+    if isinstance(value, (int, float)):
+        return "numeric", float(value), None, None
+    if isinstance(value, (list, tuple, set)):
+        return "text", None, ",".join(str(v) for v in value), None
+    if isinstance(value, dict):
+        return "text", None, json.dumps(value, default=str), None
+
+    text = str(value)
+    seconds = parse_duration_seconds(text)
+    if seconds is not None:
+        return "duration", None, text, seconds
+    return "text", None, text, None
+
+# Monta a linha tipada a partir de (run_id, execution_date, layer, metric_name, metric_value, created_at[, point_uid])
+def _typed_row(row):
+    run_id, execution_date, layer, metric_name, metric_value, created_at = row[:6]
+    point_uid = row[6] if len(row) > 6 else None
+    metric_type, numeric, text, duration = _typed_value(metric_value)
+    return (run_id, execution_date, layer, metric_name, metric_type, numeric, text, duration, created_at, point_uid)
+
+# Migra tabelas antigas (metric_value REAL guardando texto/duração) para o schema tipado
+def _migrate_typed_columns(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(pipeline_metrics)")}
+    for column, col_type in _ADDED_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE pipeline_metrics ADD COLUMN {column} {col_type}")
+
+    legacy = conn.execute(
+        "SELECT id, metric_value FROM pipeline_metrics WHERE metric_type IS NULL"
+    ).fetchall()
+    if legacy:
+        updates = []
+        for row_id, value in legacy:
+            metric_type, numeric, text, duration = _typed_value(value)
+            updates.append((metric_type, numeric, text, duration, row_id))
+        conn.executemany("""
+            UPDATE pipeline_metrics
+               SET metric_type = ?, metric_value = ?, metric_text = ?, metric_duration_seconds = ?
+             WHERE id = ?
+        """, updates)
+
+# Cria o banco e as tabelas caso não existam (DDL roda uma vez por processo).
+def init_db():
+    db_path = get_db_path()
+    if db_path in _schema_ready:
+        return
+
+    def _ddl(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT,
+                execution_date TEXT,
+                layer TEXT,
+                metric_name TEXT,
+                metric_value REAL,
+                created_at TEXT,
+                metric_type TEXT,
+                metric_text TEXT,
+                metric_duration_seconds REAL,
+                point_uid TEXT
+            )
+        """)
+        _migrate_typed_columns(conn)
+        # pontos do cliente assíncrono têm uid (NULL nas gravações diretas, que não se repetem)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_point_uid ON pipeline_metrics(point_uid)")
+
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_metrics_layer_name_date
+            ON pipeline_metrics(layer, metric_name, execution_date)
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_metrics_run_id ON pipeline_metrics(run_id)")
+
+        # Rollups diários pré-calculados (ver metrics_query.refresh_daily_rollups)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_metrics_daily (
+                execution_date TEXT NOT NULL,
+                layer TEXT NOT NULL,
+                metric_name TEXT NOT NULL,
+                value_count INTEGER NOT NULL,
+                value_min REAL,
+                value_max REAL,
+                value_avg REAL,
+                value_p50 REAL,
+                value_p95 REAL,
+                updated_at TEXT,
+                PRIMARY KEY (execution_date, layer, metric_name)
+            )
+        """)
+        # Tier horário (dados brutos antigos agregados - ver metrics_retention)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_metrics_hourly (
+                bucket TEXT NOT NULL,
+                execution_date TEXT NOT NULL,
+                layer TEXT NOT NULL,
+                metric_name TEXT NOT NULL,
+                value_count INTEGER NOT NULL,
+                value_min REAL,
+                value_max REAL,
+                value_avg REAL,
+                PRIMARY KEY (layer, metric_name, execution_date, bucket)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_metrics_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+
+    write_transaction(_ddl)
+    _schema_ready.add(db_path)
+
+# Compacta o banco: checkpoint do WAL e VACUUM (não pode rodar dentro de transação)
+def compact_db(vacuum: bool = True):
+    init_db()
+    with _lock:
+        conn = _get_connection()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if vacuum:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+# Leitura (SELECT) na conexão do processo
+def fetch_all(sql: str, params=()) -> list:
+    init_db()
+    with _lock:
+        return _get_connection().execute(sql, params).fetchall()
+
+# Origem das execuções que não são da DAG (PIPELINE_RUN_SOURCE). O run_id delas
+# leva a origem como prefixo (ex.: backfill_20260214_230638), o que permite tirá-las
+# das baselines de performance: o backfill roda muitas datas em paralelo e o
+# runner mede o pico de RSS acumulado de várias etapas no mesmo processo.
+NON_DAG_RUN_SOURCES = ("runner", "backfill")
+
+def run_source() -> str:
+    return str(os.getenv("PIPELINE_RUN_SOURCE", "dag")).strip().lower() or "dag"
+
+# Define a origem das execuções dentro do bloco (restaura o valor anterior no fim)
+@contextmanager
+def metrics_run_source(source: str):
+    previous = os.environ.get("PIPELINE_RUN_SOURCE")
+    os.environ["PIPELINE_RUN_SOURCE"] = source
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("PIPELINE_RUN_SOURCE", None)
+        else:
+            os.environ["PIPELINE_RUN_SOURCE"] = previous
+
+# Cria um identificador único para cada execução. Exemplo: 20260214_230638
+# (fora da DAG: <origem>_20260214_230638)
+def generate_run_id():
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    source = run_source()
+    return run_id if source == "dag" else f"{source}_{run_id}"
+
+# Insere uma métrica incrementalmente no banco.
+def save_metric(run_id, execution_date, layer, metric_name, metric_value):
+    save_metrics_dict(run_id, execution_date, layer, {metric_name: metric_value})
+
+# Emissão assíncrona (fila + thread de flush) habilitada por METRICS_ASYNC=true
+def metrics_async_enabled() -> bool:
+    return str(os.getenv("METRICS_ASYNC", "false")).strip().lower() == "true"
+
+# Grava linhas já montadas: (run_id, execution_date, layer, metric_name, metric_value, created_at[, point_uid]).
+# Linhas com point_uid já gravado são ignoradas.
+def save_metric_rows(rows: list):
+    if not rows:
+        return
+    init_db()
+    typed = [_typed_row(row) for row in rows]
+    write_transaction(lambda conn: conn.executemany(_INSERT_SQL, typed))
+
+# Salva várias métricas de uma vez (um único executemany / uma transação).
+# Com METRICS_ASYNC=true apenas enfileira e retorna (flush em background).
 def save_metrics_dict(run_id, execution_date, layer, metrics: dict):
-    for name, value in metrics.items():
-        save_metric(run_id, execution_date, layer, name, value)
+    if not metrics:
+        return
+
+    if metrics_async_enabled():
+        from src.monitoring.metrics_client import get_metrics_client
+        get_metrics_client().emit_dict(run_id, execution_date, layer, metrics)
+        return
+
+    created_at = datetime.now().isoformat()
+    save_metric_rows([
+        (run_id, execution_date, layer, name, value, created_at)
+        for name, value in metrics.items()
+    ])
@@ -0,0 +1,147 @@
+# Bibliotecas
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+# Benchmark do custo de parse das DAGs e de import dos módulos de src.
+#
+# Cada medição roda em um processo Python novo (sem cache em sys.modules). Para
+# arquivos de DAG, o Airflow é importado antes do cronômetro, como acontece no
+# processo de parse do scheduler: o tempo medido é só o do arquivo da DAG.
+# Também lista quais módulos pesados foram carregados no import.
+#
+# Uso:
+#   python -m src.monitoring.parse_benchmark                      # DAGs + src
+#   python -m src.monitoring.parse_benchmark --compare-ref HEAD~1  # antes x depois
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEAVY_MODULES = ("pandas", "pyarrow", "numpy", "psycopg2", "requests", "dotenv")
+
+DEFAULT_DAGS = ("dags/brewery_pipeline_dag.py", "dags/brewery_maintenance_dag.py")
+DEFAULT_MODULES = (
+    "src.monitoring.metrics_store",
+    "src.monitoring.metrics_client",
+    "src.monitoring.audit_store",
+    "src.monitoring.audit_emitter",
+    "src.monitoring.run_manifest",
+)
+
+# Importado antes do cronômetro nos arquivos de DAG (já carregado no scheduler)
+_AIRFLOW_PRELOAD = """
+try:
+    import airflow
+    from airflow import DAG
+    from airflow.models import Variable
+    from airflow.operators.python import PythonOperator
+    from airflow.operators.bash import BashOperator
+    from airflow.operators.email import EmailOperator
+except ImportError:
+    pass
+"""
+
+_PROBE = """
+import importlib, importlib.util, json, sys, time
+sys.path.insert(0, {root!r})
+{preload}
+before = set(sys.modules)
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+loaded = set(sys.modules) - before
+print(json.dumps({{
+    "seconds": elapsed,
+    "modules": len(loaded),
+    "heavy": sorted(m for m in {heavy!r} if m in loaded),
+}}))
+"""
+
+_LOAD_FILE = """
+spec = importlib.util.spec_from_file_location("bench_target", {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+"""
+
+_LOAD_MODULE = "importlib.import_module({name!r})"
+
+
+# Roda o probe em um processo novo e devolve o JSON medido
+def _probe(load: str, preload: str = "") -> dict:
+    code = _PROBE.format(root=REPO_ROOT, preload=preload, load=load, heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["erro"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+# Mede um alvo `repeat` vezes (mediana do tempo)
+def measure(label: str, load: str, preload: str = "", repeat: int = 5) -> dict:
+    runs = [_probe(load, preload) for _ in range(repeat)]
+    errors = [r["error"] for r in runs if "error" in r]
+    if errors:
+        return {"target": label, "error": errors[0]}
+    return {
+        "target": label,
+        "median_ms": round(statistics.median(r["seconds"] for r in runs) * 1000, 2),
+        "modules": runs[0]["modules"],
+        "heavy": runs[0]["heavy"],
+    }
+
+def measure_dag_file(path: str, label: str = None, repeat: int = 5) -> dict:
+    return measure(label or path, _LOAD_FILE.format(path=os.path.join(REPO_ROOT, path)), _AIRFLOW_PRELOAD, repeat)
+
+def measure_module(name: str, repeat: int = 5) -> dict:
+    return measure(name, _LOAD_MODULE.format(name=name), repeat=repeat)
+
+# Versão de um arquivo em outra referência do git (para comparar antes x depois)
+def _file_at_ref(ref: str, path: str) -> str:
+    content = subprocess.run(
+        ["git", "show", f"{ref}:{path}"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    # fora da pasta dags/ para o scheduler não carregar a cópia
+    fd, tmp_path = tempfile.mkstemp(suffix=".py", prefix="dag_at_ref_")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    return tmp_path
+
+def run_benchmark(dag_files=DEFAULT_DAGS, modules=DEFAULT_MODULES, repeat: int = 5, compare_ref: str = None) -> list:
+    results = []
+    for path in dag_files:
+        if compare_ref:
+            tmp_path = _file_at_ref(compare_ref, path)
+            try:
+                results.append(measure_dag_file(tmp_path, f"{path} @ {compare_ref}", repeat))
+            finally:
+                os.remove(tmp_path)
+        results.append(measure_dag_file(path, repeat=repeat))
+    for name in modules:
+        results.append(measure_module(name, repeat))
+    return results
+
+def _print_table(results: list):
+    print(f"{'alvo':<55} {'mediana (ms)':>12} {'módulos':>8}  pesados")
+    for r in results:
+        if "error" in r:
+            print(f"{r['target']:<55} {'erro':>12} {'-':>8}  {r['error']}")
+            continue
+        print(f"{r['target']:<55} {r['median_ms']:>12} {r['modules']:>8}  {', '.join(r['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de parse das DAGs e import dos módulos de src")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare-ref", default=None, help="referência git para comparar (ex.: HEAD~1)")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(repeat=args.repeat, compare_ref=args.compare_ref)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
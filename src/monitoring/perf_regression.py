@@ -0,0 +1,138 @@
+# Scripts
+from src.monitoring.metrics_query import last_values
+from src.monitoring.metrics_store import parse_duration_seconds
+
+# Bibliotecas
+import statistics
+
+# Detecção de regressão de performance por etapa com baselines móveis.
+# Para cada métrica, a baseline são as últimas N execuções da DAG no banco de
+# métricas (sem a execução atual nem as do runner/backfill): mediana e MAD (desvio absoluto mediano, escalado para
+# ser comparável ao desvio padrão). A execução atual regride quando passa de
+#   mediana + fator * MAD   (métricas em que maior é pior: duração, latência)
+#   mediana - fator * MAD   (métricas em que menor é pior: registros/s)
+# e a variação relativa é de pelo menos `min_relative_change` (evita alarmes
+# quando o histórico é muito estável e o MAD fica perto de zero).
+
+# (layer, métrica, "higher" se maior é pior / "lower" se menor é pior)
+PERF_METRICS = [
+    ("bronze", "ingestion_duration", "higher"),
+    ("bronze", "api_latency_ms", "higher"),
+    ("bronze", "records_per_second", "lower"),
+    ("silver", "transform_duration", "higher"),
+    ("silver", "records_per_second", "lower"),
+    ("gold", "transform_duration", "higher"),
+    ("gold", "records_per_second", "lower"),
+    ("bronze", "peak_rss_mb", "higher"),
+    ("silver", "peak_rss_mb", "higher"),
+    ("gold", "peak_rss_mb", "higher"),
+]
+
+# Constante que torna o MAD um estimador do desvio padrão para dados normais
+_MAD_SCALE = 1.4826
+
+
+def _seconds(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return parse_duration_seconds(value)
+
+def _rate(records, seconds):
+    if records is None or not seconds:
+        return None
+    return float(records) / seconds
+
+# Valores da execução atual a partir dos retornos (XCom) de cada etapa
+def current_values(bronze: dict = None, silver: dict = None, gold: dict = None) -> dict:
+    # etapas puladas (skip-if-unchanged) não foram medidas nesta execução
+    bronze, silver, gold = [{} if (stage or {}).get("skipped") else (stage or {}) for stage in (bronze, silver, gold)]
+
+    bronze_sec = _seconds(bronze.get("ingestion_duration"))
+    silver_sec = _seconds(silver.get("transform_duration"))
+    gold_sec = _seconds(gold.get("duration"))
+
+    values = {
+        ("bronze", "ingestion_duration"): bronze_sec,
+        ("bronze", "api_latency_ms"): bronze.get("api_latency_ms"),
+        ("bronze", "records_per_second"): _rate(bronze.get("total_records"), bronze_sec),
+        ("silver", "transform_duration"): silver_sec,
+        ("silver", "records_per_second"): _rate(silver.get("records"), silver_sec),
+        ("gold", "transform_duration"): gold_sec,
+        ("gold", "records_per_second"): _rate(gold.get("records_received"), gold_sec),
+        ("bronze", "peak_rss_mb"): bronze.get("peak_rss_mb"),
+        ("silver", "peak_rss_mb"): silver.get("peak_rss_mb"),
+        ("gold", "peak_rss_mb"): gold.get("peak_rss_mb"),
+    }
+    return {k: v for k, v in values.items() if v is not None}
+
+# Mediana e MAD das últimas `last_n` execuções da DAG (None se histórico insuficiente)
+def rolling_baseline(layer: str, metric_name: str, last_n: int = 20, min_history: int = 5, exclude_run_id: str = None):
+    history = last_values(layer, metric_name, last_n, exclude_run_id=exclude_run_id, dag_only=True)
+    if len(history) < min_history:
+        return None
+    median = statistics.median(history)
+    mad = statistics.median(abs(v - median) for v in history) * _MAD_SCALE
+    return {"median": median, "mad": mad, "samples": len(history)}
+
+# Compara a execução atual com as baselines de cada métrica de PERF_METRICS.
+# `exclude_run_ids` ({layer: run_id}) tira a execução atual do histórico.
+def check_regressions(
+    current: dict,
+    last_n: int = 20,
+    factor: float = 3.0,
+    min_relative_change: float = 0.25,
+    min_history: int = 5,
+    exclude_run_ids: dict = None,
+) -> dict:
+    exclude_run_ids = exclude_run_ids or {}
+    regressions, checked, skipped = [], [], []
+
+    for layer, metric_name, worse in PERF_METRICS:
+        value = current.get((layer, metric_name))
+        if value is None:
+            skipped.append(f"{layer}.{metric_name}: sem valor na execução atual")
+            continue
+
+        baseline = rolling_baseline(layer, metric_name, last_n, min_history, exclude_run_ids.get(layer))
+        if baseline is None:
+            skipped.append(f"{layer}.{metric_name}: histórico insuficiente (< {min_history} execuções)")
+            continue
+
+        median, mad = baseline["median"], baseline["mad"]
+        if worse == "higher":
+            limit = max(median + factor * mad, median * (1 + min_relative_change))
+            regressed = value > limit
+        else:
+            limit = min(median - factor * mad, median * (1 - min_relative_change))
+            regressed = value < limit
+
+        entry = {
+            "stage": layer,
+            "metric": metric_name,
+            "value": round(value, 4),
+            "median": round(median, 4),
+            "mad": round(mad, 4),
+            "limit": round(limit, 4),
+            "change_pct": round((value - median) / median * 100, 2) if median else None,
+            "samples": baseline["samples"],
+        }
+        checked.append(entry)
+        if regressed:
+            regressions.append(entry)
+
+    return {
+        "regressions": regressions,
+        "checked": checked,
+        "skipped": skipped,
+        "slowed_stages": sorted({r["stage"] for r in regressions}),
+    }
+
+# Mensagem legível de uma regressão (usada no quality check)
+def describe_regression(entry: dict) -> str:
+    change = f"{entry['change_pct']:+.1f}%" if entry["change_pct"] is not None else "n/a"
+    return (
+        f"Regressão de performance em {entry['stage']}.{entry['metric']}: "
+        f"{entry['value']} vs mediana {entry['median']} ({change}, limite {entry['limit']})"
+    )
@@ -0,0 +1,152 @@
+# Bibliotecas
+import os
+import re
+import json
+import time
+import shutil
+from collections.abc import Mapping
+
+# Manifesto da execução: o resultado completo de cada etapa vai para um arquivo
+# JSON no datalake e o XCom recebe só um resumo pequeno com a referência
+# ("manifest"). Isso mantém pequenos o banco de metadados do Airflow e o
+# audit.dag_runs.metrics (que guarda os resumos).
+#
+#   DATALAKE_PATH/_manifests/<dag_id>/<run_id>/<etapa>.json
+#
+# lazy_result() embrulha o resumo vindo do XCom: campos do resumo são lidos
+# direto; qualquer outro campo carrega o manifesto (uma vez) na primeira leitura.
+# Módulo leve (só stdlib): importado pelas tasks da DAG.
+
+# Campos do resumo por etapa: o que quality_checks, perf_regression e
+# audit.refresh_stage_runs leem em toda execução
+SUMMARY_KEYS = {
+    "bronze": (
+        "success", "skipped", "run_id", "total_records", "pages_processed",
+        "ingestion_duration", "ingestion_date", "api_latency_ms", "peak_rss_mb",
+    ),
+    "silver": (
+        "success", "skipped", "run_id", "records", "transform_duration", "transform_date",
+        "null_name", "null_brewery_type", "null_city_state", "duplicate_id",
+        "invalid_brewery_type", "fuzzy_duplicate_pct", "schema_changed", "peak_rss_mb", "memory_mode",
+    ),
+    "gold": (
+        "success", "skipped", "run_id", "records_received", "records_gold", "duration", "transform_date",
+        "peak_rss_mb", "memory_mode",
+    ),
+    "gold_timeseries": (
+        "success", "run_id", "partitions_read", "series_dates", "duration", "transform_date",
+    ),
+}
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._=-]")
+
+
+# Serializa escalares numpy (.item()) e qualquer outro valor como string
+def _json_default(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+def manifests_root() -> str:
+    return os.path.join(os.getenv("DATALAKE_PATH", "/opt/airflow/datalake"), "_manifests")
+
+# run_id do Airflow tem ":" e "+" (ex.: scheduled__2026-02-17T15:00:00+00:00)
+def _safe(name: str) -> str:
+    return _UNSAFE_CHARS.sub("_", str(name))
+
+def manifest_path(dag_id: str, run_id: str, stage: str) -> str:
+    return os.path.join(manifests_root(), _safe(dag_id), _safe(run_id), f"{_safe(stage)}.json")
+
+# Grava o resultado completo da etapa (tmp + rename) e retorna o caminho
+def write_run_manifest(dag_id: str, run_id: str, stage: str, result: dict) -> str:
+    path = manifest_path(dag_id, run_id, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, default=_json_default)
+    os.replace(tmp_path, path)
+    return path
+
+def load_run_manifest(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Resumo para o XCom: campos de SUMMARY_KEYS (None quando a etapa não retornou o campo,
+# para a leitura não cair no manifesto) + referência do manifesto
+def slim_result(stage: str, result: dict, path: str) -> dict:
+    summary = {key: result.get(key) for key in SUMMARY_KEYS.get(stage, ("success",))}
+    summary["manifest"] = path
+    return json.loads(json.dumps(summary, default=_json_default))
+
+# Grava o manifesto e devolve o resumo (atalho usado pelas tasks)
+def publish_stage_result(dag_id: str, run_id: str, stage: str, result: dict) -> dict:
+    return slim_result(stage, result, write_run_manifest(dag_id, run_id, stage, result))
+
+
+class LazyStageResult(Mapping):
+    """Resumo do XCom que carrega o manifesto completo só quando um campo fora do resumo é lido."""
+
+    def __init__(self, summary: dict):
+        self._summary = dict(summary)
+        self._full = None
+
+    def _load(self) -> dict:
+        if self._full is None:
+            path = self._summary.get("manifest")
+            full = load_run_manifest(path) if path and os.path.exists(path) else {}
+            full.update(self._summary)
+            self._full = full
+        return self._full
+
+    @property
+    def loaded(self) -> bool:
+        return self._full is not None
+
+    def __getitem__(self, key):
+        if key in self._summary:
+            return self._summary[key]
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    # verdade/falsidade pelo resumo: `if not result` não lê o arquivo
+    def __bool__(self):
+        return bool(self._summary)
+
+    def summary(self) -> dict:
+        return dict(self._summary)
+
+    def to_dict(self) -> dict:
+        return dict(self._load())
+
+
+# Embrulha o valor do XCom. Resultados antigos (dict completo, sem "manifest")
+# continuam funcionando; None continua None.
+def lazy_result(value):
+    if value is None:
+        return None
+    if isinstance(value, LazyStageResult):
+        return value
+    return LazyStageResult(value)
+
+# Remove manifestos de execuções mais antigas que `retention_days` (pela data de modificação)
+def purge_run_manifests(retention_days: int = None) -> int:
+    retention_days = retention_days if retention_days is not None else int(os.getenv("RUN_MANIFEST_RETENTION_DAYS", "30"))
+    root = manifests_root()
+    if not os.path.isdir(root):
+        return 0
+
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+    for dag_id in os.listdir(root):
+        dag_folder = os.path.join(root, dag_id)
+        if not os.path.isdir(dag_folder):
+            continue
+        for run_id in os.listdir(dag_folder):
+            run_folder = os.path.join(dag_folder, run_id)
+            if os.path.isdir(run_folder) and os.path.getmtime(run_folder) < cutoff:
+                shutil.rmtree(run_folder, ignore_errors=True)
+                removed += 1
+    return removed
@@ -0,0 +1,268 @@
+# Bibliotecas
+import os
+import json
+import queue
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+# Base dos escritores em background com spool (MetricsClient, AuditEmitter).
+#
+# Os registros entram em uma fila em memória; uma thread agrupa em lotes (por
+# tamanho ou por tempo) e entrega com _deliver(). Se a entrega falhar, o lote vai
+# para um arquivo de spool (JSON lines, append-only) que é reprocessado depois da
+# próxima entrega bem-sucedida. A entrega precisa ser idempotente: um lote pode
+# ser entregue de novo.
+#
+# O spool é compartilhado entre processos (tasks, pool do backfill): o append, o
+# rename para .replaying e a remoção rodam sob um lock de arquivo (fcntl.flock em
+# <spool>.lock), além do lock entre as threads do processo.
+#
+# No reprocessamento, um lote que falha com erro não transitório (_is_transient)
+# é reentregue registro a registro; cada registro que falha conta uma tentativa
+# (campo "attempts" da linha) e, após max_attempts, vai para <spool>.quarantine
+# em vez de voltar ao spool para sempre.
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Serializa escalares numpy (.item()) e qualquer outro valor como string
+def _json_default(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class SpoolingWriter:
+
+    thread_name = "spool-writer"
+    # flush()/close() que expiram mandam o pendente para o spool (não seguram a task)
+    spill_on_timeout = False
+
+    def __init__(self, batch_size: int, flush_interval: float, spool_path: str, max_attempts: int = 5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._inflight = []
+        self._closed = False
+        self.written = 0
+        self.spilled = 0
+        self.quarantined = 0
+
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    # --- Pontos de extensão ---
+
+    # Entrega um lote (lança exceção se o destino estiver indisponível)
+    def _deliver(self, items: list):
+        raise NotImplementedError
+
+    # Item <-> dict de uma linha do spool
+    def _encode(self, item) -> dict:
+        raise NotImplementedError
+
+    def _decode(self, record):
+        raise NotImplementedError
+
+    # Erro de disponibilidade do destino (lock, conexão): não conta tentativa
+    def _is_transient(self, error: Exception) -> bool:
+        return False
+
+    # --- Fila e thread ---
+
+    # Depois do close() (ex.: durante o atexit) grava direto para não perder registros
+    def _put(self, items: list):
+        if self._closed:
+            self._write_batch(items)
+            return
+        for item in items:
+            self._queue.put_nowait(item)
+
+    # Espera a fila esvaziar (True se tudo foi entregue ou enviado ao spool a tempo)
+    def flush(self, timeout: float = None) -> bool:
+        done = threading.Event()
+        self._queue.put(done)
+        if done.wait(timeout):
+            return True
+        if self.spill_on_timeout:
+            self._spill_pending()
+        return False
+
+    # Flush final e encerramento da thread
+    def close(self, timeout: float = 10.0):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive() and self.spill_on_timeout:
+            self._spill_pending()
+
+    # Loop da thread: acumula até batch_size ou flush_interval
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+
+            # Chegou ao tamanho do lote, ao tempo limite, a um flush() ou ao encerramento
+            if batch:
+                self._inflight = batch
+                self._write_batch(batch)
+                self._inflight = []
+                batch = []
+            deadline = time.monotonic() + self.flush_interval
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    # Entrega um lote; se o destino estiver indisponível, envia para o spool
+    def _write_batch(self, items: list):
+        try:
+            self._deliver(items)
+            self.written += len(items)
+        except Exception as e:
+            logger.warning("%s indisponível, %d registro(s) enviados ao spool: %s", self.thread_name, len(items), e)
+            self._spill(items)
+            return
+        self.replay_spool()
+
+    # Tira da fila o que ainda não foi entregue (e o lote em andamento) e grava no spool.
+    # O lote em andamento pode acabar entregue duas vezes: a reentrega é idempotente.
+    def _spill_pending(self):
+        pending = list(self._inflight)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                pending.append(item)
+            elif isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                self._queue.put(_STOP)
+                break
+        if pending:
+            self._spill(pending)
+
+    # --- Spool ---
+
+    # Lock entre threads + lock de arquivo entre processos
+    @contextmanager
+    def _spool_guard(self):
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.spool_path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # Grava (item, tentativas) em JSON lines; "attempts" só aparece depois de uma falha
+    def _write_lines(self, path: str, entries: list, mode: str = "a"):
+        with open(path, mode, encoding="utf-8") as f:
+            for item, attempts in entries:
+                record = self._encode(item)
+                if attempts:
+                    record["attempts"] = attempts
+                f.write(json.dumps(record, default=_json_default) + "\n")
+
+    def _read_lines(self, path: str) -> list:
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    attempts = record.pop("attempts", 0) if isinstance(record, dict) else 0
+                    entries.append((self._decode(record), attempts))
+        return entries
+
+    # Append no arquivo de spool (uma linha JSON por registro)
+    def _spill(self, items: list):
+        with self._spool_guard():
+            self._write_lines(self.spool_path, [(item, 0) for item in items])
+        self.spilled += len(items)
+
+    # Reprocessa o spool (se existir); chamado após cada entrega bem-sucedida.
+    # Retorna quantos registros foram entregues.
+    def replay_spool(self) -> int:
+        replay_path = f"{self.spool_path}.replaying"
+        if not os.path.exists(self.spool_path) and not os.path.exists(replay_path):
+            return 0
+
+        with self._spool_guard():
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spool_path):
+                    # outro processo reprocessou enquanto esperávamos o lock
+                    return 0
+                os.replace(self.spool_path, replay_path)
+
+            entries = self._read_lines(replay_path)
+            try:
+                self._deliver([item for item, _ in entries])
+            except Exception as e:
+                if self._is_transient(e):
+                    # continua no arquivo .replaying para a próxima tentativa
+                    return 0
+                delivered = self._replay_one_by_one(replay_path, entries)
+            else:
+                os.remove(replay_path)
+                delivered = len(entries)
+            self.written += delivered
+            return delivered
+
+    # Reentrega registro a registro: separa os registros com problema do resto do lote.
+    # Os que falham voltam ao .replaying com mais uma tentativa ou vão para a quarentena.
+    def _replay_one_by_one(self, replay_path: str, entries: list) -> int:
+        delivered = 0
+        retry, quarantine = [], []
+        for item, attempts in entries:
+            try:
+                self._deliver([item])
+                delivered += 1
+                continue
+            except Exception as e:
+                if not self._is_transient(e):
+                    attempts += 1
+                error = e
+            (quarantine if attempts >= self.max_attempts else retry).append((item, attempts))
+
+        if quarantine:
+            self._write_lines(f"{self.spool_path}.quarantine", quarantine)
+            self.quarantined += len(quarantine)
+            logger.warning("%s: %d registro(s) do spool em quarentena após %d tentativas: %s",
+                           self.thread_name, len(quarantine), self.max_attempts, error)
+        if retry:
+            tmp_path = f"{replay_path}.tmp"
+            self._write_lines(tmp_path, retry, mode="w")
+            os.replace(tmp_path, replay_path)
+        else:
+            os.remove(replay_path)
+        return delivered
@@ -25,8 +25,36 @@ CREATE INDEX IF NOT EXISTS idx_dag_runs_status ON audit.dag_runs(status);
 CREATE INDEX IF NOT EXISTS idx_dag_runs_exec_date ON audit.dag_runs(execution_date);
 
 -- Tabela filha: task_events
+-- Particionada por mês em event_time (RANGE). Cada partição se chama
+-- audit.task_events_YYYY_MM; eventos fora das partições existentes caem em
+-- audit.task_events_default. A chave primária inclui event_time (exigência do
+-- particionamento declarativo).
+
+BEGIN;
+
+-- Migração: bancos criados antes do particionamento têm task_events como tabela
+-- comum. Ela é renomeada para task_events_legacy e copiada mais abaixo.
+DO $$
+DECLARE
+  seq TEXT;
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+     WHERE n.nspname = 'audit' AND c.relname = 'task_events' AND c.relkind = 'r'
+  ) THEN
+    seq := pg_get_serial_sequence('audit.task_events', 'id');
+    ALTER TABLE audit.task_events RENAME TO task_events_legacy;
+    IF seq IS NOT NULL THEN
+      EXECUTE format('ALTER SEQUENCE %s RENAME TO task_events_legacy_id_seq', seq);
+    END IF;
+    DROP INDEX IF EXISTS audit.idx_task_events_dag_run;
+    DROP INDEX IF EXISTS audit.idx_task_events_task_id;
+    DROP INDEX IF EXISTS audit.idx_task_events_event_time;
+  END IF;
+END $$;
+
 CREATE TABLE IF NOT EXISTS audit.task_events (
-  id          BIGSERIAL PRIMARY KEY,
+  id          BIGSERIAL,
   dag_id      TEXT NOT NULL,
   run_id      TEXT NOT NULL,
   task_id     TEXT NOT NULL,
@@ -37,12 +65,134 @@ CREATE TABLE IF NOT EXISTS audit.task_events (
   map_index   INTEGER NULL,
   log_url     TEXT NULL,
   event_time  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  event_uid   TEXT NULL,
+  CONSTRAINT task_events_pk PRIMARY KEY (id, event_time),
   CONSTRAINT task_events_fk
     FOREIGN KEY (dag_id, run_id)
     REFERENCES audit.dag_runs(dag_id, run_id)
     ON DELETE CASCADE
-);
+) PARTITION BY RANGE (event_time);
+
+-- event_uid: identificador gerado pelo emissor assíncrono (audit_emitter) para
+-- reenvios idempotentes do spool (bancos anteriores recebem a coluna aqui)
+ALTER TABLE audit.task_events ADD COLUMN IF NOT EXISTS event_uid TEXT NULL;
+
+CREATE TABLE IF NOT EXISTS audit.task_events_default
+  PARTITION OF audit.task_events DEFAULT;
 
+-- Índices (criados no pai e propagados para cada partição).
+-- BRIN em event_time: os eventos chegam em ordem de tempo, então o índice fica
+-- minúsculo e atende bem as varreduras por janela de tempo.
+CREATE INDEX IF NOT EXISTS idx_task_events_event_time_brin ON audit.task_events USING BRIN (event_time);
 CREATE INDEX IF NOT EXISTS idx_task_events_dag_run ON audit.task_events(dag_id, run_id);
 CREATE INDEX IF NOT EXISTS idx_task_events_task_id ON audit.task_events(task_id);
-CREATE INDEX IF NOT EXISTS idx_task_events_event_time ON audit.task_events(event_time);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_task_events_event_uid ON audit.task_events(event_uid, event_time);
+
+-- Cria as partições mensais de from_date (padrão: mês atual) até months_ahead
+-- meses à frente. Retorna quantas partições foram criadas.
+CREATE OR REPLACE FUNCTION audit.ensure_task_event_partitions(
+  months_ahead INTEGER DEFAULT 3,
+  from_date DATE DEFAULT NULL
+) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  month_start DATE := date_trunc('month', COALESCE(from_date, now()::date))::date;
+  last_month  DATE := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+  month_end   DATE;
+  part_name   TEXT;
+  created     INTEGER := 0;
+BEGIN
+  WHILE month_start <= last_month LOOP
+    part_name := format('task_events_%s', to_char(month_start, 'YYYY_MM'));
+    month_end := (month_start + interval '1 month')::date;
+    IF to_regclass(format('audit.%I', part_name)) IS NULL THEN
+      IF EXISTS (
+        SELECT 1 FROM audit.task_events_default
+         WHERE event_time >= month_start AND event_time < month_end
+      ) THEN
+        -- a partição default já recebeu eventos desse mês: move-os antes do ATTACH
+        EXECUTE format(
+          'CREATE TABLE audit.%I (LIKE audit.task_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+          part_name
+        );
+        EXECUTE format(
+          'WITH moved AS (DELETE FROM audit.task_events_default WHERE event_time >= %L AND event_time < %L RETURNING *)
+           INSERT INTO audit.%I SELECT * FROM moved',
+          month_start, month_end, part_name
+        );
+        EXECUTE format(
+          'ALTER TABLE audit.task_events ATTACH PARTITION audit.%I FOR VALUES FROM (%L) TO (%L)',
+          part_name, month_start, month_end
+        );
+      ELSE
+        EXECUTE format(
+          'CREATE TABLE audit.%I PARTITION OF audit.task_events FOR VALUES FROM (%L) TO (%L)',
+          part_name, month_start, month_end
+        );
+      END IF;
+      created := created + 1;
+    END IF;
+    month_start := (month_start + interval '1 month')::date;
+  END LOOP;
+  RETURN created;
+END $$;
+
+-- Retenção: desanexa (e, se detach_only = false, remove) as partições mensais
+-- inteiramente anteriores a retention_months meses atrás. Retorna os nomes.
+CREATE OR REPLACE FUNCTION audit.drop_task_event_partitions(
+  retention_months INTEGER,
+  detach_only BOOLEAN DEFAULT FALSE
+) RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+  cutoff DATE := (date_trunc('month', now()) - make_interval(months => retention_months))::date;
+  part   RECORD;
+BEGIN
+  FOR part IN
+    SELECT c.relname
+      FROM pg_inherits i
+      JOIN pg_class c ON c.oid = i.inhrelid
+      JOIN pg_class p ON p.oid = i.inhparent
+      JOIN pg_namespace n ON n.oid = p.relnamespace
+     WHERE n.nspname = 'audit' AND p.relname = 'task_events'
+       AND c.relname ~ '^task_events_[0-9]{4}_[0-9]{2}$'
+     ORDER BY c.relname
+  LOOP
+    IF to_date(substr(part.relname, 13), 'YYYY_MM') < cutoff THEN
+      EXECUTE format('ALTER TABLE audit.task_events DETACH PARTITION audit.%I', part.relname);
+      IF NOT detach_only THEN
+        EXECUTE format('DROP TABLE audit.%I', part.relname);
+      END IF;
+      RETURN NEXT part.relname;
+    END IF;
+  END LOOP;
+END $$;
+
+-- Migração (continuação): copia os eventos da tabela antiga para as partições
+DO $$
+DECLARE
+  oldest DATE;
+BEGIN
+  IF to_regclass('audit.task_events_legacy') IS NOT NULL THEN
+    SELECT min(event_time)::date INTO oldest FROM audit.task_events_legacy;
+    PERFORM audit.ensure_task_event_partitions(3, oldest);
+    INSERT INTO audit.task_events (
+      id, dag_id, run_id, task_id, status, message, metrics,
+      try_number, map_index, log_url, event_time
+    )
+    SELECT id, dag_id, run_id, task_id, status, message, metrics,
+           try_number, map_index, log_url, event_time
+      FROM audit.task_events_legacy;
+    PERFORM setval(
+      pg_get_serial_sequence('audit.task_events', 'id'),
+      COALESCE((SELECT max(id) FROM audit.task_events), 0) + 1,
+      false
+    );
+    DROP TABLE audit.task_events_legacy;
+  END IF;
+END $$;
+
+-- Partições do mês atual + 3 meses à frente (a DAG de manutenção mantém a janela)
+SELECT audit.ensure_task_event_partitions(3);
+
+COMMIT;
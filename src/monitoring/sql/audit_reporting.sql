@@ -0,0 +1,143 @@
+-- Camada de relatórios da auditoria (roda depois de audit_init.sql).
+-- audit.dag_runs.metrics guarda os dicts de resultado de cada etapa como JSONB;
+-- aqui eles viram colunas tipadas em audit.stage_runs (uma linha por run/etapa),
+-- atualizada de forma incremental, e um resumo diário de SLA por etapa.
+
+BEGIN;
+
+-- Converte a duração gravada pelos scripts ("H:MM:SS.ffffff", "1 day, H:MM:SS"
+-- ou segundos) para segundos. Valores inválidos viram NULL.
+CREATE OR REPLACE FUNCTION audit.duration_seconds(value TEXT)
+RETURNS DOUBLE PRECISION
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+  IF value IS NULL OR value = '' THEN
+    RETURN NULL;
+  END IF;
+  IF value ~ '^-?[0-9]+(\.[0-9]+)?$' THEN
+    RETURN value::double precision;
+  END IF;
+  RETURN EXTRACT(EPOCH FROM replace(value, ',', '')::interval);
+EXCEPTION WHEN others THEN
+  RETURN NULL;
+END $$;
+
+-- Uma linha por (run, etapa) com as métricas extraídas do JSON
+CREATE TABLE IF NOT EXISTS audit.stage_runs (
+  dag_id              TEXT NOT NULL,
+  run_id              TEXT NOT NULL,
+  stage               TEXT NOT NULL,
+  execution_date      TIMESTAMPTZ NULL,
+  run_status          TEXT NULL,
+  success             BOOLEAN NULL,
+  duration_seconds    DOUBLE PRECISION NULL,
+  records             BIGINT NULL,
+  records_per_second  DOUBLE PRECISION NULL,
+  api_latency_ms      DOUBLE PRECISION NULL,
+  refreshed_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  CONSTRAINT stage_runs_pk PRIMARY KEY (dag_id, run_id, stage),
+  CONSTRAINT stage_runs_fk
+    FOREIGN KEY (dag_id, run_id)
+    REFERENCES audit.dag_runs(dag_id, run_id)
+    ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_stage_runs_stage_date ON audit.stage_runs(stage, execution_date);
+
+-- Marca d'água do refresh incremental (maior dag_runs.updated_at já processado)
+CREATE TABLE IF NOT EXISTS audit.reporting_state (
+  key    TEXT PRIMARY KEY,
+  value  TIMESTAMPTZ NOT NULL
+);
+
+-- Resumo diário de SLA por etapa (REFRESH CONCURRENTLY usa o índice único)
+CREATE MATERIALIZED VIEW IF NOT EXISTS audit.stage_sla_daily AS
+SELECT stage,
+       (execution_date AT TIME ZONE 'UTC')::date AS day,
+       count(*) AS runs,
+       count(*) FILTER (WHERE success IS NOT TRUE) AS failures,
+       percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_seconds) AS duration_p50,
+       percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_seconds) AS duration_p95,
+       max(duration_seconds) AS duration_max,
+       avg(records_per_second) AS records_per_second_avg,
+       avg(api_latency_ms) AS api_latency_ms_avg
+  FROM audit.stage_runs
+ WHERE execution_date IS NOT NULL
+ GROUP BY stage, day;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stage_sla_daily ON audit.stage_sla_daily(stage, day);
+
+-- Refresh incremental: só relê os dag_runs atualizados desde a última execução
+-- (com 5 minutos de folga para transações que gravaram um updated_at mais antigo
+-- e confirmaram depois). O upsert é idempotente. Retorna as linhas gravadas.
+CREATE OR REPLACE FUNCTION audit.refresh_stage_runs(full_refresh BOOLEAN DEFAULT FALSE)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  watermark      TIMESTAMPTZ;
+  new_watermark  TIMESTAMPTZ;
+  affected       INTEGER;
+BEGIN
+  SELECT value INTO watermark FROM audit.reporting_state WHERE key = 'stage_runs';
+  IF full_refresh OR watermark IS NULL THEN
+    watermark := '-infinity';
+  ELSE
+    watermark := watermark - interval '5 minutes';
+  END IF;
+
+  SELECT max(updated_at) INTO new_watermark FROM audit.dag_runs;
+  IF new_watermark IS NULL THEN
+    RETURN 0;
+  END IF;
+
+  -- etapa -> (chave da duração, chave dos registros) no dict de resultado
+  INSERT INTO audit.stage_runs (
+    dag_id, run_id, stage, execution_date, run_status, success,
+    duration_seconds, records, records_per_second, api_latency_ms, refreshed_at
+  )
+  SELECT x.dag_id, x.run_id, x.stage, x.execution_date, x.status, x.success,
+         x.duration_seconds, x.records,
+         x.records / NULLIF(x.duration_seconds, 0),
+         x.api_latency_ms, NOW()
+    FROM (
+      SELECT r.dag_id, r.run_id, s.stage, r.execution_date, r.status,
+             (r.metrics -> s.stage ->> 'success')::boolean AS success,
+             audit.duration_seconds(r.metrics -> s.stage ->> s.duration_key) AS duration_seconds,
+             (r.metrics -> s.stage ->> s.records_key)::numeric::bigint AS records,
+             (r.metrics -> s.stage ->> 'api_latency_ms')::double precision AS api_latency_ms
+        FROM audit.dag_runs r
+        CROSS JOIN (VALUES
+          ('bronze',          'ingestion_duration', 'total_records'),
+          ('silver',          'transform_duration', 'records'),
+          ('gold',            'duration',           'records_gold'),
+          ('gold_timeseries', 'duration',           NULL)
+        ) AS s(stage, duration_key, records_key)
+       WHERE r.updated_at > watermark
+         AND jsonb_typeof(r.metrics -> s.stage) = 'object'
+         AND r.metrics -> s.stage <> '{}'::jsonb
+    ) AS x
+  ON CONFLICT (dag_id, run_id, stage)
+  DO UPDATE SET
+    execution_date = EXCLUDED.execution_date,
+    run_status = EXCLUDED.run_status,
+    success = EXCLUDED.success,
+    duration_seconds = EXCLUDED.duration_seconds,
+    records = EXCLUDED.records,
+    records_per_second = EXCLUDED.records_per_second,
+    api_latency_ms = EXCLUDED.api_latency_ms,
+    refreshed_at = NOW();
+
+  GET DIAGNOSTICS affected = ROW_COUNT;
+
+  INSERT INTO audit.reporting_state (key, value)
+  VALUES ('stage_runs', new_watermark)
+  ON CONFLICT (key) DO UPDATE SET value = GREATEST(audit.reporting_state.value, EXCLUDED.value);
+
+  IF affected > 0 THEN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY audit.stage_sla_daily;
+  END IF;
+
+  RETURN affected;
+END $$;
+
+COMMIT;
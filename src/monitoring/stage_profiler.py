@@ -0,0 +1,184 @@
+# Bibliotecas
+import os
+import io
+import time
+import pstats
+import cProfile
+import linecache
+import tracemalloc
+from datetime import datetime
+
+# Profiling opcional das etapas (Bronze/Silver/Gold), ligado por variável de ambiente,
+# para diagnosticar uma execução lenta ou que consome muita memória sem reproduzi-la à mão.
+#
+#   PROFILE_STAGES=all              (ou lista: "silver,gold"; vazio = desligado)
+#   PROFILE_MODE=cpu,memory         (padrão: os dois)
+#   PROFILE_TOP_N=30                (linhas nos relatórios)
+#
+# Arquivos em LOG_FOLDER/profiles/<etapa>/<data>_<início>_<pid>.*:
+#   .prof        estatísticas do cProfile (pstats, snakeviz)
+#   _cpu.txt     top funções por tempo acumulado
+#   _memory.txt  pico do tracemalloc e top locais de alocação
+# O resumo (profile_*) vai para o banco de métricas com as métricas da etapa.
+
+PROFILE_MODES = ("cpu", "memory")
+
+
+def _profiled_stages() -> set:
+    raw = str(os.getenv("PROFILE_STAGES", "")).strip().lower()
+    if raw in ("", "false", "0", "none"):
+        return set()
+    if raw in ("all", "true", "1"):
+        return {"*"}
+    return {s.strip() for s in raw.split(",") if s.strip()}
+
+def profiling_enabled(stage: str) -> bool:
+    stages = _profiled_stages()
+    return "*" in stages or stage in stages
+
+def _profile_modes() -> set:
+    raw = str(os.getenv("PROFILE_MODE", ",".join(PROFILE_MODES))).strip().lower()
+    return {m.strip() for m in raw.split(",") if m.strip() in PROFILE_MODES}
+
+# "arquivo:linha" relativo ao diretório atual quando possível
+def _site(frame) -> str:
+    filename = frame.filename
+    try:
+        filename = os.path.relpath(filename)
+    except ValueError:
+        pass
+    return f"{filename}:{frame.lineno}"
+
+
+class StageProfiler:
+    """cProfile + tracemalloc de uma execução de etapa; start() no início, stop() antes de salvar as métricas."""
+
+    def __init__(self, stage: str, execution_date: str = None, enabled: bool = None):
+        self.stage = stage
+        self.execution_date = execution_date
+        self.enabled = profiling_enabled(stage) if enabled is None else enabled
+        self.modes = _profile_modes() if self.enabled else set()
+        self.top_n = int(os.getenv("PROFILE_TOP_N", "30"))
+        self.started_at = None
+        self.summary = {}
+        self.files = {}
+        self.error = None
+        self._profile = None
+        self._owns_tracemalloc = False
+        self._start = None
+
+    def start(self):
+        if not self.enabled:
+            return self
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+
+        if "memory" in self.modes:
+            # outra ferramenta já rastreando (ex.: etapa chamada dentro de outra): só zera o pico
+            if tracemalloc.is_tracing():
+                if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                    tracemalloc.reset_peak()
+            else:
+                tracemalloc.start(int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1")))
+                self._owns_tracemalloc = True
+
+        if "cpu" in self.modes:
+            try:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            except ValueError as e:
+                # já existe um profiler ativo no processo
+                self._profile = None
+                self.error = f"cProfile indisponível: {e}"
+        return self
+
+    # Para o profiling e grava os relatórios. Retorna o resumo (vazio se desligado).
+    def stop(self) -> dict:
+        if not self.enabled or self._start is None:
+            return {}
+        elapsed = time.perf_counter() - self._start
+        self._start = None
+        self.summary = {"profile_wall_seconds": round(elapsed, 6)}
+
+        stats = None
+        if self._profile is not None:
+            self._profile.disable()
+            stats = pstats.Stats(self._profile)
+
+        snapshot = None
+        peak = None
+        if tracemalloc.is_tracing() and "memory" in self.modes:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+        try:
+            base = self._base_path()
+            if stats is not None:
+                self._cpu_report(stats, base)
+            if snapshot is not None:
+                self._memory_report(snapshot, peak, base)
+        except Exception as e:
+            self.error = f"Falha ao gravar profiling: {e}"
+
+        if self.error:
+            self.summary["profile_error"] = self.error
+        return self.summary
+
+    def _base_path(self) -> str:
+        folder = os.path.join(os.getenv("LOG_FOLDER", "/opt/airflow/logs"), "profiles", self.stage)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{self.execution_date}_{self.started_at:%Y%m%dT%H%M%S}_{os.getpid()}")
+
+    def _cpu_report(self, stats: pstats.Stats, base: str):
+        prof_path = f"{base}.prof"
+        stats.dump_stats(prof_path)
+
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        text_path = f"{base}_cpu.txt"
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(buffer.getvalue())
+
+        # função com maior tempo próprio (tottime), fora do próprio profiler
+        top = max(
+            ((func, row[2]) for func, row in stats.stats.items() if "cProfile" not in func[0]),
+            key=lambda item: item[1], default=None,
+        )
+        self.summary["profile_cpu_seconds"] = round(stats.total_tt, 6)
+        self.summary["profile_calls"] = stats.total_calls
+        if top:
+            (filename, lineno, name), tottime = top
+            self.summary["profile_top_function"] = f"{os.path.basename(filename)}:{lineno}({name})"
+            self.summary["profile_top_function_seconds"] = round(tottime, 6)
+        self.files["cpu"] = prof_path
+        self.files["cpu_report"] = text_path
+
+    def _memory_report(self, snapshot, peak: int, base: str):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        top = snapshot.statistics("lineno")[:self.top_n]
+
+        lines = [f"tracemalloc pico: {peak / 1024 / 1024:.2f} MB", "", "Top locais de alocação (memória viva no fim da etapa):"]
+        for stat in top:
+            lines.append(f"{stat.size / 1024:10.1f} KB  {stat.count:8d} blocos  {_site(stat.traceback[0])}")
+        text_path = f"{base}_memory.txt"
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        self.summary["profile_tracemalloc_peak_mb"] = round(peak / 1024 / 1024, 3)
+        if top:
+            self.summary["profile_top_alloc_site"] = _site(top[0].traceback[0])
+            self.summary["profile_top_alloc_kb"] = round(top[0].size / 1024, 1)
+        self.files["memory_report"] = text_path
+
+    # Resultado para o dict da etapa
+    def result(self) -> dict:
+        if not self.enabled:
+            return None
+        return {**self.summary, "files": dict(self.files)}
@@ -0,0 +1,137 @@
+# Bibliotecas
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Spans das etapas (Bronze/Silver/Gold): tempo de cada sub-fase com contagens de
+# registros/bytes, para saber para onde vai o tempo de uma execução.
+#
+#   trace = StageTrace("silver", execution_date)
+#   with trace.span("read_json", file=name) as span:
+#       ...
+#       span["rows"] = len(data)
+#
+# No fim a etapa grava:
+#   - o arquivo de trace LOG_FOLDER/traces/<etapa>/<data>_<início>_<pid>.json no
+#     formato Chrome Trace Event (abre em chrome://tracing ou ui.perfetto.dev);
+#   - as métricas agregadas por nome de span (span_<nome>_seconds/_count/_rows/_bytes)
+#     junto com as demais métricas da etapa no banco de métricas.
+#
+# TRACE_SPANS=false desliga (span() vira um no-op). Módulo leve (só stdlib).
+
+# Atributos numéricos somados nas métricas agregadas
+_SUMMED_ATTRS = ("rows", "bytes")
+
+
+def stage_trace_enabled() -> bool:
+    return str(os.getenv("TRACE_SPANS", "true")).strip().lower() == "true"
+
+
+class StageTrace:
+    """Coleta os spans de uma execução de etapa e exporta trace/métricas."""
+
+    def __init__(self, stage: str, execution_date: str = None, enabled: bool = None):
+        self.stage = stage
+        self.execution_date = execution_date
+        self.enabled = stage_trace_enabled() if enabled is None else enabled
+        self.started_at = datetime.now()
+        self._events = []
+        self._lock = threading.Lock()
+
+    # Mede o bloco; o dict retornado recebe atributos (rows, bytes, ...) durante o bloco.
+    # Exceções propagam normalmente (o span é registrado com "error").
+    @contextmanager
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            yield attrs
+            return
+
+        ts_us = time.time_ns() // 1000
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self._record(name, ts_us, time.perf_counter() - start, attrs)
+
+    def _record(self, name: str, ts_us: int, seconds: float, attrs: dict):
+        event = {
+            "name": name,
+            "cat": self.stage,
+            "ph": "X",
+            "ts": ts_us,
+            "dur": round(seconds * 1_000_000, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {k: v for k, v in attrs.items() if v is not None},
+        }
+        with self._lock:
+            self._events.append(event)
+
+    # Agregado por nome: {nome: {"seconds", "count", "rows", "bytes"}}
+    def summary(self) -> dict:
+        with self._lock:
+            events = list(self._events)
+
+        spans = {}
+        for event in events:
+            entry = spans.setdefault(event["name"], {"seconds": 0.0, "count": 0})
+            entry["seconds"] += event["dur"] / 1_000_000
+            entry["count"] += 1
+            for attr in _SUMMED_ATTRS:
+                value = event["args"].get(attr)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    entry[attr] = entry.get(attr, 0) + value
+
+        for entry in spans.values():
+            entry["seconds"] = round(entry["seconds"], 6)
+        return spans
+
+    # Métricas planas para o save_metrics_dict da etapa
+    def metrics(self) -> dict:
+        flat = {}
+        for name, entry in self.summary().items():
+            for key, value in entry.items():
+                flat[f"span_{name}_{key}"] = value
+        return flat
+
+    # Grava o arquivo Chrome Trace; retorna o caminho (None se desligado, sem spans ou sem LOG_FOLDER)
+    def write(self, run_id: str = None) -> str:
+        log_root = os.getenv("LOG_FOLDER", "/opt/airflow/logs")
+        if not self.enabled or not self._events or not log_root:
+            return None
+
+        folder = os.path.join(log_root, "traces", self.stage)
+        os.makedirs(folder, exist_ok=True)
+        file_name = f"{self.execution_date}_{self.started_at:%Y%m%dT%H%M%S}_{os.getpid()}.json"
+        path = os.path.join(folder, file_name)
+
+        with self._lock:
+            events = list(self._events)
+        payload = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "stage": self.stage,
+                "execution_date": self.execution_date,
+                "run_id": run_id,
+                "started_at": self.started_at.isoformat(),
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+    # Grava o trace sem deixar a falha de escrita derrubar a etapa; retorna (caminho, erro)
+    def export(self, run_id: str = None):
+        try:
+            return self.write(run_id), None
+        except Exception as e:
+            return None, str(e)
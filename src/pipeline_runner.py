@@ -0,0 +1,171 @@
+# Scripts
+from src.ingestion.extract_api import extract_breweries
+from src.transformation.silver_transform import transform_to_silver
+from src.transformation.gold_transform import transform_to_gold
+from src.monitoring.metrics_store import init_db, save_metrics_dict, metrics_run_source
+from src.monitoring.metrics_client import flush_metrics
+from src.utils_log import flush_logs
+
+# Bibliotecas
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, datetime
+
+# Execução Bronze -> Silver -> Gold em um único processo, fora do Airflow.
+#
+# Os dados passam de uma etapa para a outra em memória: os registros da API vão
+# direto para a Silver (sem reler os JSONs) e a tabela Arrow da Silver vai direto
+# para a Gold (sem reler o parquet). As gravações em disco (páginas JSON, parquet
+# Silver, saídas Gold) rodam em background no BackgroundWriter e são aguardadas
+# no fim da execução. Os arquivos gerados são os mesmos da DAG.
+#
+# Silver e Gold retornam (e gravam as métricas) antes das suas gravações terminarem:
+# o resultado e as métricas saem com writes_pending=True e, depois de aguardar o
+# writer, o runner grava writes_committed/write_errors com o mesmo run_id da etapa
+# e marca a etapa como falha se alguma gravação dela falhou.
+#
+# Uso:
+#   python -m src.pipeline_runner                              # data de hoje
+#   python -m src.pipeline_runner --date 2026-02-17 --from-stage silver
+
+STAGES = ("bronze", "silver", "gold")
+
+
+class BackgroundWriter:
+    """Executor das gravações em disco; guarda os futures para aguardar/reportar erros no fim."""
+
+    def __init__(self, max_workers: int = None):
+        max_workers = max_workers or int(os.getenv("PIPELINE_WRITER_THREADS", "4"))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-writer")
+        self._futures = []
+        self._lock = threading.Lock()
+        # etapa dona das próximas gravações (erros reportados por etapa)
+        self.stage = None
+
+    def submit(self, fn, *args, **kwargs):
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._futures.append((self.stage, future))
+        return future
+
+    # Aguarda todas as gravações; retorna {etapa: [mensagens de erro]} (só etapas com erro)
+    def wait_by_stage(self) -> dict:
+        with self._lock:
+            futures, self._futures = self._futures, []
+        errors = {}
+        for stage, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.setdefault(stage, []).append(str(e))
+        return errors
+
+    # Aguarda todas as gravações; retorna as mensagens de erro (lista vazia se tudo foi gravado)
+    def wait(self) -> list:
+        return [error for stage_errors in self.wait_by_stage().values() for error in stage_errors]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+# Resultado das gravações em background de cada etapa que retornou com writes_pending
+def _record_write_outcome(execution_date: str, results: dict, errors_by_stage: dict):
+    for stage, stage_result in results.items():
+        if not stage_result.get("writes_pending"):
+            continue
+        errors = errors_by_stage.get(stage, [])
+        stage_result["writes_pending"] = False
+        stage_result["writes_committed"] = not errors
+        if errors:
+            stage_result["success"] = False
+            stage_result["error"] = f"Falha ao gravar {len(errors)} arquivo(s): {errors[0]}"
+        if stage_result.get("run_id"):
+            init_db()
+            save_metrics_dict(stage_result["run_id"], execution_date, stage, {
+                "writes_committed": not errors,
+                "write_errors": len(errors),
+            })
+
+# Executa as etapas a partir de `from_stage`. Etapas anteriores a ela são lidas do
+# disco (ex.: from_stage="silver" usa os JSONs já gravados da Bronze).
+def run_pipeline(execution_date: str = None, from_stage: str = "bronze", per_page: int = 200, max_pages: int = 500) -> dict:
+    if from_stage not in STAGES:
+        return {"success": False, "error": f"Etapa inválida: {from_stage} (use {', '.join(STAGES)})"}
+
+    execution_date = execution_date or datetime.now().strftime("%Y-%m-%d")
+    stages_to_run = STAGES[STAGES.index(from_stage):]
+    start_time = time.time()
+    results = {}
+    error = None
+
+    # run_id com prefixo "runner_": o pico de RSS aqui é acumulado de várias etapas,
+    # então essas execuções ficam fora das baselines de performance da DAG
+    with metrics_run_source("runner"), BackgroundWriter() as writer:
+        records = None
+        silver_table = None
+
+        if "bronze" in stages_to_run:
+            records = []
+            writer.stage = "bronze"
+            results["bronze"] = extract_breweries(per_page=per_page, max_pages=max_pages, execution_date=execution_date, records=records, writer=writer)
+            if not results["bronze"].get("success"):
+                error = results["bronze"].get("error", "Falha na ingestão Bronze")
+
+        if error is None and "silver" in stages_to_run:
+            writer.stage = "silver"
+            silver = transform_to_silver(execution_date=execution_date, records=records, writer=writer, return_table=True)
+            silver_table = silver.pop("table", None)
+            results["silver"] = silver
+            if not silver.get("success"):
+                error = silver.get("error", "Erro na Silver")
+
+        if error is None and "gold" in stages_to_run:
+            writer.stage = "gold"
+            results["gold"] = transform_to_gold(execution_date=execution_date, table=silver_table, writer=writer)
+            if not results["gold"].get("success"):
+                error = results["gold"].get("error", "Erro na Gold")
+
+        errors_by_stage = writer.wait_by_stage()
+
+    write_errors = [e for stage_errors in errors_by_stage.values() for e in stage_errors]
+    _record_write_outcome(execution_date, results, errors_by_stage)
+    flush_metrics()
+    flush_logs()
+
+    if error is None and write_errors:
+        error = f"Falha ao gravar {len(write_errors)} arquivo(s): {write_errors[0]}"
+
+    result = {
+        "success": error is None,
+        "execution_date": execution_date,
+        "stages": results,
+        "write_errors": write_errors,
+        "duration": str(timedelta(seconds=time.time() - start_time)),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa Bronze -> Silver -> Gold em um único processo (fora do Airflow)")
+    parser.add_argument("--date", default=None, help="data da execução (YYYY-MM-DD, padrão: hoje)")
+    parser.add_argument("--from-stage", default="bronze", choices=STAGES, help="primeira etapa a executar")
+    parser.add_argument("--per-page", type=int, default=200)
+    parser.add_argument("--max-pages", type=int, default=500)
+    args = parser.parse_args()
+
+    result = run_pipeline(args.date, args.from_stage, args.per_page, args.max_pages)
+    print(json.dumps(result, indent=2, default=str))
+    raise SystemExit(0 if result["success"] else 1)
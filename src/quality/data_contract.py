@@ -0,0 +1,245 @@
+# Scripts
+from src.utils_log import configurar_logger, print_log, bind_log_context
+from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id
+from src.transformation.gold_bundle import BUNDLE_FILE, read_gold_bundle
+
+# Bibliotecas
+import os
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from datetime import timedelta, datetime
+from dotenv import load_dotenv
+
+# Contrato de dados das saídas Silver/Gold, validado direto nos arquivos da
+# partição (sem subir a suíte de testes). Tudo roda em kernels do Arrow
+# (pyarrow.compute, C++ vetorizado) sobre as colunas necessárias:
+#   - schema: colunas obrigatórias e tipos (lidos do rodapé do parquet)
+#   - chaves: unicidade e não-nulos
+#   - reconciliação: totais de cada rollup Gold == registros da Silver, e
+#     soma de state x brewery_type por estado <= breweries_by_state
+
+# coluna -> tipo ("string", "integer", "float")
+SILVER_SCHEMA = {
+    "id": "string",
+    "name": "string",
+    "brewery_type": "string",
+    "city": "string",
+    "state": "string",
+}
+SILVER_OPTIONAL_SCHEMA = {"latitude": "float", "longitude": "float"}
+SILVER_KEY = ["id"]
+SILVER_NOT_NULL = ["id", "name"]
+
+# tabela Gold -> (schema, chave, coluna de contagem, colunas da Silver agrupadas)
+GOLD_CONTRACT = {
+    "breweries_by_state_type": (
+        {"state": "string", "brewery_type": "string", "breweries_per_state_type": "integer"},
+        ["state", "brewery_type"], "breweries_per_state_type", ["state", "brewery_type"],
+    ),
+    "breweries_by_state": (
+        {"state": "string", "breweries_per_state": "integer"},
+        ["state"], "breweries_per_state", ["state"],
+    ),
+    "breweries_by_type": (
+        {"brewery_type": "string", "brewery_per_type": "integer"},
+        ["brewery_type"], "brewery_per_type", ["brewery_type"],
+    ),
+    "breweries_by_city_state": (
+        {"city": "string", "state": "string", "brewery_per_city_state": "integer"},
+        ["city", "state"], "brewery_per_city_state", ["city", "state"],
+    ),
+}
+
+_TYPE_CHECKS = {
+    "string": lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    "integer": pa.types.is_integer,
+    "float": lambda t: pa.types.is_floating(t) or pa.types.is_integer(t),
+}
+
+
+# FUNÇÃO PARA DEFINIR EXECUTION DATE
+def _resolve_execution_date(execution_date: str = None) -> str:
+    if execution_date:
+        return execution_date
+    return os.getenv("AIRFLOW_CTX_EXECUTION_DATE", datetime.now().strftime("%Y-%m-%d"))[:10]
+
+# Colunas faltando ou com tipo errado
+def check_schema(schema: pa.Schema, expected: dict, name: str, required: bool = True) -> list:
+    violations = []
+    for column, kind in expected.items():
+        if column not in schema.names:
+            if required:
+                violations.append(f"{name}: coluna obrigatória ausente: {column}")
+            continue
+        field_type = schema.field(column).type
+        if not _TYPE_CHECKS[kind](field_type):
+            violations.append(f"{name}: coluna {column} com tipo {field_type} (esperado {kind})")
+    return violations
+
+# Chave com nulos ou duplicada
+def check_key(table: pa.Table, key: list, name: str) -> list:
+    violations = []
+    for column in key:
+        nulls = table.column(column).null_count
+        if nulls:
+            violations.append(f"{name}: {nulls} valores nulos na chave {column}")
+
+    if len(key) == 1:
+        distinct = pc.count_distinct(table.column(key[0]), mode="all").as_py()
+    else:
+        distinct = table.group_by(key).aggregate([]).num_rows
+    if distinct != table.num_rows:
+        violations.append(f"{name}: {table.num_rows - distinct} chaves duplicadas em ({', '.join(key)})")
+    return violations
+
+def check_not_null(table: pa.Table, columns: list, name: str) -> list:
+    return [
+        f"{name}: {table.column(c).null_count} valores nulos em {c}"
+        for c in columns if c in table.column_names and table.column(c).null_count
+    ]
+
+# Registros da Silver que entram no groupby (o pandas descarta grupos com chave nula)
+def _rows_with_keys(table: pa.Table, columns: list) -> int:
+    mask = None
+    for column in columns:
+        valid = pc.is_valid(table.column(column))
+        mask = valid if mask is None else pc.and_(mask, valid)
+    return pc.sum(pc.cast(mask, pa.int64())).as_py() or 0
+
+def _total(table: pa.Table, column: str) -> int:
+    return pc.sum(table.column(column)).as_py() or 0
+
+# Tabelas Gold da partição (parquets; bundle Arrow quando só ele existe)
+def _read_gold_tables(gold_folder: str) -> dict:
+    tables = {}
+    for name in GOLD_CONTRACT:
+        path = os.path.join(gold_folder, f"{name}.parquet")
+        if os.path.exists(path):
+            tables[name] = pq.read_table(path)
+
+    bundle_path = os.path.join(gold_folder, BUNDLE_FILE)
+    if len(tables) < len(GOLD_CONTRACT) and os.path.exists(bundle_path):
+        bundle = read_gold_bundle(bundle_path)
+        for name in GOLD_CONTRACT:
+            if name not in tables and name in bundle:
+                tables[name] = bundle[name]
+    return tables
+
+# Valida o contrato da Silver/Gold de uma data. Retorna {"success", "violations", ...}.
+def validate_data_contract(execution_date: str = None) -> dict:
+    load_dotenv(".env", override=False)
+    execution_date = _resolve_execution_date(execution_date)
+    datalake_root = os.getenv("DATALAKE_PATH", "/opt/airflow/datalake")
+    silver_file = os.path.join(datalake_root, "silver", f"processing_date={execution_date}", "breweries.parquet")
+    gold_folder = os.path.join(datalake_root, "gold", f"processing_date={execution_date}")
+
+    log_root = os.getenv("LOG_FOLDER", "/opt/airflow/logs")
+    logger = None
+    if log_root and os.getenv("ENV") != "TEST":
+        log_folder = os.path.join(log_root, "quality")
+        os.makedirs(log_folder, exist_ok=True)
+        logger = configurar_logger(log_folder, "_data_contract.txt", "DataContract")
+        bind_log_context(logger, stage="contract", execution_date=execution_date)
+
+    start_time = time.time()
+    violations = []
+    checks = 0
+    silver_rows = 0
+
+    try:
+        if not os.path.exists(silver_file):
+            violations.append(f"silver: arquivo não encontrado: {silver_file}")
+            return _finish(logger, execution_date, start_time, violations, checks, silver_rows)
+
+        # Silver: schema pelo rodapé do parquet, depois só as colunas do contrato
+        silver_schema = pq.read_schema(silver_file)
+        violations += check_schema(silver_schema, SILVER_SCHEMA, "silver")
+        violations += check_schema(silver_schema, SILVER_OPTIONAL_SCHEMA, "silver", required=False)
+        checks += 2
+        columns = [c for c in SILVER_SCHEMA if c in silver_schema.names]
+        silver = pq.read_table(silver_file, columns=columns)
+        silver_rows = silver.num_rows
+
+        if silver_rows == 0:
+            violations.append("silver: nenhum registro")
+        if all(c in silver.column_names for c in SILVER_KEY):
+            violations += check_key(silver, SILVER_KEY, "silver")
+        violations += check_not_null(silver, SILVER_NOT_NULL, "silver")
+        checks += 3
+
+        # Gold: schema, chave e reconciliação de cada rollup com a Silver
+        gold = _read_gold_tables(gold_folder)
+        city_top_k = int(os.getenv("GOLD_CITY_TOP_K", "0") or 0)
+        for name, (schema, key, count_column, silver_keys) in GOLD_CONTRACT.items():
+            checks += 1
+            if name not in gold:
+                violations.append(f"gold: tabela ausente: {name}")
+                continue
+            table = gold[name]
+            schema_violations = check_schema(table.schema, schema, f"gold.{name}")
+            violations += schema_violations
+            if schema_violations:
+                continue
+
+            violations += check_key(table, key, f"gold.{name}")
+            checks += 2
+            if not all(c in silver.column_names for c in silver_keys):
+                continue
+
+            gold_total = _total(table, count_column)
+            expected = _rows_with_keys(silver, silver_keys)
+            # com GOLD_CITY_TOP_K o ranking cidade x estado guarda só o top-k
+            partial = name == "breweries_by_city_state" and city_top_k > 0
+            if (gold_total > expected) if partial else (gold_total != expected):
+                violations.append(f"gold.{name}: soma de {count_column} = {gold_total}, Silver tem {expected} registros")
+
+        # state x brewery_type somado por estado <= breweries_by_state (registros sem
+        # brewery_type só entram no total do estado) e nenhum estado fora de breweries_by_state
+        if not any(v.startswith(("gold.breweries_by_state_type:", "gold.breweries_by_state:", "gold: tabela ausente: breweries_by_state")) for v in violations):
+            checks += 1
+            per_state = gold["breweries_by_state_type"].group_by("state").aggregate([("breweries_per_state_type", "sum")])
+            joined = per_state.join(gold["breweries_by_state"], "state", join_type="left outer")
+            consistent = pc.fill_null(pc.less_equal(
+                joined.column("breweries_per_state_type_sum"), joined.column("breweries_per_state")
+            ), False)
+            mismatch = pc.sum(pc.cast(pc.invert(consistent), pa.int64())).as_py() or 0
+            if mismatch:
+                violations.append(f"gold: {mismatch} estados de state x brewery_type acima de breweries_by_state")
+
+    except Exception as e:
+        violations.append(f"Erro fatal inesperado: {e}")
+
+    return _finish(logger, execution_date, start_time, violations, checks, silver_rows)
+
+# Log, métricas (layer "contract") e resultado
+def _finish(logger, execution_date: str, start_time: float, violations: list, checks: int, silver_rows: int) -> dict:
+    duration = str(timedelta(seconds=time.time() - start_time))
+    for violation in violations:
+        print_log(logger, f"[DATA CONTRACT] {violation}", "error")
+    if not violations:
+        print_log(logger, f"Contrato de dados válido ({checks} verificações) em {duration}", "success")
+
+    run_id = generate_run_id()
+    init_db()
+    save_metrics_dict(run_id, execution_date, "contract", {
+        "violations": len(violations),
+        "checks": checks,
+        "silver_rows": silver_rows,
+        "contract_duration": duration,
+    })
+
+    return {
+        "success": not violations,
+        "violations": violations,
+        "checks": checks,
+        "silver_rows": silver_rows,
+        "duration": duration,
+        "run_id": run_id,
+        "contract_date": execution_date,
+    }
+
+
+if __name__ == "__main__":
+    print(validate_data_contract())
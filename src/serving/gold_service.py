@@ -0,0 +1,312 @@
+# Bibliotecas
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+import pandas as pd
+from src.transformation.gold_bundle import BUNDLE_FILE, SUCCESS_FILE, read_gold_bundle
+
+# Arquivos Gold necessários para montar o snapshot em memória
+GOLD_FILES = {
+    "state_type": "breweries_by_state_type.parquet",
+    "state": "breweries_by_state.parquet",
+    "type": "breweries_by_type.parquet",
+    "city_state": "breweries_by_city_state.parquet",
+}
+
+_PARTITION_RE = re.compile(r"^processing_date=(\d{4}-\d{2}-\d{2})$")
+
+# Normaliza chaves de consulta do mesmo jeito que a Silver (lower/strip)
+def _norm(value):
+    if value is None:
+        return None
+    return " ".join(str(value).strip().lower().split())
+
+# Partição completa: marcador da Gold (gravado depois de todas as saídas) e o
+# bundle Arrow ou todos os parquets esperados. Sem o marcador a Gold ainda está
+# gravando (ou falhou) e a partição é ignorada.
+def _partition_is_complete(folder: str) -> bool:
+    if not os.path.exists(os.path.join(folder, SUCCESS_FILE)):
+        return False
+    if os.path.exists(os.path.join(folder, BUNDLE_FILE)):
+        return True
+    return all(os.path.exists(os.path.join(folder, f)) for f in GOLD_FILES.values())
+
+# Versão da partição: o marcador é regravado (tmp + rename) a cada escrita da Gold,
+# então inode/mtime/tamanho mudam quando a mesma data é reprocessada
+def _partition_version(folder: str):
+    try:
+        st = os.stat(os.path.join(folder, SUCCESS_FILE))
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+# Valida o parâmetro k dos rankings (inteiro entre 1 e GOLD_SERVING_MAX_K)
+def _parse_k(value, default: int = 10) -> int:
+    max_k = int(os.getenv("GOLD_SERVING_MAX_K", "1000"))
+    if value is None:
+        return default
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Parâmetro k inválido: {value!r} (esperado inteiro)")
+    if not 1 <= k <= max_k:
+        raise ValueError(f"Parâmetro k fora do intervalo: {k} (use 1 a {max_k})")
+    return k
+
+# Procura a partição Gold mais recente que tenha todos os arquivos esperados
+def find_latest_gold_partition(gold_path: str):
+    if not os.path.isdir(gold_path):
+        return None, None
+
+    dates = sorted(
+        (m.group(1) for m in map(_PARTITION_RE.match, os.listdir(gold_path)) if m),
+        reverse=True,
+    )
+    for partition_date in dates:
+        folder = os.path.join(gold_path, f"processing_date={partition_date}")
+        if _partition_is_complete(folder):
+            return partition_date, folder
+
+    return None, None
+
+
+# Estruturas imutáveis e indexadas montadas a partir de uma partição Gold.
+# Todas as agregações e rankings são pré-calculados na carga.
+class GoldSnapshot:
+
+    def __init__(self, processing_date: str, folder: str, frames: dict, version=None):
+        self.processing_date = processing_date
+        self.folder = folder
+        self.version = version
+        self.loaded_at = time.time()
+
+        st = frames["state_type"]
+        self.by_state_type = {}
+        for state, brewery_type, count in zip(st["state"], st["brewery_type"], st["breweries_per_state_type"]):
+            self.by_state_type.setdefault(state, {})[brewery_type] = int(count)
+
+        s = frames["state"]
+        self.by_state = {state: int(c) for state, c in zip(s["state"], s["breweries_per_state"])}
+
+        t = frames["type"]
+        self.by_type = {bt: int(c) for bt, c in zip(t["brewery_type"], t["brewery_per_type"])}
+
+        cs = frames["city_state"]
+        self.ranked_cities = sorted(
+            ((city, state, int(c)) for city, state, c in zip(cs["city"], cs["state"], cs["brewery_per_city_state"])),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+        self.ranked_cities_by_state = {}
+        for row in self.ranked_cities:
+            self.ranked_cities_by_state.setdefault(row[1], []).append(row)
+
+        self.ranked_states = sorted(self.by_state.items(), key=lambda kv: kv[1], reverse=True)
+        self.ranked_types = sorted(self.by_type.items(), key=lambda kv: kv[1], reverse=True)
+
+    # Carrega a partição (bundle Arrow via memory-map, se existir; senão os parquets)
+    @classmethod
+    def load(cls, processing_date: str, folder: str):
+        version = _partition_version(folder)
+        bundle_path = os.path.join(folder, BUNDLE_FILE)
+        if os.path.exists(bundle_path):
+            tables = read_gold_bundle(bundle_path)
+            frames = {key: tables[os.path.splitext(name)[0]].to_pandas() for key, name in GOLD_FILES.items()}
+        else:
+            frames = {key: pd.read_parquet(os.path.join(folder, name)) for key, name in GOLD_FILES.items()}
+        return cls(processing_date, folder, frames, version)
+
+
+# Camada de serving da Gold: consultas em memória com cache LRU limitado,
+# contadores de hit/miss e hot-reload atômico quando chega (ou é regravada) uma partição.
+# Os rankings validam k (1 a GOLD_SERVING_MAX_K) tanto na API Python quanto no HTTP.
+class GoldService:
+
+    def __init__(self, datalake_root: str = None, cache_size: int = None, reload_interval: float = None):
+        datalake_root = datalake_root or os.getenv("DATALAKE_PATH", "/opt/airflow/datalake")
+        self.gold_path = os.path.join(datalake_root, "gold")
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("GOLD_SERVING_CACHE_SIZE", "1024"))
+        self.reload_interval = reload_interval if reload_interval is not None else float(os.getenv("GOLD_SERVING_RELOAD_SECONDS", "30"))
+
+        self._snapshot = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # uma recarga por vez (requisições concorrentes não carregam a mesma partição em paralelo)
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    # Recarrega a partição mais recente se ela mudou (data nova ou a mesma data
+    # regravada, ex.: rerun da DAG ou backfill --force). O snapshot novo é montado
+    # fora do lock e trocado de uma vez, então leitores nunca veem dados parciais.
+    def reload(self, force: bool = False) -> bool:
+        with self._reload_lock:
+            self._last_check = time.time()
+            partition_date, folder = find_latest_gold_partition(self.gold_path)
+            if partition_date is None:
+                return False
+
+            current = self._snapshot
+            if (not force and current is not None and current.processing_date == partition_date
+                    and current.version == _partition_version(folder)):
+                return False
+
+            snapshot = GoldSnapshot.load(partition_date, folder)
+            with self._lock:
+                self._snapshot = snapshot
+                self._cache.clear()
+                self.reloads += 1
+            return True
+
+    # Verifica (no máximo a cada reload_interval segundos) se há partição nova
+    def _current(self) -> GoldSnapshot:
+        if self._snapshot is None or (time.time() - self._last_check) >= self.reload_interval:
+            self.reload()
+        if self._snapshot is None:
+            raise LookupError(f"Nenhuma partição Gold disponível em: {self.gold_path}")
+        return self._snapshot
+
+    # Consulta com cache LRU limitado
+    def _cached(self, key, compute):
+        snapshot = self._current()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        value = compute(snapshot)
+
+        with self._lock:
+            if snapshot is self._snapshot:
+                self._cache[key] = value
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return value
+
+    # Cervejarias de um estado, por tipo (ou total de um tipo específico)
+    def breweries_in_state(self, state: str, brewery_type: str = None):
+        state, brewery_type = _norm(state), _norm(brewery_type)
+
+        def compute(snap):
+            types = snap.by_state_type.get(state, {})
+            if brewery_type is not None:
+                return types.get(brewery_type, 0)
+            return dict(sorted(types.items(), key=lambda kv: kv[1], reverse=True))
+
+        return self._cached(("state", state, brewery_type), compute)
+
+    # Total de cervejarias de um tipo
+    def breweries_of_type(self, brewery_type: str) -> int:
+        brewery_type = _norm(brewery_type)
+        return self._cached(("type", brewery_type), lambda snap: snap.by_type.get(brewery_type, 0))
+
+    # Top-k estados com mais cervejarias
+    def top_states(self, k: int = 10):
+        k = _parse_k(k)
+        return self._cached(("top_states", k), lambda snap: [list(row) for row in snap.ranked_states[:k]])
+
+    # Top-k tipos de cervejaria
+    def top_types(self, k: int = 10):
+        k = _parse_k(k)
+        return self._cached(("top_types", k), lambda snap: [list(row) for row in snap.ranked_types[:k]])
+
+    # Top-k cidades (opcionalmente filtrando por estado)
+    def top_cities(self, k: int = 10, state: str = None):
+        k = _parse_k(k)
+        state = _norm(state)
+
+        def compute(snap):
+            ranked = snap.ranked_cities if state is None else snap.ranked_cities_by_state.get(state, [])
+            return [list(row) for row in ranked[:k]]
+
+        return self._cached(("top_cities", k, state), compute)
+
+    # Contadores do cache e informações do snapshot carregado
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "processing_date": snapshot.processing_date if snapshot else None,
+            "cache_size": len(self._cache),
+            "cache_capacity": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+
+# Handler HTTP (somente leitura) sobre um GoldService
+class _GoldRequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = [unquote(p) for p in parsed.path.strip("/").split("/") if p]
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        try:
+            k = _parse_k(query.get("k"))
+            if parts == ["health"]:
+                return self._send_json(200, {"status": "ok"})
+            if parts == ["stats"]:
+                return self._send_json(200, self.service.stats())
+            if len(parts) == 2 and parts[0] == "state":
+                return self._send_json(200, self.service.breweries_in_state(parts[1], query.get("type")))
+            if len(parts) == 2 and parts[0] == "type":
+                return self._send_json(200, self.service.breweries_of_type(parts[1]))
+            if parts == ["top", "states"]:
+                return self._send_json(200, self.service.top_states(k))
+            if parts == ["top", "types"]:
+                return self._send_json(200, self.service.top_types(k))
+            if parts == ["top", "cities"]:
+                return self._send_json(200, self.service.top_cities(k, query.get("state")))
+            return self._send_json(404, {"error": f"Rota não encontrada: {parsed.path}"})
+
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        except LookupError as e:
+            return self._send_json(503, {"error": str(e)})
+
+    # Silencia o log padrão do http.server (uma linha por request no stderr)
+    def log_message(self, format, *args):
+        pass
+
+# Cria o servidor HTTP local (não inicia o loop)
+def make_http_server(service: GoldService, host: str = "127.0.0.1", port: int = 8765):
+    handler = type("GoldRequestHandler", (_GoldRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+# Sobe o endpoint HTTP local e bloqueia até interrupção
+def serve_http(host: str = None, port: int = None, service: GoldService = None):
+    host = host or os.getenv("GOLD_SERVING_HOST", "127.0.0.1")
+    port = port or int(os.getenv("GOLD_SERVING_PORT", "8765"))
+    service = service or GoldService()
+    service.reload()
+
+    server = make_http_server(service, host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve_http()
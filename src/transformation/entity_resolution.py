@@ -0,0 +1,187 @@
+# Bibliotecas
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# Detecção de cervejarias quase duplicadas (mesma cervejaria com ids diferentes).
+#
+# 1. Blocking: candidatos só são comparados dentro do mesmo bloco
+#    (state + city normalizados; sem cidade, geohash da coordenada).
+# 2. Similaridade: Jaccard de trigramas do nome normalizado, calculada de forma
+#    vetorizada por bloco (matriz binária de trigramas x produto matricial).
+# 3. Clusters: união dos pares acima do limiar (union-find).
+#
+# O custo é proporcional à soma de n² dos blocos (não ao n² total).
+
+# Tokens genéricos que não ajudam a distinguir cervejarias
+NAME_STOPWORDS = {
+    "the", "and", "of", "co", "company", "inc", "llc", "ltd",
+    "brewing", "brewery", "breweries", "brewers", "brewhouse", "brew",
+    "beer", "beers", "taproom", "pub",
+}
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+
+# Normaliza texto: sem acentos, minúsculo, só alfanumérico e espaços simples
+def _normalize_text(value) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode("ascii")
+    text = _NON_ALNUM.sub(" ", text.lower().replace("&", " and "))
+    return " ".join(text.split())
+
+# Nome normalizado sem tokens genéricos (se sobrar vazio, mantém o nome completo)
+def normalize_name(value) -> str:
+    text = _normalize_text(value)
+    tokens = [t for t in text.split() if t not in NAME_STOPWORDS]
+    return " ".join(tokens) if tokens else text
+
+# Geohash (base32) de uma coordenada
+def geohash(latitude: float, longitude: float, precision: int = 5) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, bit, ch, even = [16, 8, 4, 2, 1], 0, 0, True
+    result = []
+    while len(result) < precision:
+        rng, val = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if val >= mid:
+            ch |= bits[bit]
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        if bit < 4:
+            bit += 1
+        else:
+            result.append(_GEOHASH_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(result)
+
+# Chave de bloco: state|city normalizados ou geohash quando não há cidade
+def _blocking_keys(df: pd.DataFrame, geohash_precision: int) -> pd.Series:
+    state = df["state"].map(_normalize_text) if "state" in df.columns else pd.Series("", index=df.index)
+    city = df["city"].map(_normalize_text) if "city" in df.columns else pd.Series("", index=df.index)
+    keys = ("sc:" + state + "|" + city).where((state != "") & (city != ""), None)
+
+    if "latitude" in df.columns and "longitude" in df.columns:
+        lat = pd.to_numeric(df["latitude"], errors="coerce")
+        lon = pd.to_numeric(df["longitude"], errors="coerce")
+        missing = keys.isna() & lat.notna() & lon.notna()
+        if missing.any():
+            keys.loc[missing] = [
+                "gh:" + geohash(a, b, geohash_precision)
+                for a, b in zip(lat[missing], lon[missing])
+            ]
+
+    return keys
+
+# Trigramas de um nome (com padding para valorizar início/fim)
+def _trigrams(name: str) -> set:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Pares similares dentro de um bloco (vetorizado): retorna (i, j, similaridade)
+def _similar_pairs(names: list, threshold: float):
+    grams = [_trigrams(n) for n in names]
+    vocab = {}
+    rows, cols = [], []
+    for i, g in enumerate(grams):
+        for gram in g:
+            rows.append(i)
+            cols.append(vocab.setdefault(gram, len(vocab)))
+
+    matrix = np.zeros((len(names), len(vocab)), dtype=np.float32)
+    matrix[rows, cols] = 1.0
+
+    inter = matrix @ matrix.T
+    sizes = matrix.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - inter
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sim = np.where(union > 0, inter / union, 0.0)
+
+    i_idx, j_idx = np.nonzero(np.triu(sim >= threshold, k=1))
+    return i_idx, j_idx, sim[i_idx, j_idx]
+
+
+class _UnionFind:
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+# Função principal: detecta clusters de quase duplicados.
+# Retorna (DataFrame de clusters, dict de estatísticas).
+def detect_fuzzy_duplicates(
+    df: pd.DataFrame,
+    threshold: float = 0.8,
+    max_block_size: int = 2000,
+    geohash_precision: int = 6,
+):
+    cluster_cols = ["cluster_id", "id", "name", "city", "state", "cluster_size", "max_similarity"]
+    stats = {"blocks": 0, "candidate_pairs": 0, "matched_pairs": 0, "clusters": 0, "records_in_clusters": 0}
+
+    if df.empty or "name" not in df.columns:
+        return pd.DataFrame(columns=cluster_cols), stats
+
+    work = df.reset_index(drop=True)
+    work = work.assign(
+        _block=_blocking_keys(work, geohash_precision),
+        _name=work["name"].map(normalize_name),
+    )
+    work = work[work["_block"].notna() & (work["_name"] != "")]
+
+    uf = _UnionFind()
+    best_sim = {}
+
+    for _, block in work.groupby("_block", sort=False):
+        if len(block) < 2:
+            continue
+
+        # Bloco muito grande: sub-bloco pela inicial do nome normalizado
+        sub_blocks = [block] if len(block) <= max_block_size else [g for _, g in block.groupby(block["_name"].str[0])]
+
+        for sub in sub_blocks:
+            if len(sub) < 2:
+                continue
+            stats["blocks"] += 1
+            stats["candidate_pairs"] += len(sub) * (len(sub) - 1) // 2
+
+            positions = sub.index.to_numpy()
+            i_idx, j_idx, sims = _similar_pairs(sub["_name"].tolist(), threshold)
+            for i, j, s in zip(positions[i_idx], positions[j_idx], sims):
+                uf.union(i, j)
+                best_sim[i] = max(best_sim.get(i, 0.0), float(s))
+                best_sim[j] = max(best_sim.get(j, 0.0), float(s))
+                stats["matched_pairs"] += 1
+
+    if not best_sim:
+        return pd.DataFrame(columns=cluster_cols), stats
+
+    members = sorted(best_sim)
+    roots = [uf.find(m) for m in members]
+    clusters = work.loc[members, [c for c in ["id", "name", "city", "state"] if c in work.columns]].copy()
+    clusters["_root"] = roots
+    clusters["max_similarity"] = [round(best_sim[m], 4) for m in members]
+
+    # cluster_id = menor id do cluster (estável entre execuções)
+    clusters["cluster_id"] = clusters.groupby("_root")["id"].transform("min") if "id" in clusters.columns else clusters["_root"]
+    clusters["cluster_size"] = clusters.groupby("_root")["_root"].transform("size")
+    clusters = clusters.drop(columns="_root").sort_values(["cluster_id", "id"]).reset_index(drop=True)
+
+    stats["clusters"] = int(clusters["cluster_id"].nunique())
+    stats["records_in_clusters"] = int(len(clusters))
+    return clusters[[c for c in cluster_cols if c in clusters.columns]], stats
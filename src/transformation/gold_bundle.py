@@ -0,0 +1,83 @@
+# Bibliotecas
+import os
+import json
+import struct
+import pyarrow as pa
+
+# Bundle Gold: várias tabelas Arrow IPC em um único arquivo, com índice no rodapé.
+#
+# Layout:
+#   MAGIC | tabela_1 (Arrow IPC file) | pad | tabela_2 | pad | ... | índice JSON | tamanho do índice (u64 LE) | MAGIC
+#
+# Cada tabela começa em um offset alinhado a 64 bytes, então o leitor faz
+# memory-map do arquivo e abre cada tabela direto sobre o mapa (zero-copy).
+
+BUNDLE_FILE = "gold_bundle.arrow"
+# Marcador de partição Gold completa: gravado pela Gold depois de todas as saídas
+SUCCESS_FILE = "_SUCCESS"
+BUNDLE_MAGIC = b"BRWGOLD1"
+_ALIGNMENT = 64
+_FOOTER_SIZE = 8 + len(BUNDLE_MAGIC)
+
+# Serializa uma tabela no formato Arrow IPC (file)
+def _serialize_table(table: pa.Table) -> pa.Buffer:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+# Grava o bundle com todas as tabelas (gravação atômica: tmp + rename).
+# `tables` é um dict nome -> DataFrame pandas ou pyarrow.Table.
+def write_gold_bundle(path: str, tables: dict) -> dict:
+    index = {"version": 1, "tables": {}}
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        offset = len(BUNDLE_MAGIC)
+
+        for name, frame in tables.items():
+            table = frame if isinstance(frame, pa.Table) else pa.Table.from_pandas(frame, preserve_index=False)
+
+            padding = (-offset) % _ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+
+            payload = _serialize_table(table)
+            f.write(payload)
+            index["tables"][name] = {"offset": offset, "length": payload.size, "rows": table.num_rows}
+            offset += payload.size
+
+        raw_index = json.dumps(index).encode("utf-8")
+        f.write(raw_index)
+        f.write(struct.pack("<Q", len(raw_index)))
+        f.write(BUNDLE_MAGIC)
+
+    os.replace(tmp_path, path)
+    return index
+
+# Lê o índice do bundle (nome -> offset/length/rows)
+def read_gold_bundle_index(path: str) -> dict:
+    with open(path, "rb") as f:
+        f.seek(-_FOOTER_SIZE, os.SEEK_END)
+        footer = f.read(_FOOTER_SIZE)
+        if footer[8:] != BUNDLE_MAGIC:
+            raise ValueError(f"Arquivo não é um bundle Gold válido: {path}")
+        (index_size,) = struct.unpack("<Q", footer[:8])
+        f.seek(-(_FOOTER_SIZE + index_size), os.SEEK_END)
+        return json.loads(f.read(index_size).decode("utf-8"))
+
+# Abre o bundle via memory-map e retorna dict nome -> pyarrow.Table (zero-copy).
+# `tables` permite carregar só algumas tabelas.
+def read_gold_bundle(path: str, tables: list = None) -> dict:
+    index = read_gold_bundle_index(path)
+    source = pa.memory_map(path, "r")
+    buffer = source.read_buffer()
+
+    result = {}
+    for name, entry in index["tables"].items():
+        if tables is not None and name not in tables:
+            continue
+        chunk = buffer.slice(entry["offset"], entry["length"])
+        result[name] = pa.ipc.open_file(chunk).read_all()
+    return result
@@ -0,0 +1,340 @@
+# Scripts
+from src.utils_log import configurar_logger, print_log, bind_log_context
+from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id
+
+# Bibliotecas
+import os
+import re
+import json
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, datetime
+from dotenv import load_dotenv
+
+# Arquivos das séries temporais (gravados em gold/timeseries)
+TIMESERIES_STATE_TYPE_FILE = "breweries_daily_by_state_type.parquet"
+TIMESERIES_STATE_FILE = "breweries_daily_by_state.parquet"
+# Versão (inode, mtime, tamanho) de cada partição Silver usada nas séries. Uma data
+# já presente é recalculada quando a partição Silver dela muda (reprocessamento,
+# backfill --force); a Silver grava com temporário + rename, então a versão muda.
+TIMESERIES_SOURCES_FILE = "_silver_versions.json"
+
+# Colunas lidas da Silver (projeção: só o necessário para as séries)
+TIMESERIES_COLUMNS = ["id", "state", "brewery_type"]
+
+_PARTITION_RE = re.compile(r"^processing_date=(\d{4}-\d{2}-\d{2})$")
+
+# FUNÇÃO PARA DEFINIR EXECUTION DATE
+def _resolve_execution_date(execution_date: str = None) -> str:
+    if execution_date:
+        return execution_date
+    return os.getenv("AIRFLOW_CTX_EXECUTION_DATE", datetime.now().strftime("%Y-%m-%d"))[:10]
+
+# Lista as partições Silver disponíveis (data -> caminho do parquet)
+def _list_silver_partitions(silver_path: str, until_date: str = None) -> dict:
+    partitions = {}
+    if not os.path.isdir(silver_path):
+        return partitions
+
+    for entry in os.listdir(silver_path):
+        match = _PARTITION_RE.match(entry)
+        if not match:
+            continue
+        partition_date = match.group(1)
+        if until_date and partition_date > until_date:
+            continue
+        parquet_file = os.path.join(silver_path, entry, "breweries.parquet")
+        if os.path.exists(parquet_file):
+            partitions[partition_date] = parquet_file
+
+    return dict(sorted(partitions.items()))
+
+def _partition_version(parquet_file: str) -> list:
+    st = os.stat(parquet_file)
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+def _read_versions(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_versions(path: str, versions: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(versions, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Datas já na série cuja partição Silver mudou desde o último cálculo
+# (datas sem versão registrada, ex.: séries antigas, não são consideradas alteradas)
+def _changed_dates(versions: dict, current: dict, existing_dates: set) -> list:
+    return sorted(
+        d for d in existing_dates
+        if d in versions and d in current and versions[d] != current[d]
+    )
+
+# Lê uma partição Silver projetando apenas as colunas usadas nas séries
+def _read_partition(parquet_file: str) -> pd.DataFrame:
+    available = set(pq.read_schema(parquet_file).names)
+    columns = [c for c in TIMESERIES_COLUMNS if c in available]
+    df = pq.read_table(parquet_file, columns=columns).to_pandas()
+    for col in TIMESERIES_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+# Lê a série já existente (ou retorna DataFrame vazio)
+def _read_existing_series(path: str) -> pd.DataFrame:
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    return pd.DataFrame()
+
+# Grava parquet de forma atômica (arquivo temporário + rename)
+def _atomic_to_parquet(frame: pd.DataFrame, path: str):
+    tmp_path = f"{path}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+# Define quais datas precisam ser (re)calculadas e quais precisam ser lidas.
+# Datas novas e datas cuja Silver mudou (changed_dates) entram no cálculo; a data
+# seguinte a uma delas (já existente) é recalculada porque o seu "dia anterior"
+# mudou (ex.: backfill de data antiga).
+def _plan_dates(all_dates: list, existing_dates: set, changed_dates: list = ()):
+    new_dates = [d for d in all_dates if d not in existing_dates]
+    to_compute = set(new_dates) | set(changed_dates)
+
+    for d in sorted(to_compute):
+        idx = all_dates.index(d)
+        if idx + 1 < len(all_dates) and all_dates[idx + 1] in existing_dates:
+            to_compute.add(all_dates[idx + 1])
+
+    to_read = set(to_compute)
+    for d in to_compute:
+        idx = all_dates.index(d)
+        if idx > 0:
+            to_read.add(all_dates[idx - 1])
+
+    return new_dates, sorted(to_compute), sorted(to_read)
+
+# Calcula as linhas das séries para as datas informadas
+def _build_series_rows(dates_to_compute: list, all_dates: list, frames: dict):
+    state_type_rows = []
+    state_rows = []
+
+    for d in dates_to_compute:
+        df = frames[d]
+
+        by_state_type = (
+            df.groupby(["state", "brewery_type"])
+            .size()
+            .reset_index(name="breweries")
+        )
+        by_state_type.insert(0, "processing_date", d)
+        state_type_rows.append(by_state_type)
+
+        by_state = df.groupby("state").size().reset_index(name="breweries")
+        by_state.insert(0, "processing_date", d)
+
+        # Aberturas / fechamentos por estado comparando os IDs com o dia anterior
+        idx = all_dates.index(d)
+        if idx > 0 and all_dates[idx - 1] in frames:
+            prev = frames[all_dates[idx - 1]]
+            current_ids = df.dropna(subset=["id"]).groupby("state")["id"].agg(set)
+            previous_ids = prev.dropna(subset=["id"]).groupby("state")["id"].agg(set)
+
+            opened = {s: len(ids - previous_ids.get(s, set())) for s, ids in current_ids.items()}
+            closed = {s: len(ids - current_ids.get(s, set())) for s, ids in previous_ids.items()}
+
+            by_state["opened"] = by_state["state"].map(opened).fillna(0).astype("Int64")
+            by_state["closed"] = by_state["state"].map(closed).fillna(0).astype("Int64")
+
+            # Estados que deixaram de existir no dia aparecem com 0 cervejarias
+            gone = sorted(set(previous_ids.index) - set(by_state["state"].dropna()))
+            if gone:
+                by_state = pd.concat([
+                    by_state,
+                    pd.DataFrame({
+                        "processing_date": d,
+                        "state": gone,
+                        "breweries": 0,
+                        "opened": pd.array([0] * len(gone), dtype="Int64"),
+                        "closed": pd.array([closed.get(s, 0) for s in gone], dtype="Int64"),
+                    }),
+                ], ignore_index=True)
+        else:
+            # Primeira data da série: não há base de comparação
+            by_state["opened"] = pd.array([pd.NA] * len(by_state), dtype="Int64")
+            by_state["closed"] = pd.array([pd.NA] * len(by_state), dtype="Int64")
+
+        state_rows.append(by_state)
+
+    return state_type_rows, state_rows
+
+# Substitui as datas recalculadas na série existente e ordena
+def _merge_series(existing: pd.DataFrame, new_rows: list, dates: list, sort_cols: list) -> pd.DataFrame:
+    if not existing.empty:
+        existing = existing[~existing["processing_date"].isin(dates)]
+    frames = [f for f in [existing] + new_rows if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.sort_values(sort_cols).reset_index(drop=True)
+
+# Função principal: mantém as séries temporais Gold a partir de todas as partições Silver.
+# Processa somente as datas que ainda não estão na série ou cuja partição Silver mudou.
+def build_gold_timeseries(execution_date: str = None, max_workers: int = None):
+    # CARREGA VARIAVEIS
+    # Carrega .env somente quando a função roda (evita side-effects em testes/import)
+    load_dotenv(".env", override=False)
+    execution_date = _resolve_execution_date(execution_date)
+    datalake_root = os.getenv('DATALAKE_PATH', "/opt/airflow/datalake")
+    if not datalake_root:
+        return {"success": False, "error": "DATALAKE_PATH not set"}
+
+    SILVER_PATH = os.path.join(datalake_root, "silver")
+    TIMESERIES_PATH = os.path.join(datalake_root, "gold", "timeseries")
+    max_workers = max_workers or int(os.getenv("GOLD_TIMESERIES_WORKERS", "4"))
+
+    # Variavel para quantificar tempo do processo
+    start_time = time.time()
+
+    # Variaveis do log
+    log_root = os.getenv('LOG_FOLDER', "/opt/airflow/logs")
+    logger = None
+    if log_root and os.getenv("ENV") != "TEST":
+        log_folder = os.path.join(log_root, "transform")
+        os.makedirs(log_folder, exist_ok=True)
+        logger = configurar_logger(log_folder, "_gold_timeseries.txt", "GoldTimeseries")
+        bind_log_context(logger, stage="gold_timeseries", execution_date=execution_date)
+
+    success = False
+    error_msg = None
+    run_id = None
+    output_files = {}
+    new_dates = []
+    changed_dates = []
+    dates_to_compute = []
+    dates_to_read = []
+    series_dates = 0
+
+    try:
+        print_log(logger, "Iniciando atualização das séries temporais GOLD...", "info")
+
+        partitions = _list_silver_partitions(SILVER_PATH, until_date=execution_date)
+        if not partitions:
+            error_msg = f"Nenhuma partição Silver encontrada em: {SILVER_PATH}"
+            print_log(logger, error_msg, "error")
+            return {"success": False, "error": error_msg}
+
+        state_type_path = os.path.join(TIMESERIES_PATH, TIMESERIES_STATE_TYPE_FILE)
+        state_path = os.path.join(TIMESERIES_PATH, TIMESERIES_STATE_FILE)
+        versions_path = os.path.join(TIMESERIES_PATH, TIMESERIES_SOURCES_FILE)
+
+        existing_state_type = _read_existing_series(state_type_path)
+        existing_state = _read_existing_series(state_path)
+        existing_dates = set(existing_state["processing_date"]) if not existing_state.empty else set()
+
+        all_dates = list(partitions.keys())
+        stored_versions = _read_versions(versions_path)
+        current_versions = {d: _partition_version(path) for d, path in partitions.items()}
+        changed_dates = _changed_dates(stored_versions, current_versions, existing_dates)
+        new_dates, dates_to_compute, dates_to_read = _plan_dates(all_dates, existing_dates, changed_dates)
+
+        if not dates_to_compute:
+            print_log(logger, "Séries temporais já atualizadas. Nada a processar.", "info")
+            # séries anteriores ao registro de versões: passa a registrar
+            if existing_dates and {**stored_versions, **current_versions} != stored_versions:
+                _write_versions(versions_path, {**stored_versions, **current_versions})
+            output_files = {
+                TIMESERIES_STATE_TYPE_FILE: state_type_path,
+                TIMESERIES_STATE_FILE: state_path,
+            }
+            series_dates = len(existing_dates)
+            success = True
+            return
+
+        print_log(logger, f"Datas novas: {len(new_dates)} | Silver alterada: {len(changed_dates)} | partições a ler: {len(dates_to_read)}", "info")
+
+        # Leitura paralela das partições (pyarrow libera o GIL durante a leitura)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            loaded = executor.map(_read_partition, [partitions[d] for d in dates_to_read])
+            frames = dict(zip(dates_to_read, loaded))
+
+        state_type_rows, state_rows = _build_series_rows(dates_to_compute, all_dates, frames)
+
+        series_state_type = _merge_series(
+            existing_state_type, state_type_rows, dates_to_compute,
+            ["processing_date", "state", "brewery_type"],
+        )
+        series_state = _merge_series(
+            existing_state, state_rows, dates_to_compute,
+            ["processing_date", "state"],
+        )
+
+        os.makedirs(TIMESERIES_PATH, exist_ok=True)
+        _atomic_to_parquet(series_state_type, state_type_path)
+        _atomic_to_parquet(series_state, state_path)
+        # versões gravadas depois das séries: uma falha no meio recalcula na próxima execução
+        _write_versions(versions_path, {**stored_versions, **current_versions})
+        output_files = {
+            TIMESERIES_STATE_TYPE_FILE: state_type_path,
+            TIMESERIES_STATE_FILE: state_path,
+        }
+        series_dates = series_state["processing_date"].nunique()
+
+        print_log(logger, f"Séries temporais atualizadas ({series_dates} datas)", "success")
+        success = True
+
+    # Erro inesperado geral
+    except Exception as e:
+        error_msg = f"Erro fatal inesperado: {e}"
+        print_log(logger, error_msg, "error")
+        success = False
+
+    # Finalização e métricas
+    finally:
+        duration = str(timedelta(seconds=time.time() - start_time))
+
+        if success:
+            print_log(logger, f"Séries temporais GOLD finalizadas em {duration}", "success")
+
+            run_id = generate_run_id()
+            init_db()
+
+            metrics = {
+                "dates_new": len(new_dates),
+                "dates_changed": len(changed_dates),
+                "dates_recomputed": len(dates_to_compute),
+                "partitions_read": len(dates_to_read),
+                "series_dates": series_dates,
+                "transform_duration": duration,
+            }
+
+            save_metrics_dict(run_id, execution_date, "gold_timeseries", metrics)
+
+        else:
+            print_log(logger, f"Séries temporais GOLD falharam. Tempo: {duration}", "error")
+
+        result = {
+            "success": success,
+            "output_files": output_files,
+            "dates_new": new_dates,
+            "dates_changed": changed_dates,
+            "dates_recomputed": dates_to_compute,
+            "partitions_read": len(dates_to_read),
+            "series_dates": series_dates,
+            "duration": duration,
+            "run_id": run_id,
+            "transform_date": execution_date,
+        }
+
+        if error_msg:
+            result["error"] = error_msg
+
+        return result
+
+
+if __name__ == "__main__":
+    build_gold_timeseries()
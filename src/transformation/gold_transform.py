@@ -1,11 +1,26 @@
 # Scripts
-from src.utils_log import configurar_logger, print_log
+from src.utils_log import configurar_logger, print_log, bind_log_context
 from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id
+from src.transformation.gold_bundle import BUNDLE_FILE, SUCCESS_FILE, write_gold_bundle
+from src.transformation.heavy_hitters import ExactTopK
+from src.transformation import gold_bundle, heavy_hitters
+from src.transformation.stage_fingerprint import (
+    skip_if_unchanged_enabled, stage_fingerprint, file_sha256,
+    find_reusable, reuse_outputs, reused_result, save_last_success,
+    write_parquet_atomic,
+)
+from src.monitoring.stage_trace import StageTrace
+from src.monitoring.stage_profiler import StageProfiler
+from src.monitoring.memory_usage import MemoryTracker, exceeds_budget, batch_input_bytes
 
 # Bibliotecas
 import os
+import json
 import time
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import timedelta, datetime
 from dotenv import load_dotenv
 
@@ -15,9 +30,195 @@ def _resolve_execution_date(execution_date: str = None) -> str:
         return execution_date
     return os.getenv("AIRFLOW_CTX_EXECUTION_DATE", datetime.now().strftime("%Y-%m-%d"))[:10]
 
+# Skip-if-unchanged: arquivos de código e configuração que mudam a saída da Gold
+_GOLD_CODE_FILES = [__file__, gold_bundle.__file__, heavy_hitters.__file__]
+
+def _gold_config() -> dict:
+    return {name: os.getenv(name) for name in ("GOLD_OUTPUT_FORMAT", "GOLD_CITY_TOP_K")}
+
+# Formatos de saída aceitos em GOLD_OUTPUT_FORMAT
+GOLD_OUTPUT_FORMATS = ("parquet", "arrow_bundle", "both")
+
+# Envia as gravações das saídas Gold para o executor. Retorna {arquivo: (caminho, future)}.
+def _submit_gold_writes(executor, output_folder: str, files_to_save: dict, output_format: str) -> dict:
+    jobs = {}
+    if output_format in ("parquet", "both"):
+        for filename, frame in files_to_save.items():
+            out_path = os.path.join(output_folder, filename)
+            jobs[filename] = (out_path, executor.submit(write_parquet_atomic, frame, out_path))
+
+    if output_format in ("arrow_bundle", "both"):
+        bundle_path = os.path.join(output_folder, BUNDLE_FILE)
+        tables = {os.path.splitext(name)[0]: frame for name, frame in files_to_save.items()}
+        jobs[BUNDLE_FILE] = (bundle_path, executor.submit(write_gold_bundle, bundle_path, tables))
+    return jobs
+
+# Antes de gravar: remove o marcador de partição completa e as saídas do formato que
+# não será gravado (ex.: bundle antigo depois de trocar GOLD_OUTPUT_FORMAT de both
+# para parquet - a serving e o contrato de dados preferem o bundle).
+def _clear_gold_outputs(output_folder: str, files_to_save: dict, output_format: str):
+    stale = [SUCCESS_FILE]
+    if output_format == "parquet":
+        stale.append(BUNDLE_FILE)
+    elif output_format == "arrow_bundle":
+        stale.extend(files_to_save)
+    for name in stale:
+        path = os.path.join(output_folder, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+# Marcador de partição completa (lido pela serving), gravado depois de todas as saídas
+def write_success_marker(output_folder: str, files: list) -> str:
+    path = os.path.join(output_folder, SUCCESS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"files": sorted(files), "written_at": datetime.now().isoformat()}, f, indent=4)
+    os.replace(tmp_path, path)
+    return path
+
+# Roda no writer depois das gravações (enviadas antes, então já em execução):
+# grava o marcador só se todas deram certo (o erro de cada uma já é reportado pelo writer)
+def _mark_when_written(output_folder: str, jobs: dict):
+    futures = [future for _, future in jobs.values()]
+    wait(futures)
+    if all(future.exception() is None for future in futures):
+        write_success_marker(output_folder, list(jobs))
+
+# Grava as saídas Gold em paralelo (pyarrow libera o GIL durante a escrita).
+# Com arrow_bundle/both também gera um único arquivo Arrow IPC com todas as tabelas.
+# Com `writer` (src.pipeline_runner) as gravações ficam em background e não são aguardadas aqui.
+# O marcador SUCCESS_FILE só é gravado depois de todas as saídas.
+def _write_gold_outputs(output_folder: str, files_to_save: dict, output_format: str = "parquet", writer=None) -> dict:
+    _clear_gold_outputs(output_folder, files_to_save, output_format)
+
+    if writer is not None:
+        jobs = _submit_gold_writes(writer, output_folder, files_to_save, output_format)
+        writer.submit(_mark_when_written, output_folder, jobs)
+        return {filename: out_path for filename, (out_path, _) in jobs.items()}
+
+    written = {}
+    with ThreadPoolExecutor(max_workers=len(files_to_save) + 1) as executor:
+        jobs = _submit_gold_writes(executor, output_folder, files_to_save, output_format)
+
+        # result() propaga a primeira exceção de escrita
+        for filename, (out_path, future) in jobs.items():
+            future.result()
+            written[filename] = out_path
+
+    write_success_marker(output_folder, list(written))
+    return written
+
+# Chaves de cada agregação Gold (a de cidade x estado pode ser top-k)
+_AGGREGATIONS = {
+    "state_type": ["state", "brewery_type"],
+    "state": ["state"],
+    "type": ["brewery_type"],
+    "city_state": ["city", "state"],
+}
+
+# Agregações Gold sobre a Silver inteira em memória
+def _aggregate(df: pd.DataFrame, city_top_k: int) -> tuple:
+    # Cálculo das Métricas
+    # Qual é a distribuição de tipos de cervejaria por estado?
+    gold_df = (
+        df.groupby(["state", "brewery_type"])
+        .size()
+        .reset_index(name="breweries_per_state_type")
+        .sort_values("breweries_per_state_type", ascending=False)
+    )
+
+    # Quantas cervejarias existem por estado?
+    df_state = df.groupby("state").size().reset_index(name="breweries_per_state").sort_values("breweries_per_state", ascending=False)
+
+    # Quantas cervejarias existem de cada tipo?
+    df_type = df.groupby("brewery_type").size().reset_index(name="brewery_per_type")
+
+    # Qual é a concentração de cervejarias por cidade + estado?
+    # Com GOLD_CITY_TOP_K > 0 grava só o ranking top-k (heap limitado, sem sort completo)
+    if city_top_k > 0:
+        df_city = _top_k_frame(ExactTopK(city_top_k).update_batch(df, ["city", "state"]))
+    else:
+        df_city = df.groupby(["city", "state"]).size().reset_index(name="brewery_per_city_state").sort_values("brewery_per_city_state", ascending=False)
+
+    return gold_df, df_state, df_type, df_city
+
+# Contagem por chave direto na tabela Arrow (só o resultado agregado vira DataFrame).
+# Chaves nulas são descartadas e o resultado sai ordenado pelas chaves, como o
+# groupby().size().reset_index() do pandas.
+def _arrow_counts(table, keys: list, column: str, sort_keys: bool = True) -> pd.DataFrame:
+    keyed = table.select(keys)
+    valid = pc.is_valid(keyed.column(keys[0]))
+    for key in keys[1:]:
+        valid = pc.and_(valid, pc.is_valid(keyed.column(key)))
+    # use_threads=False: grupos na ordem da primeira ocorrência (como groupby(sort=False))
+    counts = keyed.filter(valid).group_by(keys, use_threads=False).aggregate([([], "count_all")])
+    frame = counts.to_pandas().rename(columns={"count_all": column})[keys + [column]]
+    frame[column] = frame[column].astype("int64")
+    if sort_keys:
+        frame = frame.sort_values(keys).reset_index(drop=True)
+    return frame
+
+# Agregações Gold sobre a tabela Arrow da Silver (src.pipeline_runner), sem converter a
+# Silver inteira para pandas. Mesmo resultado (e mesma ordenação) de _aggregate.
+def _aggregate_arrow(table, city_top_k: int) -> tuple:
+    gold_df = _arrow_counts(table, ["state", "brewery_type"], "breweries_per_state_type").sort_values("breweries_per_state_type", ascending=False)
+    df_state = _arrow_counts(table, ["state"], "breweries_per_state").sort_values("breweries_per_state", ascending=False)
+    df_type = _arrow_counts(table, ["brewery_type"], "brewery_per_type")
+
+    if city_top_k > 0:
+        city_counts = _arrow_counts(table, ["city", "state"], "brewery_per_city_state", sort_keys=False)
+        top_k = ExactTopK(city_top_k).update_counts({
+            (city, state): int(count)
+            for city, state, count in zip(city_counts["city"], city_counts["state"], city_counts["brewery_per_city_state"])
+        })
+        df_city = _top_k_frame(top_k)
+    else:
+        df_city = _arrow_counts(table, ["city", "state"], "brewery_per_city_state").sort_values("brewery_per_city_state", ascending=False)
+
+    return gold_df, df_state, df_type, df_city
+
+def _top_k_frame(top_k: ExactTopK) -> pd.DataFrame:
+    return pd.DataFrame(
+        [(city, state, count) for (city, state), count in top_k.top()],
+        columns=["city", "state", "brewery_per_city_state"],
+    )
+
+# Agregações Gold lendo a Silver em lotes de `batch_rows` linhas (entrada acima do
+# orçamento de memória). As contagens parciais de cada lote são somadas; o resultado
+# é o mesmo do groupby sobre a Silver inteira (mesmas chaves ordenadas e mesma ordenação final).
+def _aggregate_in_batches(parquet_file: str, batch_rows: int, city_top_k: int, memory) -> tuple:
+    counts = {}
+    top_k = ExactTopK(city_top_k) if city_top_k > 0 else None
+    batches = 0
+
+    for batch in pq.ParquetFile(parquet_file).iter_batches(batch_size=batch_rows, columns=["state", "brewery_type", "city"]):
+        frame = memory.observe(batch.to_pandas())
+        batches += 1
+        for name, keys in _AGGREGATIONS.items():
+            if name == "city_state" and top_k is not None:
+                top_k.update_batch(frame, keys)
+                continue
+            partial = frame.groupby(keys).size()
+            counts[name] = partial if name not in counts else counts[name].add(partial, fill_value=0)
+
+    def _counts(name: str, column: str) -> pd.DataFrame:
+        return counts[name].sort_index().astype("int64").reset_index(name=column)
+
+    gold_df = _counts("state_type", "breweries_per_state_type").sort_values("breweries_per_state_type", ascending=False)
+    df_state = _counts("state", "breweries_per_state").sort_values("breweries_per_state", ascending=False)
+    df_type = _counts("type", "brewery_per_type")
+    if top_k is not None:
+        df_city = _top_k_frame(top_k)
+    else:
+        df_city = _counts("city_state", "brewery_per_city_state").sort_values("brewery_per_city_state", ascending=False)
+
+    return gold_df, df_state, df_type, df_city, batches
+
 # Função principal para agregações dos dados contidos da camada Silver
-# também salva os dados na camada Gold
-def transform_to_gold(execution_date: str = None):
+# também salva os dados na camada Gold.
+# Execução em processo (src.pipeline_runner): `table` é a tabela Arrow da Silver em
+# memória e `writer` grava as saídas em background (sem skip-if-unchanged nesse modo).
+def transform_to_gold(execution_date: str = None, table=None, writer=None):
      # CARREGA VARIAVEIS
     # Carrega .env somente quando a função roda (evita side-effects em testes/import)
     load_dotenv(".env", override=False)
@@ -41,6 +242,7 @@ def transform_to_gold(execution_date: str = None):
         log_folder = os.path.join(log_root, "transform")
         os.makedirs(log_folder, exist_ok=True)
         logger = configurar_logger(log_folder, "_gold_transform.txt", "Gold")
+        bind_log_context(logger, stage="gold", execution_date=execution_date)
 
     # Inicializa a variável global sucess para controlar fluxo e variaveis de controle
     global success
@@ -59,69 +261,107 @@ def transform_to_gold(execution_date: str = None):
     df_state = pd.DataFrame()
     df_type = pd.DataFrame()
     df_city = pd.DataFrame()
-
+    # Skip-if-unchanged
+    fingerprint = None
+    reused_state = None
+    trace = StageTrace("gold", execution_date)
+    memory = MemoryTracker()
+    chunked_rows = 0
+    profiler = StageProfiler("gold", execution_date).start()
 
     try:
         print_log(logger, "Iniciando transformação GOLD...", "info")
 
-        # Localiza pasta Silver do dia
-        silver_folder = os.path.join(SILVER_PATH, f"processing_date={execution_date}")
-
-        if not os.path.exists(silver_folder):
-            msg = f"Pasta Silver não encontrada: {silver_folder}"
-            error_msg = msg
-            print_log(logger, msg, "error")
-            return {"success": False, "error": msg}
+        # Tabela Arrow da Silver já em memória (src.pipeline_runner): não relê o parquet
+        # e agrega direto no Arrow (sem converter para pandas)
+        if table is not None:
+            memory.observe(table)
+            print_log(logger, "Tabela Silver recebida em memória", "info")
+        else:
+            # Localiza pasta Silver do dia
+            silver_folder = os.path.join(SILVER_PATH, f"processing_date={execution_date}")
+
+            if not os.path.exists(silver_folder):
+                msg = f"Pasta Silver não encontrada: {silver_folder}"
+                error_msg = msg
+                print_log(logger, msg, "error")
+                return {"success": False, "error": msg}
         
-        parquet_file = os.path.join(silver_folder, "breweries.parquet")
+            parquet_file = os.path.join(silver_folder, "breweries.parquet")
 
-        if not os.path.exists(parquet_file):
-            msg = f"Arquivo Parquet Silver não encontrado: {parquet_file}"
-            error_msg = msg
-            print_log(logger, msg, "error")
-            return {"success": False, "error": msg}
+            if not os.path.exists(parquet_file):
+                msg = f"Arquivo Parquet Silver não encontrado: {parquet_file}"
+                error_msg = msg
+                print_log(logger, msg, "error")
+                return {"success": False, "error": msg}
         
-        print_log(logger, "Arquivo Silver encontrado, carregando dados...", "info")
-
-        # Leitura do Parquet
-        try:
-            df = pd.read_parquet(parquet_file)
-        except Exception as e:
-            msg = f"Erro ao ler Parquet: {e}"
-            error_msg = msg
-            print_log(logger, msg, "error")
-            return {"success": False, "error": msg}
+            # Parquet Silver, código e configuração iguais aos do último sucesso: reaproveita a saída anterior
+            if skip_if_unchanged_enabled() and writer is None:
+                with trace.span("fingerprint"):
+                    fingerprint = stage_fingerprint(file_sha256(parquet_file), _GOLD_CODE_FILES, _gold_config())
+                    reused_state = find_reusable(datalake_root, "gold", fingerprint)
+                if reused_state:
+                    output_folder = os.path.join(GOLD_PATH, f"processing_date={execution_date}")
+                    output_files.update(reuse_outputs(reused_state["output_folder"], output_folder))
+                    # partição de origem anterior ao marcador: marca a partição reaproveitada
+                    if not os.path.exists(os.path.join(output_folder, SUCCESS_FILE)):
+                        write_success_marker(output_folder, list(output_files))
+                    output_files.pop(SUCCESS_FILE, None)
+                    output_file = output_files.get("breweries_by_state_type.parquet") or output_files.get(BUNDLE_FILE)
+                    print_log(logger, f"Silver inalterada desde {reused_state['execution_date']}: Gold reaproveitada em {output_folder}", "success")
+                    success = True
+                    return
+
+            print_log(logger, "Arquivo Silver encontrado, carregando dados...", "info")
+
+            # Leitura do Parquet
+            try:
+                # Orçamento de memória (STAGE_MEMORY_BUDGET_MB): tamanho descomprimido pelo rodapé do parquet
+                metadata = pq.ParquetFile(parquet_file).metadata
+                silver_bytes = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+                over_budget, estimate = exceeds_budget(silver_bytes)
+                if over_budget:
+                    memory.mode = "chunked"
+                    chunked_rows = metadata.num_rows
+                    print_log(logger, f"Silver estimada em {estimate / 1024 / 1024:.1f} MB em memória, acima do orçamento: agregando em lotes", "warning")
+                else:
+                    with trace.span("read_parquet", bytes=os.path.getsize(parquet_file)) as span:
+                        df = memory.observe(pd.read_parquet(parquet_file))
+                        span["rows"] = len(df)
+            except Exception as e:
+                msg = f"Erro ao ler Parquet: {e}"
+                error_msg = msg
+                print_log(logger, msg, "error")
+                return {"success": False, "error": msg}
         
-        if df.empty:
+        if memory.mode == "chunked":
+            total_records = chunked_rows
+        elif table is not None:
+            total_records = table.num_rows
+        else:
+            total_records = len(df)
+
+        if total_records == 0:
             msg = "Arquivo parquet foi carregado mas está vazio"
             error_msg = msg
             print_log(logger, msg, "error")
             return {"success": False, "error": msg}
         
-        total_records = len(df)
         print_log(logger, f"Total de registros recebidos: {total_records}", "info")
 
         # Transformação GOLD (agregações)
         print_log(logger, "Criando agregações Gold...", "info")
 
         try:
-            # Cálculo das Métricas
-            # Qual é a distribuição de tipos de cervejaria por estado?
-            gold_df = (
-                df.groupby(["state", "brewery_type"])
-                .size()
-                .reset_index(name="breweries_per_state_type")
-                .sort_values("breweries_per_state_type", ascending=False)
-            )
-
-            # Quantas cervejarias existem por estado?
-            df_state = df.groupby("state").size().reset_index(name="breweries_per_state").sort_values("breweries_per_state", ascending=False)
-
-            # Quantas cervejarias existem de cada tipo?
-            df_type = df.groupby("brewery_type").size().reset_index(name="brewery_per_type")
-
-            # Qual é a concentração de cervejarias por cidade + estado?
-            df_city = df.groupby(["city", "state"]).size().reset_index(name="brewery_per_city_state").sort_values("brewery_per_city_state", ascending=False)
+            city_top_k = int(os.getenv("GOLD_CITY_TOP_K", "0") or 0)
+            with trace.span("aggregate", rows=total_records) as span:
+                if memory.mode == "chunked":
+                    batch_rows = max(1, int(batch_input_bytes() / max(1, silver_bytes / total_records)))
+                    gold_df, df_state, df_type, df_city, span["batches"] = _aggregate_in_batches(parquet_file, batch_rows, city_top_k, memory)
+                elif table is not None:
+                    gold_df, df_state, df_type, df_city = _aggregate_arrow(table, city_top_k)
+                else:
+                    gold_df, df_state, df_type, df_city = _aggregate(df, city_top_k)
 
         except Exception as e:
             msg = f"Erro ao gerar agregações: {e}"
@@ -165,11 +405,19 @@ def transform_to_gold(execution_date: str = None):
             "breweries_by_city_state.parquet": df_city,
         }
 
+        # Formato de saída: parquet (padrão), arrow_bundle ou both
+        output_format = os.getenv("GOLD_OUTPUT_FORMAT", "parquet").strip().lower()
+        if output_format not in GOLD_OUTPUT_FORMATS:
+            msg = f"GOLD_OUTPUT_FORMAT inválido: {output_format} (use {', '.join(GOLD_OUTPUT_FORMATS)})"
+            error_msg = msg
+            print_log(logger, msg, "error")
+            return {"success": False, "error": msg}
+
         try:
-            for filename, frame in files_to_save.items():
-                out_path = os.path.join(output_folder, filename)
-                frame.to_parquet(out_path, index=False)
-                output_files[filename] = out_path
+            with trace.span("write_outputs", files=len(files_to_save), format=output_format, background=writer is not None) as span:
+                output_files.update(_write_gold_outputs(output_folder, files_to_save, output_format, writer))
+                if writer is None:
+                    span["bytes"] = sum(os.path.getsize(path) for path in output_files.values())
 
         except Exception as e:
             msg = f"Erro ao salvar Gold Parquet: {e}"
@@ -177,7 +425,7 @@ def transform_to_gold(execution_date: str = None):
             print_log(logger, msg, "error")
             return {"success": False, "error": msg}
 
-        output_file = output_files.get("breweries_by_state_type.parquet")
+        output_file = output_files.get("breweries_by_state_type.parquet") or output_files.get(BUNDLE_FILE)
         print_log(logger, "Camada GOLD gerada com sucesso!", "success")
         success = True
     
@@ -190,7 +438,26 @@ def transform_to_gold(execution_date: str = None):
     
     # Finalização e métricas
     finally:
-        duration = str(timedelta(seconds=time.time() - start_time))
+        profiler.stop()
+        memory_report = memory.report()
+        elapsed_seconds = time.time() - start_time
+        duration = str(timedelta(seconds=elapsed_seconds))
+
+        # Etapa pulada: sem métricas de performance (os dados são os do último sucesso)
+        if success and reused_state:
+            run_id = generate_run_id()
+            init_db()
+            save_metrics_dict(run_id, execution_date, "gold", {"skipped_unchanged": True, **profiler.summary})
+            return reused_result(reused_state, {
+                "output_files": output_files,
+                "output_file": output_file,
+                "duration": duration,
+                "spans": trace.summary(),
+                "trace_file": trace.export(run_id)[0],
+                "profile": profiler.result(),
+                "run_id": run_id,
+                "transform_date": execution_date,
+            })
 
         if success:
             print_log(logger, f"Transformação GOLD finalizada em {duration}", "success")
@@ -203,8 +470,19 @@ def transform_to_gold(execution_date: str = None):
                 "records_generated_gold": len(gold_df),
                 "records_state": len(df_state),
                 "records_type": len(df_type),
-                "records_city": len(df_city)
+                "records_city": len(df_city),
+                "transform_duration": duration,
+                "records_per_second": total_records / elapsed_seconds if elapsed_seconds > 0 else None,
             }
+            # Tempo por sub-fase (spans) junto com as métricas da etapa
+            metrics.update(trace.metrics())
+            metrics.update(profiler.summary)
+            metrics.update(memory_report)
+
+            # gravações em background (src.pipeline_runner): métricas provisórias até o runner
+            # registrar writes_committed
+            if writer is not None:
+                metrics["writes_pending"] = True
 
             save_metrics_dict(run_id, execution_date, "gold", metrics)
 
@@ -219,11 +497,26 @@ def transform_to_gold(execution_date: str = None):
             "records_gold": len(gold_df) if success else 0,
             "duration": duration,
             "run_id": run_id,
-            "transform_date": execution_date
+            "transform_date": execution_date,
+            "spans": trace.summary(),
+            "trace_file": None,
+            "profile": profiler.result(),
+            **memory_report,
         }
+        if success and writer is not None:
+            result["writes_pending"] = True
+
+        result["trace_file"], trace_error = trace.export(run_id)
+        if trace_error:
+            print_log(logger, f"Falha ao gravar trace da Gold: {trace_error}", "warning")
 
         if error_msg:
             result["error"] = error_msg
+        elif success and fingerprint:
+            try:
+                save_last_success(datalake_root, "gold", fingerprint, execution_date, output_folder, result)
+            except Exception as e:
+                print_log(logger, f"Falha ao registrar impressão digital da Gold: {e}", "warning")
 
         return result
 
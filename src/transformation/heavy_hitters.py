@@ -0,0 +1,132 @@
+# Bibliotecas
+import heapq
+import itertools
+from collections import Counter
+
+# Operadores de top-k / heavy hitters para rankings Gold.
+#
+# - ExactTopK: agregação parcial (Counter) por lote/partição + merge; o ranking
+#   final usa heap limitado (heapq.nlargest) em vez de ordenar tudo.
+# - SpaceSaving: aproximado com memória fixa (capacity contadores). As contagens
+#   são superestimadas em no máximo `error`, e todo item com frequência acima de
+#   N / capacity está garantidamente no resumo.
+
+# Converte um lote (DataFrame) em contagens parciais por chave
+def _batch_counts(batch, key_cols):
+    if isinstance(key_cols, str):
+        key_cols = [key_cols]
+    grouped = batch.groupby(list(key_cols), sort=False).size()
+    if len(key_cols) == 1:
+        return {key: int(count) for key, count in grouped.items()}
+    return {tuple(key): int(count) for key, count in grouped.items()}
+
+
+class ExactTopK:
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counts = Counter()
+        self.total = 0
+
+    # Soma contagens parciais (dict chave -> contagem)
+    def update_counts(self, counts: dict):
+        self.counts.update(counts)
+        self.total += sum(counts.values())
+        return self
+
+    # Agrega parcialmente um lote (DataFrame) pelas colunas-chave
+    def update_batch(self, batch, key_cols):
+        return self.update_counts(_batch_counts(batch, key_cols))
+
+    # Combina com outro operador (ex.: resultado de outra partição)
+    def merge(self, other: "ExactTopK"):
+        self.counts.update(other.counts)
+        self.total += other.total
+        return self
+
+    # Top-k sem ordenar todas as chaves
+    def top(self, k: int = None) -> list:
+        return heapq.nlargest(k or self.k, self.counts.items(), key=lambda kv: kv[1])
+
+
+class SpaceSaving:
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser maior que zero")
+        self.capacity = capacity
+        self.counters = {}   # chave -> [contagem, erro]
+        self._heap = []      # (contagem, seq, chave) com entradas obsoletas removidas sob demanda
+        self._seq = itertools.count()
+        self.total = 0
+
+    # Menor contagem monitorada (0 enquanto o resumo não está cheio)
+    def min_count(self) -> int:
+        if len(self.counters) < self.capacity:
+            return 0
+        while True:
+            count, _, key = self._heap[0]
+            if key in self.counters and self.counters[key][0] == count:
+                return count
+            heapq.heappop(self._heap)
+
+    # Atualiza o resumo com uma ocorrência (ou peso) da chave
+    def update(self, key, weight: int = 1):
+        self.total += weight
+        entry = self.counters.get(key)
+
+        if entry is not None:
+            entry[0] += weight
+        elif len(self.counters) < self.capacity:
+            entry = self.counters[key] = [weight, 0]
+        else:
+            # Substitui o menor contador: herda a contagem dele como erro
+            floor = self.min_count()
+            _, _, evicted = heapq.heappop(self._heap)
+            del self.counters[evicted]
+            entry = self.counters[key] = [floor + weight, floor]
+
+        heapq.heappush(self._heap, (entry[0], next(self._seq), key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+        return self
+
+    # Descarta entradas obsoletas do heap (mantém memória proporcional a capacity)
+    def _rebuild_heap(self):
+        self._heap = [(entry[0], next(self._seq), key) for key, entry in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    # Agregação parcial do lote antes de alimentar o resumo
+    def update_batch(self, batch, key_cols):
+        for key, count in _batch_counts(batch, key_cols).items():
+            self.update(key, count)
+        return self
+
+    # Merge de dois resumos: chaves ausentes em um lado recebem o mínimo
+    # daquele lado (limite superior da contagem real não monitorada)
+    def merge(self, other: "SpaceSaving"):
+        floor_self, floor_other = self.min_count(), other.min_count()
+        merged = {}
+        for key in set(self.counters) | set(other.counters):
+            c1, e1 = self.counters.get(key, (floor_self, floor_self))
+            c2, e2 = other.counters.get(key, (floor_other, floor_other))
+            merged[key] = [c1 + c2, e1 + e2]
+
+        keep = heapq.nlargest(self.capacity, merged.items(), key=lambda kv: kv[1][0])
+        self.counters = {key: entry for key, entry in keep}
+        self._rebuild_heap()
+        self.total += other.total
+        return self
+
+    # Top-k estimado: lista de (chave, contagem, erro máximo)
+    def top(self, k: int) -> list:
+        best = heapq.nlargest(k, self.counters.items(), key=lambda kv: kv[1][0])
+        return [(key, entry[0], entry[1]) for key, entry in best]
+
+
+# Atalho: top-k de várias partições/lotes pelas colunas-chave
+def top_k_from_batches(batches, key_cols, k: int, approximate: bool = False, capacity: int = None) -> list:
+    operator = SpaceSaving(capacity or k * 10) if approximate else ExactTopK(k)
+    for batch in batches:
+        operator.update_batch(batch, key_cols)
+    return operator.top(k)
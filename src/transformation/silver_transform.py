@@ -1,11 +1,24 @@
 # SCRIPTS
-from src.utils_log import configurar_logger, print_log
+from src.utils_log import configurar_logger, print_log, bind_log_context
 from src.monitoring.metrics_store import init_db, save_metrics_dict, generate_run_id
+from src.transformation.entity_resolution import detect_fuzzy_duplicates
+from src.transformation import entity_resolution
+from src.transformation.stage_fingerprint import (
+    skip_if_unchanged_enabled, stage_fingerprint, bronze_input_hash,
+    find_reusable, reuse_outputs, reused_result, save_last_success,
+    write_parquet_atomic,
+)
+from src.monitoring.stage_trace import StageTrace
+from src.monitoring.stage_profiler import StageProfiler
+from src.monitoring.memory_usage import MemoryTracker, exceeds_budget, batch_input_bytes
 
 # BIBLIOTECAS
 import os
 import json
+import shutil
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import time
 from datetime import timedelta, datetime
 from dotenv import load_dotenv
@@ -35,6 +48,232 @@ def _load_expected_schema_from_env_or_default():
         "longitude", "latitude", "phone", "website_url", "state", "street"
     ])
 
+# Skip-if-unchanged: arquivos de código e configuração que mudam a saída da Silver
+_SILVER_CODE_FILES = [__file__, entity_resolution.__file__]
+
+def _silver_config() -> dict:
+    return {
+        name: os.getenv(name)
+        for name in ("EXPECTED_SILVER_SCHEMA", "FAIL_ON_SCHEMA_MISSING", "SILVER_FUZZY_DEDUP", "SILVER_FUZZY_THRESHOLD")
+    }
+
+# Padronização de Strings
+_STRING_COLS = ["name", "city", "state", "brewery_type"]
+
+# Lista permitida (OpenBrewery "padrão" + fallback "closed")
+_ALLOWED_BREWERY_TYPES = {
+    "micro", "nano", "regional", "brewpub", "large",
+    "planning", "bar", "contract", "proprietor", "closed"
+}
+
+# Schema Final (colunas organizadas)
+_FINAL_COLS = [
+    "id", "name", "brewery_type",
+    "city", "state", "country",
+    "latitude", "longitude",
+    "location", "has_geo",
+    "processing_date"
+]
+
+# Colunas usadas na detecção de quase duplicados (blocking + nome)
+_FUZZY_COLS = ["id", "name", "city", "state", "latitude", "longitude"]
+
+
+class _BronzeReadError(Exception):
+    """Arquivo JSON da Bronze ilegível (mensagem já no formato do erro da etapa)."""
+
+
+# Lê e concatena os registros dos arquivos JSON da Bronze
+def _read_json_files(ingestion_folder: str, json_files: list, trace) -> list:
+    records = []
+    for file in json_files:
+        file_path = os.path.join(ingestion_folder, file)
+
+        try:
+            with trace.span("read_json", file=file, bytes=os.path.getsize(file_path)) as span:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    records.extend(data)
+                span["rows"] = len(data)
+
+        except json.JSONDecodeError:
+            raise _BronzeReadError(f"Erro ao ler JSON inválido: {file}")
+
+        except Exception as e:
+            raise _BronzeReadError(f"Erro inesperado ao abrir {file}: {e}")
+    return records
+
+# Strings padronizadas (strip/lower/espaços) e coordenadas numéricas
+def _standardize(df: pd.DataFrame) -> pd.DataFrame:
+    for col in _STRING_COLS:
+        if col in df.columns:
+            df[col] = (
+                df[col]
+                .astype(str)
+                .str.strip()
+                .str.lower()
+                .str.replace(r"\s+", " ", regex=True)
+            )
+
+            df[col] = df[col].replace(["none", "nan", ""], None)
+
+    # Conversão de Tipos
+    if "latitude" in df.columns:
+        df["latitude"] = pd.to_numeric(df["latitude"], errors="coerce")
+
+    if "longitude" in df.columns:
+        df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
+    return df
+
+# Contagens dos indicadores de qualidade (os percentuais são contagem / registros)
+def _quality_counts(df: pd.DataFrame) -> dict:
+    counts = {
+        "null_name": int(df["name"].isnull().sum()),
+        "null_brewery_type": int(df["brewery_type"].isnull().sum()),
+        "null_city_state": int((df["city"].isnull() | df["state"].isnull()).sum()),
+        "invalid_brewery_type": 0,
+    }
+    # considera inválido: não nulo e fora da lista
+    if "brewery_type" in df.columns:
+        counts["invalid_brewery_type"] = int((
+            df["brewery_type"].notnull() &
+            (~df["brewery_type"].isin(_ALLOWED_BREWERY_TYPES))
+        ).sum())
+    return counts
+
+def _pct(count: int, total: int) -> float:
+    return count / total * 100 if total else 0.0
+
+# Colunas faltando / novas em relação ao schema esperado
+def _schema_diff(columns) -> tuple:
+    expected_schema = _load_expected_schema_from_env_or_default()
+    current_schema = _normalize_schema(columns)
+    return sorted(list(expected_schema - current_schema)), sorted(list(current_schema - expected_schema))
+
+# Lotes de arquivos JSON com até `batch_bytes` bytes (pelo menos um arquivo por lote)
+def _file_batches(ingestion_folder: str, json_files: list, batch_bytes: int):
+    batch, size = [], 0
+    for file in json_files:
+        file_size = os.path.getsize(os.path.join(ingestion_folder, file))
+        if batch and size + file_size > batch_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(file)
+        size += file_size
+    if batch:
+        yield batch
+
+# Silver em lotes (entrada acima do orçamento de memória). Cada lote de JSONs é
+# padronizado, limpo e gravado como uma parte em <saída>/_spill; depois as partes
+# são unidas no parquet final uma de cada vez, com um schema único. Duplicados por
+# id usam os ids já vistos nos lotes anteriores (mesmo resultado do drop_duplicates
+# "keep first" sobre todos os registros). Com `fail_on_missing` e colunas faltando
+# o parquet final não é gravado. Retorna contagens, colunas e linhas gravadas.
+def _transform_in_batches(ingestion_folder: str, json_files: list, output_file: str, batch_bytes: int,
+                          fail_on_missing: bool, trace, memory) -> dict:
+    spill_folder = os.path.join(os.path.dirname(output_file), "_spill")
+    shutil.rmtree(spill_folder, ignore_errors=True)
+    os.makedirs(spill_folder)
+
+    stats = {"records": 0, "duplicate_id": 0, "written": 0, "batches": 0, "columns": set()}
+    stats.update({key: 0 for key in ("null_name", "null_brewery_type", "null_city_state", "invalid_brewery_type")})
+    seen_ids = set()
+    seen_null_id = False
+    parts = []
+
+    try:
+        for number, files in enumerate(_file_batches(ingestion_folder, json_files, batch_bytes)):
+            records = _read_json_files(ingestion_folder, files, trace)
+            if not records:
+                continue
+
+            with trace.span("batch_transform", batch=number, rows=len(records)) as span:
+                df = memory.observe(_standardize(pd.DataFrame(records)))
+                del records
+                stats["columns"].update(df.columns)
+                stats["records"] += len(df)
+                for key, value in _quality_counts(df).items():
+                    stats[key] += value
+
+                ids = df["id"]
+                duplicated = ids.duplicated() | (ids.notna() & ids.isin(seen_ids))
+                if seen_null_id:
+                    duplicated = duplicated | ids.isna()
+                seen_ids.update(ids.dropna().tolist())
+                seen_null_id = seen_null_id or bool(ids.isna().any())
+                stats["duplicate_id"] += int(duplicated.sum())
+
+                df = df[~duplicated & df["name"].notnull()]
+                df = df[[c for c in _FINAL_COLS if c in df.columns]]
+                part = os.path.join(spill_folder, f"part_{number:05d}.parquet")
+                df.to_parquet(part, index=False)
+                parts.append(part)
+                stats["batches"] += 1
+                span["rows_out"] = len(df)
+
+        missing, _ = _schema_diff(stats["columns"])
+        if not parts or (fail_on_missing and missing):
+            return stats
+
+        # Schema único: tipo da primeira parte em que a coluna não é toda nula
+        final_cols = [c for c in _FINAL_COLS if c in stats["columns"]]
+        types = {}
+        for part in parts:
+            for field in pq.read_schema(part):
+                if field.name in final_cols and not pa.types.is_null(field.type):
+                    types.setdefault(field.name, field.type)
+        schema = pa.schema([(c, types.get(c, pa.null())) for c in final_cols])
+
+        # temporário + os.replace: output_file pode ser hard-link de outra partição
+        tmp_file = f"{output_file}.tmp"
+        with trace.span("merge_parts", parts=len(parts)) as span:
+            with pq.ParquetWriter(tmp_file, schema) as out:
+                for part in parts:
+                    table = pq.read_table(part)
+                    columns = [
+                        table.column(c).cast(schema.field(c).type) if c in table.column_names
+                        else pa.nulls(table.num_rows, schema.field(c).type)
+                        for c in final_cols
+                    ]
+                    out.write_table(pa.Table.from_arrays(columns, schema=schema))
+                    stats["written"] += table.num_rows
+            os.replace(tmp_file, output_file)
+            span["rows"] = stats["written"]
+            span["bytes"] = os.path.getsize(output_file)
+    finally:
+        shutil.rmtree(spill_folder, ignore_errors=True)
+        if os.path.exists(f"{output_file}.tmp"):
+            os.remove(f"{output_file}.tmp")
+
+    return stats
+
+# Quase duplicados (mesma cervejaria com ids diferentes) - não bloqueia a Silver.
+# Retorna (percentual de registros excedentes, clusters, arquivo de clusters).
+def _fuzzy_duplicates(df: pd.DataFrame, output_folder: str, writer, logger, trace) -> tuple:
+    if str(os.getenv("SILVER_FUZZY_DEDUP", "true")).strip().lower() != "true":
+        return 0.0, 0, None
+    try:
+        threshold = float(os.getenv("SILVER_FUZZY_THRESHOLD", "0.8"))
+        with trace.span("fuzzy_dedup", rows=len(df)):
+            clusters, er_stats = detect_fuzzy_duplicates(df, threshold=threshold)
+
+        fuzzy_duplicate_clusters = er_stats["clusters"]
+        # registros "excedentes": em cada cluster, todos menos um
+        redundant = er_stats["records_in_clusters"] - er_stats["clusters"]
+        fuzzy_duplicate_pct = (redundant / len(df) * 100) if len(df) else 0.0
+
+        duplicate_clusters_file = os.path.join(output_folder, "duplicate_clusters.parquet")
+        if writer is not None:
+            writer.submit(write_parquet_atomic, clusters, duplicate_clusters_file)
+        else:
+            write_parquet_atomic(clusters, duplicate_clusters_file)
+
+        print_log(logger, f"Quase duplicados: {fuzzy_duplicate_clusters} clusters ({fuzzy_duplicate_pct:.2f}%) | pares candidatos: {er_stats['candidate_pairs']}", "info")
+        return fuzzy_duplicate_pct, fuzzy_duplicate_clusters, duplicate_clusters_file
+    except Exception as e:
+        print_log(logger, f"Falha na detecção de quase duplicados: {e}", "warning")
+        return 0.0, 0, None
+
 # FUNÇÃO PARA DEFINIR EXECUTION DATE
 def _resolve_execution_date(execution_date: str = None) -> str:
     if execution_date:
@@ -42,8 +281,12 @@ def _resolve_execution_date(execution_date: str = None) -> str:
     return os.getenv("AIRFLOW_CTX_EXECUTION_DATE", datetime.now().strftime("%Y-%m-%d"))[:10]
 
 # Função principal para leitura de todos os arquivos JSON da camada Bronze
-# também consolida em um DataFrame limpo e salva na camada Silver
-def transform_to_silver(execution_date: str = None):
+# também consolida em um DataFrame limpo e salva na camada Silver.
+# Execução em processo (src.pipeline_runner): `records` são os registros da Bronze em
+# memória, `writer` grava o parquet em background e, com `return_table`, o resultado
+# leva a tabela Arrow da Silver em "table" (entrada da Gold sem reler o parquet).
+# Com `writer` o skip-if-unchanged não é usado (as saídas ainda não estão no disco).
+def transform_to_silver(execution_date: str = None, records: list = None, writer=None, return_table: bool = False):
     # CARREGA VARIAVEIS
     # Carrega .env somente quando a função roda (evita side-effects em testes/import)
     load_dotenv(".env", override=False)
@@ -66,6 +309,7 @@ def transform_to_silver(execution_date: str = None):
         log_folder = os.path.join(log_root, "transform")
         os.makedirs(log_folder, exist_ok=True)
         logger = configurar_logger(log_folder, "_transform_silver.txt", "Silver")
+        bind_log_context(logger, stage="silver", execution_date=execution_date)
 
     # Inicializa a variável global sucess para controlar fluxo
     global success
@@ -82,51 +326,121 @@ def transform_to_silver(execution_date: str = None):
     schema_missing_cols = []
     schema_extra_cols = []
     schema_changed = False
+    # Variaveis da detecção de quase duplicados (entity resolution)
+    fuzzy_duplicate_pct = 0.0
+    fuzzy_duplicate_clusters = 0
+    duplicate_clusters_file = None
+    # Skip-if-unchanged
+    fingerprint = None
+    reused_state = None
+    output_folder = os.path.join(SILVER_PATH, f"processing_date={execution_date}")
+    silver_table = None
+    records_received = 0
+    trace = StageTrace("silver", execution_date)
+    memory = MemoryTracker()
+    profiler = StageProfiler("silver", execution_date).start()
 
     try:
         print_log(logger, 'Iniciando transformação na camada silver.', 'info')
         print_log(logger, f"Salvando dados transformados em: {SILVER_PATH}", 'info')
 
-        # Procura pasta na camada Bronze com a data da execução
-        ingestion_folder = os.path.join(BRONZE_PATH, f"ingestion_date={execution_date}")
-
-        if not os.path.exists(ingestion_folder):
-            print_log(logger, f"Pasta Bronze não encontrada: {ingestion_folder}", "error")
-            error_msg = "Bronze folder not found"
-            success = False
-            return {"success": False, "error": error_msg}
-
-        # Lista de arquivos JSON
-        json_files = [f for f in os.listdir(ingestion_folder) if f.endswith(".json")]
-
-        if len(json_files) == 0:
-            print_log(logger, f"Nenhum arquivo JSON encontrado na camada Bronze na data {execution_date}.", "error")
-            error_msg = "No JSON files found"
-            success = False
-            return {"success": False, "error": "No JSON files found"}
-
-        print_log(logger, f"Encontrados {len(json_files)} arquivos na camada Bronze", 'info')
-
-        # Ler todos os JSON
-        all_records = []
-
-        for file in json_files:
-            file_path = os.path.join(ingestion_folder, file)
-
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    all_records.extend(data)
+        # Registros da Bronze já em memória (src.pipeline_runner): não relê os JSONs do disco
+        if records is not None:
+            all_records = records
+            print_log(logger, f"Recebidos {len(all_records)} registros da Bronze em memória", 'info')
+        else:
+            # Procura pasta na camada Bronze com a data da execução
+            ingestion_folder = os.path.join(BRONZE_PATH, f"ingestion_date={execution_date}")
 
-            except json.JSONDecodeError:
-                print_log(logger, f"Erro ao ler JSON inválido: {file}", "error")
-                error_msg = f"Erro ao ler JSON inválido: {file}"
+            if not os.path.exists(ingestion_folder):
+                print_log(logger, f"Pasta Bronze não encontrada: {ingestion_folder}", "error")
+                error_msg = "Bronze folder not found"
                 success = False
                 return {"success": False, "error": error_msg}
 
-            except Exception as e:
-                print_log(logger, f"Erro inesperado ao abrir {file}: {e}", "error")
-                error_msg = f"Erro inesperado ao abrir {file}: {e}"
+            # Lista de arquivos JSON
+            json_files = [f for f in os.listdir(ingestion_folder) if f.endswith(".json")]
+
+            if len(json_files) == 0:
+                print_log(logger, f"Nenhum arquivo JSON encontrado na camada Bronze na data {execution_date}.", "error")
+                error_msg = "No JSON files found"
+                success = False
+                return {"success": False, "error": "No JSON files found"}
+
+            print_log(logger, f"Encontrados {len(json_files)} arquivos na camada Bronze", 'info')
+
+            # Entrada, código e configuração iguais aos do último sucesso: reaproveita a saída anterior
+            if skip_if_unchanged_enabled() and writer is None:
+                with trace.span("fingerprint"):
+                    fingerprint = stage_fingerprint(bronze_input_hash(ingestion_folder), _SILVER_CODE_FILES, _silver_config())
+                    reused_state = find_reusable(datalake_root, "silver", fingerprint)
+                if reused_state:
+                    reused = reuse_outputs(reused_state["output_folder"], output_folder)
+                    output_file = reused.get("breweries.parquet")
+                    duplicate_clusters_file = reused.get("duplicate_clusters.parquet")
+                    print_log(logger, f"Bronze inalterada desde {reused_state['execution_date']}: Silver reaproveitada em {output_folder}", "success")
+                    success = True
+                    return
+
+            # Orçamento de memória (STAGE_MEMORY_BUDGET_MB): Bronze grande demais para
+            # carregar de uma vez é processada em lotes com spill para disco
+            bronze_bytes = sum(os.path.getsize(os.path.join(ingestion_folder, f)) for f in json_files)
+            over_budget, estimate = exceeds_budget(bronze_bytes)
+            if over_budget:
+                memory.mode = "chunked"
+                print_log(logger, f"Bronze estimada em {estimate / 1024 / 1024:.1f} MB em memória, acima do orçamento: processando em lotes", "warning")
+                output_file = os.path.join(output_folder, "breweries.parquet")
+                os.makedirs(output_folder, exist_ok=True)
+                fail_on_missing = str(os.getenv("FAIL_ON_SCHEMA_MISSING", "false")).strip().lower() == "true"
+
+                try:
+                    batches = _transform_in_batches(ingestion_folder, json_files, output_file, batch_input_bytes(), fail_on_missing, trace, memory)
+                except _BronzeReadError as e:
+                    print_log(logger, str(e), "error")
+                    error_msg = str(e)
+                    success = False
+                    return {"success": False, "error": error_msg}
+
+                records_received = batches["records"]
+                if records_received == 0:
+                    print_log(logger, "Nenhum registro válido foi carregado.", "error")
+                    error_msg = "No valid records loaded"
+                    success = False
+                    return {"success": False, "error": error_msg}
+
+                schema_missing_cols, schema_extra_cols = _schema_diff(batches["columns"])
+                schema_changed = bool(schema_missing_cols or schema_extra_cols)
+                if schema_missing_cols:
+                    print_log(logger, f"[SCHEMA REGRESSION] Colunas faltando: {schema_missing_cols}", "error")
+                if schema_extra_cols:
+                    print_log(logger, f"[SCHEMA CHANGE] Colunas novas detectadas: {schema_extra_cols}", "warning")
+                if fail_on_missing and schema_missing_cols:
+                    success = False
+                    error_msg = f"Schema regression: colunas faltando: {schema_missing_cols}"
+                    return
+
+                null_name = _pct(batches["null_name"], records_received)
+                null_brewery_type = _pct(batches["null_brewery_type"], records_received)
+                null_city_state = _pct(batches["null_city_state"], records_received)
+                invalid_brewery_type = _pct(batches["invalid_brewery_type"], records_received)
+                duplicate_id = _pct(batches["duplicate_id"], records_received)
+                print_log(logger, f"{batches['batches']} lotes: {records_received} registros lidos, {batches['written']} gravados", "info")
+
+                # Só as colunas do blocking/nome: a detecção de quase duplicados precisa da Silver inteira
+                df = memory.observe(pd.read_parquet(output_file, columns=[c for c in _FUZZY_COLS if c in batches["columns"]]))
+                fuzzy_duplicate_pct, fuzzy_duplicate_clusters, duplicate_clusters_file = _fuzzy_duplicates(df, output_folder, None, logger, trace)
+
+                print_log(logger, "Camada Silver gerada com sucesso!", 'success')
+                print_log(logger, f"Arquivo salvo em: {output_file} no formato parquet", 'info')
+                success = True
+                return
+
+            # Ler todos os JSON
+            try:
+                all_records = _read_json_files(ingestion_folder, json_files, trace)
+            except _BronzeReadError as e:
+                print_log(logger, str(e), "error")
+                error_msg = str(e)
                 success = False
                 return {"success": False, "error": error_msg}
 
@@ -136,11 +450,13 @@ def transform_to_silver(execution_date: str = None):
             success = False
             return {"success": False, "error": error_msg}
 
+        records_received = len(all_records)
         print_log(logger, f"Total de registros carregados: {len(all_records)}", "info")
 
         # Criar DataFrame
         try:
-            df = pd.DataFrame(all_records)
+            with trace.span("build_dataframe", rows=len(all_records)):
+                df = memory.observe(pd.DataFrame(all_records))
             if df.empty:
                 print_log(logger, "DataFrame vazio após ingestão.", "error")
                 error_msg = "DataFrame empty"
@@ -156,11 +472,7 @@ def transform_to_silver(execution_date: str = None):
         print_log(logger, f"Dataframe criado com sucesso", "info")
 
         # Validação de schema
-        expected_schema = _load_expected_schema_from_env_or_default()
-        current_schema = _normalize_schema(df.columns)
-
-        missing = sorted(list(expected_schema - current_schema))
-        extra = sorted(list(current_schema - expected_schema))
+        missing, extra = _schema_diff(df.columns)
 
         schema_missing_cols = missing
         schema_extra_cols = extra
@@ -180,50 +492,20 @@ def transform_to_silver(execution_date: str = None):
             error_msg = f"Schema regression: colunas faltando: {missing}"
             return {"success": False, "error": error_msg, "schema_missing_cols": missing, "schema_extra_cols": extra}
 
-        # Padronização de Strings
-        string_cols = ["name", "city", "state", "brewery_type"]
-
-        for col in string_cols:
-            if col in df.columns:
-                df[col] = (
-                    df[col]
-                    .astype(str)
-                    .str.strip()
-                    .str.lower()
-                    .str.replace(r"\s+", " ", regex=True)
-                )
-
-                df[col] = df[col].replace(["none", "nan", ""], None)
-
-        # Conversão de Tipos
-        if "latitude" in df.columns:
-            df["latitude"] = pd.to_numeric(df["latitude"], errors="coerce")
-
-        if "longitude" in df.columns:
-            df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
+        # Padronização de Strings e conversão de tipos
+        with trace.span("normalize", rows=len(df)):
+            df = _standardize(df)
 
         # Monitorando a qualidade do dado
         print_log(logger, "Calculando indicadores de qualidade...", "info")
 
-        null_name = df["name"].isnull().mean() * 100
-        null_brewery_type = df["brewery_type"].isnull().mean() * 100
-        null_city_state = (df["city"].isnull() | df["state"].isnull()).mean() * 100
-        duplicate_id = df.duplicated(subset=["id"]).mean() * 100
-
-        # Lista permitida (OpenBrewery "padrão" + fallback "closed")
-        allowed_brewery_types = {
-            "micro", "nano", "regional", "brewpub", "large",
-            "planning", "bar", "contract", "proprietor", "closed"
-        }
-
-        # considera inválido: não nulo e fora da lista
-        if "brewery_type" in df.columns:
-            invalid_brewery_type = (
-                df["brewery_type"].notnull() &
-                (~df["brewery_type"].isin(allowed_brewery_types))
-            ).mean() * 100
-        else:
-            invalid_brewery_type = 0.0
+        with trace.span("quality_indicators", rows=len(df)):
+            counts = _quality_counts(df)
+            null_name = _pct(counts["null_name"], len(df))
+            null_brewery_type = _pct(counts["null_brewery_type"], len(df))
+            null_city_state = _pct(counts["null_city_state"], len(df))
+            invalid_brewery_type = _pct(counts["invalid_brewery_type"], len(df))
+            duplicate_id = df.duplicated(subset=["id"]).mean() * 100
 
         print_log(logger, f"Qtd de registros sem nome: {null_name:.2f}%", "info")
         print_log(logger, f"Qtd de estabelecimentos sem tipo: {null_brewery_type:.2f}%", "info")
@@ -233,39 +515,45 @@ def transform_to_silver(execution_date: str = None):
 
         # Limpeza dos dados
         # Remover duplicados por ID
-        if "id" in df.columns:
-            df = df.drop_duplicates(subset=["id"])
+        with trace.span("clean") as span:
+            if "id" in df.columns:
+                df = df.drop_duplicates(subset=["id"])
 
-        # Remover registros sem nome
-        df = df[df["name"].notnull()]
+            # Remover registros sem nome
+            df = df[df["name"].notnull()]
+            span["rows"] = len(df)
 
         print_log(logger, f"Total de registros após tratamentos: {len(df)}", 'info')
 
         # Schema Final (colunas organizadas)
-        final_cols = [
-            "id", "name", "brewery_type",
-            "city", "state", "country",
-            "latitude", "longitude",
-            "location", "has_geo",
-            "processing_date"
-        ]
-
-        df = df[[c for c in final_cols if c in df.columns]]
+        df = df[[c for c in _FINAL_COLS if c in df.columns]]
 
         # Salvar Silver
-        output_folder = os.path.join(SILVER_PATH, f"processing_date={execution_date}")
         output_file = os.path.join(output_folder, "breweries.parquet")
 
         try:
             os.makedirs(output_folder, exist_ok=True)
-            df.to_parquet(output_file, index=False)
-            print_log(logger, "Dados gravados na camada Silver com sucesso!", "success")
+            if writer is not None or return_table:
+                # uma única conversão pandas -> Arrow: mesma tabela para o parquet e para a Gold
+                with trace.span("to_arrow", rows=len(df)):
+                    silver_table = memory.observe(pa.Table.from_pandas(df, preserve_index=False))
+            if writer is not None:
+                writer.submit(write_parquet_atomic, silver_table, output_file)
+                print_log(logger, "Gravação da camada Silver enviada para background", "info")
+            else:
+                with trace.span("write_parquet", rows=len(df)) as span:
+                    write_parquet_atomic(df, output_file)
+                    span["bytes"] = os.path.getsize(output_file)
+                print_log(logger, "Dados gravados na camada Silver com sucesso!", "success")
         except Exception as e:
             print_log(logger, f"Erro ao salvar arquivo Parquet: {e}", "error")
             error_msg = f"Erro ao salvar arquivo Parquet: {e}"
             success = False
             return {"success": False, "error": error_msg}    
 
+        # Quase duplicados (mesma cervejaria com ids diferentes) - não bloqueia a Silver
+        fuzzy_duplicate_pct, fuzzy_duplicate_clusters, duplicate_clusters_file = _fuzzy_duplicates(df, output_folder, writer, logger, trace)
+
         print_log(logger, "Camada Silver gerada com sucesso!", 'success')
         print_log(logger, f"Arquivo salvo em: {output_file} no formato parquet", 'info')
         success = True
@@ -280,7 +568,26 @@ def transform_to_silver(execution_date: str = None):
 
     # Finalização do script
     finally:
-        duration = str(timedelta(seconds=(time.time() - start_time)))
+        profiler.stop()
+        memory_report = memory.report()
+        elapsed_seconds = time.time() - start_time
+        duration = str(timedelta(seconds=elapsed_seconds))
+
+        # Etapa pulada: sem métricas de qualidade/performance (os dados são os do último sucesso)
+        if success and reused_state:
+            run_id = generate_run_id()
+            init_db()
+            save_metrics_dict(run_id, execution_date, "silver", {"skipped_unchanged": True, **profiler.summary})
+            return reused_result(reused_state, {
+                "output_file": output_file,
+                "duplicate_clusters_file": duplicate_clusters_file,
+                "transform_duration": duration,
+                "transform_date": execution_date,
+                "spans": trace.summary(),
+                "trace_file": trace.export(run_id)[0],
+                "profile": profiler.result(),
+                "run_id": run_id,
+            })
 
         if success:
             print_log(logger, f"Transformação finalizada com sucesso! Tempo: {duration}", "success")
@@ -290,17 +597,30 @@ def transform_to_silver(execution_date: str = None):
             init_db()
 
             quality_metrics = {
-                "records_received_bronze": len(all_records),
+                "records_received_bronze": records_received,
                 "records_transformed_silver": len(df),
                 "null_name": null_name,
                 "null_brewery_type": null_brewery_type,
                 "null_city_state": null_city_state,
                 "duplicate_id": duplicate_id,
                 "invalid_brewery_type": invalid_brewery_type,
+                "fuzzy_duplicate_pct": fuzzy_duplicate_pct,
+                "fuzzy_duplicate_clusters": fuzzy_duplicate_clusters,
                 "schema_changed": schema_changed,
                 "schema_missing_cols": ",".join(schema_missing_cols),
-                "schema_extra_cols": ",".join(schema_extra_cols)
+                "schema_extra_cols": ",".join(schema_extra_cols),
+                "transform_duration": duration,
+                "records_per_second": len(df) / elapsed_seconds if elapsed_seconds > 0 else None,
             }
+            # Tempo por sub-fase (spans) junto com as métricas da etapa
+            quality_metrics.update(trace.metrics())
+            quality_metrics.update(profiler.summary)
+            quality_metrics.update(memory_report)
+
+            # gravações em background (src.pipeline_runner): métricas provisórias até o runner
+            # registrar writes_committed
+            if writer is not None:
+                quality_metrics["writes_pending"] = True
 
             save_metrics_dict(run_id, execution_date, "silver", quality_metrics)
 
@@ -316,16 +636,38 @@ def transform_to_silver(execution_date: str = None):
             "null_city_state": round(null_city_state, 2),
             "duplicate_id": round(duplicate_id, 2),
             "invalid_brewery_type": round(invalid_brewery_type, 2),
+            "fuzzy_duplicate_pct": round(fuzzy_duplicate_pct, 2),
+            "fuzzy_duplicate_clusters": fuzzy_duplicate_clusters,
+            "duplicate_clusters_file": duplicate_clusters_file,
             "schema_changed": bool(schema_changed),
             "schema_missing_cols": schema_missing_cols,
             "schema_extra_cols": schema_extra_cols,
             "transform_duration": duration,
             "transform_date": execution_date,
+            "spans": trace.summary(),
+            "trace_file": None,
+            "profile": profiler.result(),
+            **memory_report,
             "run_id": run_id
         }
+        if success and writer is not None:
+            result["writes_pending"] = True
+
+        result["trace_file"], trace_error = trace.export(run_id)
+        if trace_error:
+            print_log(logger, f"Falha ao gravar trace da Silver: {trace_error}", "warning")
     
         if not success:
             result["error"] = error_msg or "Unknown error"
+        elif fingerprint:
+            try:
+                save_last_success(datalake_root, "silver", fingerprint, execution_date, output_folder, result)
+            except Exception as e:
+                print_log(logger, f"Falha ao registrar impressão digital da Silver: {e}", "warning")
+
+        # fora do estado do skip-if-unchanged (não serializável)
+        if return_table and silver_table is not None:
+            result["table"] = silver_table
 
         return result
 
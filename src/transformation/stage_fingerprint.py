@@ -0,0 +1,176 @@
+# Bibliotecas
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+# Skip-if-unchanged: impressão digital (sha256) da entrada de cada etapa.
+#
+# A impressão digital combina o conteúdo da entrada (manifesto da Bronze /
+# parquet da Silver), a versão do código da etapa (hash do .py) e a
+# configuração que muda a saída (ex.: GOLD_OUTPUT_FORMAT). O último sucesso de
+# cada etapa fica em DATALAKE_PATH/_state/fingerprints/<etapa>.json; quando a
+# impressão digital é a mesma, a etapa reaproveita as saídas anteriores
+# (hard-link na partição da data, cópia se o link não for possível) em vez de
+# reprocessar. Desligado com SKIP_IF_UNCHANGED=false.
+#
+# Como as partições podem compartilhar o mesmo inode, as etapas nunca gravam
+# por cima de um arquivo de saída: gravam um temporário e trocam com os.replace
+# (write_parquet_atomic), que só substitui a entrada da pasta da data.
+
+# Sem extensão .json: a Silver lê todos os *.json da pasta Bronze
+MANIFEST_FILE = "_MANIFEST"
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def skip_if_unchanged_enabled() -> bool:
+    return str(os.getenv("SKIP_IF_UNCHANGED", "true")).strip().lower() == "true"
+
+def _state_path(datalake_root: str, stage: str) -> str:
+    return os.path.join(datalake_root, "_state", "fingerprints", f"{stage}.json")
+
+# sha256 do conteúdo de um arquivo (lido em blocos)
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Hash estável de um dict (chaves ordenadas)
+def _dict_sha256(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+# Impressão digital da etapa: entrada + código (arquivos .py da etapa) + configuração
+def stage_fingerprint(input_hash: str, code_files: list = None, config: dict = None) -> str:
+    return _dict_sha256({
+        "input": input_hash,
+        "code": {os.path.basename(path): file_sha256(path) for path in (code_files or [])},
+        "config": config or {},
+    })
+
+# Manifesto da Bronze: sha256 e tamanho de cada página gravada
+def write_bronze_manifest(folder: str, pages: dict) -> str:
+    manifest_hash = _dict_sha256({name: info["sha256"] for name, info in pages.items()})
+    manifest = {
+        "manifest_hash": manifest_hash,
+        "pages": pages,
+        "created_at": datetime.now().isoformat(),
+    }
+    with open(os.path.join(folder, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest_hash
+
+# Hash da entrada da Silver (JSONs da pasta Bronze). Usa o manifesto quando ele
+# descreve exatamente os arquivos da pasta (mesmos nomes e tamanhos); senão lê os arquivos.
+def bronze_input_hash(folder: str) -> str:
+    json_files = sorted(f for f in os.listdir(folder) if f.endswith(".json"))
+
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            pages = manifest.get("pages") or {}
+            if sorted(pages) == json_files and all(
+                os.path.getsize(os.path.join(folder, name)) == pages[name]["size"] for name in json_files
+            ):
+                return manifest["manifest_hash"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    return _dict_sha256({name: file_sha256(os.path.join(folder, name)) for name in json_files})
+
+# Último sucesso registrado da etapa (None se não houver)
+def load_last_success(datalake_root: str, stage: str):
+    path = _state_path(datalake_root, stage)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Registra o sucesso da etapa (escrita atômica via arquivo temporário + rename)
+def save_last_success(datalake_root: str, stage: str, fingerprint: str, execution_date: str, output_folder: str, result: dict):
+    path = _state_path(datalake_root, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    state = {
+        "fingerprint": fingerprint,
+        "execution_date": execution_date,
+        "output_folder": output_folder,
+        "outputs": sorted(f for f in os.listdir(output_folder) if os.path.isfile(os.path.join(output_folder, f))),
+        "result": result,
+        "updated_at": datetime.now().isoformat(),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4, default=str)
+    os.replace(tmp_path, path)
+
+# Estado anterior reaproveitável: mesma impressão digital e saídas anteriores ainda
+# existentes (ex.: não removidas pela retenção)
+def find_reusable(datalake_root: str, stage: str, fingerprint: str):
+    state = load_last_success(datalake_root, stage)
+    if not state or state.get("fingerprint") != fingerprint:
+        return None
+    output_folder = state.get("output_folder") or ""
+    outputs = state.get("outputs") or []
+    if not outputs or not all(os.path.isfile(os.path.join(output_folder, name)) for name in outputs):
+        return None
+    return state
+
+# Reaproveita os arquivos da pasta anterior na pasta da execução atual.
+# Hard-link (sem custo de cópia); cópia quando o link falha (outro filesystem, etc.).
+# Seguro só porque as etapas gravam com write_parquet_atomic (ver acima).
+# Retorna {nome do arquivo: caminho na pasta de destino}.
+def reuse_outputs(source_folder: str, target_folder: str) -> dict:
+    os.makedirs(target_folder, exist_ok=True)
+    reused = {}
+    for name in sorted(os.listdir(source_folder)):
+        src = os.path.join(source_folder, name)
+        if not os.path.isfile(src):
+            continue
+        dst = os.path.join(target_folder, name)
+        if os.path.abspath(src) != os.path.abspath(dst):
+            if os.path.exists(dst):
+                os.remove(dst)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+        reused[name] = dst
+    return reused
+
+# Grava parquet (DataFrame ou tabela Arrow) em arquivo temporário + os.replace.
+# Nunca abre o arquivo final para escrita: ele pode ser um hard-link de outra partição.
+def write_parquet_atomic(data, path: str) -> str:
+    tmp_path = f"{path}.tmp"
+    try:
+        if hasattr(data, "to_parquet"):
+            data.to_parquet(tmp_path, index=False)
+        else:
+            import pyarrow.parquet as pq
+            pq.write_table(data, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+# Resultado de uma etapa pulada: o retorno do último sucesso (mesmos dados) com
+# as informações da execução atual em `updates`
+def reused_result(state: dict, updates: dict) -> dict:
+    result = dict(state.get("result") or {})
+    result.update(updates)
+    result.update({
+        "success": True,
+        "skipped": True,
+        "reused_from": state.get("execution_date"),
+        "fingerprint": state.get("fingerprint"),
+    })
+    return result
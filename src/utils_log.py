@@ -1,11 +1,134 @@
 import os
+import json
+import time
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 
+# Nível customizado SUCCESS
+SUCCESS_LEVEL_NUM = 25
+
+_LEVELS = {
+    "success": SUCCESS_LEVEL_NUM,
+    "error": logging.ERROR,
+    "warning": logging.WARNING,
+    "info": logging.INFO,
+}
+
+# Backend de log (LOG_BACKEND):
+#   sync  (padrão) FileHandler + StreamHandler no próprio logger, texto simples
+#   queue          o logger só enfileira (QueueHandler); uma thread (QueueListener)
+#                  grava o arquivo em JSON lines (ts, level, logger, message, stage,
+#                  run_id, execution_date, page, ...) e o console em texto. Mensagens
+#                  por página abaixo de WARNING são amostradas: só a página 1 e uma a
+#                  cada LOG_PAGE_SAMPLE_EVERY (padrão 10) vão para o log.
+# LOG_LEVEL (padrão DEBUG; valor inválido usa DEBUG) filtra antes de criar o registro.
+
+# logger_name -> (pid, listener, fila)
+_listeners = {}
+
+def log_backend() -> str:
+    return str(os.getenv("LOG_BACKEND", "sync")).strip().lower()
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com o contexto da etapa e os campos extras do print_log."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "log_context", None) or {})
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ContextFilter(logging.Filter):
+    """Filtro do QueueHandler (roda antes de enfileirar): contexto da etapa e amostragem por página."""
+
+    def __init__(self, stage: str, page_every: int):
+        super().__init__()
+        self.context = {"stage": stage}
+        self.page_every = page_every
+        self.suppressed = 0
+
+    def filter(self, record):
+        fields = getattr(record, "fields", None) or {}
+        page = fields.get("page")
+        if page is not None and record.levelno < logging.WARNING and self.page_every > 1:
+            if page != 1 and page % self.page_every:
+                self.suppressed += 1
+                return False
+            if self.suppressed:
+                # quantas mensagens por página foram omitidas desde a última gravada
+                record.fields = {**fields, "suppressed": self.suppressed}
+                self.suppressed = 0
+        record.log_context = dict(self.context)
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """Só resolve msg % args na thread que loga; a formatação fica na thread do listener."""
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _start_listener(logger_name: str, log_queue, handlers: list):
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger_name] = (os.getpid(), listener, log_queue)
+
+def _queue_handler(logger):
+    return next((h for h in logger.handlers if isinstance(h, _QueueHandler)), None)
+
+# LOG_LEVEL como nível numérico; valor inválido vira DEBUG (retorna também o valor rejeitado)
+def _log_level():
+    raw = str(os.getenv("LOG_LEVEL", "DEBUG")).strip().upper()
+    if raw.isdigit():
+        return int(raw), None
+    level = logging.getLevelName(raw)
+    if isinstance(level, int):
+        return level, None
+    if raw == "SUCCESS":
+        return SUCCESS_LEVEL_NUM, None
+    return logging.DEBUG, raw
+
+# Processo filho (fork) herda o QueueHandler mas não a thread do listener. A fila
+# herdada pode ter registros do pai (gravados de novo pelo filho) e um lock preso
+# no momento do fork: o filho usa fila e QueueHandler novos, com os mesmos handlers.
+def _restart_in_child(logger, logger_name: str, entry: tuple, old_handler):
+    log_queue = queue.Queue(-1)
+    _start_listener(logger_name, log_queue, list(entry[1].handlers))
+
+    queue_handler = _QueueHandler(log_queue)
+    for old_filter in old_handler.filters:
+        if isinstance(old_filter, _ContextFilter):
+            new_filter = _ContextFilter(old_filter.context.get("stage"), old_filter.page_every)
+            new_filter.context.update(old_filter.context)
+            queue_handler.addFilter(new_filter)
+    logger.removeHandler(old_handler)
+    logger.addHandler(queue_handler)
+
 def configurar_logger(log_folder, log_name, logger_name):
 
     logger = logging.getLogger(logger_name)
-    logger.setLevel(logging.DEBUG)
+    level, invalid_level = _log_level()
+    logger.setLevel(level)
+
+    entry = _listeners.get(logger_name)
+    old_handler = _queue_handler(logger)
+    if entry and entry[0] != os.getpid() and old_handler is not None:
+        _restart_in_child(logger, logger_name, entry, old_handler)
 
     # Evita adicionar múltiplos handlers ao chamar novamente
     if not logger.handlers:
@@ -20,15 +143,25 @@ def configurar_logger(log_folder, log_name, logger_name):
         # --- Handler para arquivo ---
         file_handler = logging.FileHandler(log_file, encoding='utf-8', mode='a')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
 
         # --- Handler opcional para console ---
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+
+        if log_backend() == "queue":
+            # arquivo em JSON lines; gravação em disco/console fora da thread da etapa
+            file_handler.setFormatter(JsonLogFormatter())
+            log_queue = queue.Queue(-1)
+            _start_listener(logger_name, log_queue, [file_handler, console_handler])
+
+            queue_handler = _QueueHandler(log_queue)
+            queue_handler.addFilter(_ContextFilter(logger_name.lower(), int(os.getenv("LOG_PAGE_SAMPLE_EVERY", "10"))))
+            logger.addHandler(queue_handler)
+        else:
+            logger.addHandler(file_handler)
+            logger.addHandler(console_handler)
 
         # --- Nível customizado SUCCESS ---
-        SUCCESS_LEVEL_NUM = 25
         logging.addLevelName(SUCCESS_LEVEL_NUM, "SUCCESS")
 
         def success(self, message, *args, **kwargs):
@@ -38,20 +171,52 @@ def configurar_logger(log_folder, log_name, logger_name):
 
         logger.debug("Logger configurado com sucesso.")
 
+    if invalid_level:
+        logger.warning("LOG_LEVEL inválido (%s); usando DEBUG.", invalid_level)
+
     return logger
 
-# Função auxiliar para padronizar logs com print + gravação no arquivo
-def print_log(logger, msg, level='info'):
+# Campos fixos dos próximos registros do logger (ex.: run_id, execution_date).
+# Só tem efeito no backend queue.
+def bind_log_context(logger, **fields):
+    handler = _queue_handler(logger) if logger is not None else None
+    if handler is None:
+        return
+    for log_filter in handler.filters:
+        if isinstance(log_filter, _ContextFilter):
+            log_filter.context.update({k: v for k, v in fields.items() if v is not None})
+
+# Espera os listeners do processo gravarem o que está na fila (chamar antes do fim da task)
+def flush_logs(timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    for pid, _, log_queue in list(_listeners.values()):
+        if pid != os.getpid():
+            continue
+        while log_queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+    return True
+
+@atexit.register
+def _stop_listeners():
+    for pid, listener, _ in list(_listeners.values()):
+        if pid == os.getpid():
+            try:
+                listener.stop()
+            except Exception:
+                pass
+
+# Função auxiliar para padronizar logs com print + gravação no arquivo.
+# `fields` (ex.: page=3) vão como campos do JSON no backend queue; mensagens com
+# `page` podem ser amostradas.
+def print_log(logger, msg, level='info', **fields):
     # Se o logger estiver desligado (modo TEST), não faz nada
     if logger is None:
         return
 
-    level = level.lower()
-    if level == "success":
-        logger.success(msg)
-    elif level == "error":
-        logger.error(msg)
-    elif level == "warning":
-        logger.warning(msg)
-    else:
-        logger.info(msg)
+    level_num = _LEVELS.get(level.lower(), logging.INFO)
+    # nível filtrado: retorna antes de criar o LogRecord
+    if not logger.isEnabledFor(level_num):
+        return
+    logger.log(level_num, msg, extra={"fields": fields} if fields else None)
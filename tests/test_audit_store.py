@@ -0,0 +1,294 @@
+# Bibliotecas
+import threading
+import pytest
+
+# Script
+from src.monitoring import audit_store
+
+
+# Driver DB-API falso: registra os comandos executados por conexão
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.fail_next:
+            self.conn.fail_next = False
+            self.conn.closed = 1
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.conn.executed.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        return self.conn.results.pop(0)[0]
+
+    def fetchall(self):
+        return self.conn.results.pop(0)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.executed = []
+        self.commits = 0
+        self.fail_next = False
+        self.results = []   # linhas devolvidas pelos próximos fetchone/fetchall
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    # mesmo contrato do psycopg2: `with conn` faz commit/rollback, não fecha
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commits += 1
+        return False
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_driver(monkeypatch):
+    connections = []
+
+    def connect():
+        conn = FakeConnection()
+        connections.append(conn)
+        return conn
+
+    audit_store.close_pool()
+    monkeypatch.setattr(audit_store, "_get_conn", connect)
+    monkeypatch.setattr(audit_store, "_KNOWN_DAG_RUNS", set())
+    yield connections
+    audit_store.close_pool()
+
+
+# TESTE 1: Vários eventos reaproveitam a mesma conexão do pool
+def test_events_reuse_pooled_connection(fake_driver):
+    audit_store.upsert_dag_run("dag", "run_1", "running")
+    for task in ["extract", "silver", "gold"]:
+        audit_store.insert_task_event("dag", "run_1", task, "success")
+
+    assert len(fake_driver) == 1
+    conn = fake_driver[0]
+    # pai já gravado pelo upsert: um comando por evento
+    assert len(conn.executed) == 4
+    assert conn.commits == 4
+    assert audit_store._get_pool().stats()["idle"] == 1
+
+
+# TESTE 2: Conexão que cai é descartada e a próxima chamada abre outra
+def test_broken_connection_is_replaced(fake_driver):
+    audit_store.upsert_dag_run("dag", "run_1", "running")
+    fake_driver[0].fail_next = True
+
+    with pytest.raises(RuntimeError):
+        audit_store.upsert_dag_run("dag", "run_1", "failed")
+
+    audit_store.upsert_dag_run("dag", "run_1", "failed")
+    assert len(fake_driver) == 2
+    assert audit_store._get_pool().stats()["size"] == 1
+
+
+# TESTE 3: Health check com SELECT 1 em conexões ociosas e limite de tamanho
+def test_pool_health_check_and_size_limit(fake_driver, monkeypatch):
+    monkeypatch.setenv("AUDIT_DB_POOL_SIZE", "2")
+    monkeypatch.setenv("AUDIT_DB_POOL_TIMEOUT", "0.2")
+    monkeypatch.setenv("AUDIT_DB_HEALTHCHECK_SECONDS", "0")
+    audit_store.close_pool()
+    pool = audit_store._get_pool()
+
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    # outra thread devolve uma conexão e libera quem está esperando
+    threading.Timer(0.05, pool.release, args=(first,)).start()
+    monkeypatch.setattr(pool, "timeout", 2)
+    assert pool.acquire() is first
+    assert first.executed[-1][0] == "SELECT 1"
+
+    pool.release(first)
+    pool.release(second)
+    assert pool.stats() == {"size": 2, "idle": 2, "max_size": 2}
+
+
+# TESTE 4: Primeiro evento de um run grava pai + evento em um comando; os seguintes só o evento
+def test_parent_upsert_merged_into_first_event(fake_driver):
+    audit_store.insert_task_event("dag", "run_1", "extract", "started")
+    audit_store.insert_task_event("dag", "run_1", "extract", "success")
+
+    first, second = [sql for sql, _ in fake_driver[0].executed]
+    assert first.startswith("WITH parent AS ( INSERT INTO audit.dag_runs")
+    assert "INSERT INTO audit.task_events" in first
+    assert second.startswith("INSERT INTO audit.task_events")
+
+
+# TESTE 5: Buffer grava todos os eventos em um comando, inclusive quando a task falha
+def test_event_buffer_flushes_once(fake_driver):
+    import json
+
+    with pytest.raises(ValueError):
+        with audit_store.AuditEventBuffer() as buffer:
+            buffer.add(dag_id="dag", run_id="run_1", task_id="silver", status="metrics", metrics={"records": 10})
+            buffer.add(dag_id="dag", run_id="run_1", task_id="silver", status="failed", message="erro")
+            raise ValueError("falha na task")
+
+    (sql, params), = fake_driver[0].executed
+    assert "jsonb_to_recordset" in sql and sql.startswith("WITH parent AS")
+    events = json.loads(params["events"])
+    assert [e["status"] for e in events] == ["metrics", "failed"]
+    assert events[0]["metrics"] == {"records": 10}
+    assert all(e["event_time"] for e in events)
+
+    # pai conhecido: próximo lote vai sem a CTE
+    with audit_store.AuditEventBuffer() as buffer:
+        buffer.add(dag_id="dag", run_id="run_1", task_id="gold", status="success")
+    assert fake_driver[0].executed[-1][0].startswith("INSERT INTO audit.task_events")
+
+
+# TESTE 6: Manutenção das partições chama as funções SQL com a configuração do ambiente
+def test_partition_maintenance_wrappers(fake_driver, monkeypatch):
+    monkeypatch.setenv("AUDIT_RETENTION_MONTHS", "6")
+    monkeypatch.setenv("AUDIT_RETENTION_DETACH_ONLY", "true")
+
+    conn = audit_store._get_pool().acquire()
+    conn.results = [[(2,)], [("task_events_2025_01",), ("task_events_2025_02",)]]
+    audit_store._get_pool().release(conn)
+
+    assert audit_store.ensure_task_event_partitions(months_ahead=2) == 2
+    assert audit_store.drop_old_task_event_partitions() == ["task_events_2025_01", "task_events_2025_02"]
+
+    (ensure_sql, ensure_params), (drop_sql, drop_params) = conn.executed
+    assert "audit.ensure_task_event_partitions" in ensure_sql and ensure_params == {"months": 2}
+    assert "audit.drop_task_event_partitions" in drop_sql
+    assert drop_params == {"months": 6, "detach_only": True}
+
+
+# TESTE 7: Emissor assíncrono entrega em background e usa o spool com o banco fora do ar
+def test_audit_emitter_spool_and_idempotent_replay(fake_driver, monkeypatch, tmp_path):
+    import json
+    from src.monitoring.audit_emitter import AuditEmitter
+
+    spool = tmp_path / "audit_spool.jsonl"
+    emitter = AuditEmitter(batch_size=100, flush_interval=60, spool_path=str(spool))
+    try:
+        emitter.emit_task_event(dag_id="dag", run_id="run_1", task_id="extract", status="started")
+        assert emitter.flush(timeout=5) is True
+        (sql, params), = fake_driver[0].executed
+        assert sql.endswith("ON CONFLICT DO NOTHING;")
+        first_uid = json.loads(params["events"])[0]["event_uid"]
+        assert first_uid
+
+        # banco fora do ar: o lote vai para o spool
+        def down():
+            raise RuntimeError("could not connect to server")
+
+        audit_store.close_pool()
+        monkeypatch.setattr(audit_store, "_get_conn", down)
+        emitter.emit_task_event(dag_id="dag", run_id="run_1", task_id="extract", status="success")
+        emitter.emit_dag_run(dag_id="dag", run_id="run_1", status="success")
+        assert emitter.flush(timeout=5) is True
+        assert emitter.records_spilled == 2
+        spooled = [json.loads(line) for line in spool.read_text().splitlines()]
+        assert [r["kind"] for r in spooled] == ["event", "dag_run"]
+
+        # banco volta: a próxima entrega reprocessa o spool com os mesmos event_uid
+        connections = []
+        monkeypatch.setattr(audit_store, "_get_conn", lambda: connections.append(FakeConnection()) or connections[-1])
+        emitter.emit_task_event(dag_id="dag", run_id="run_1", task_id="silver", status="started")
+        assert emitter.flush(timeout=5) is True
+        assert not spool.exists()
+
+        replayed = json.loads(connections[0].executed[1][1]["events"])
+        assert replayed[0]["event_uid"] == spooled[0]["payload"]["event_uid"]
+        assert "INSERT INTO audit.dag_runs" in connections[0].executed[2][0]
+    finally:
+        emitter.close()
+
+
+# TESTE 8: Banco travado não segura a task: flush expira e o pendente vai para o spool
+def test_audit_emitter_flush_timeout_spills(fake_driver, monkeypatch, tmp_path):
+    from src.monitoring.audit_emitter import AuditEmitter
+
+    release = threading.Event()
+
+    def hanging():
+        release.wait(5)
+        raise RuntimeError("timeout expired")
+
+    audit_store.close_pool()
+    monkeypatch.setattr(audit_store, "_get_conn", hanging)
+
+    spool = tmp_path / "audit_spool.jsonl"
+    emitter = AuditEmitter(batch_size=1, flush_interval=60, spool_path=str(spool))
+    try:
+        emitter.emit_task_event(dag_id="dag", run_id="run_1", task_id="gold", status="started")
+        emitter.emit_task_event(dag_id="dag", run_id="run_1", task_id="gold", status="success")
+
+        assert emitter.flush(timeout=0.2) is False
+        # lote em andamento + item ainda na fila
+        assert len(spool.read_text().splitlines()) == 2
+    finally:
+        release.set()
+        emitter.close()
+
+
+# TESTE 9: Helper de relatórios chama o refresh incremental e consulta a tabela tipada
+def test_audit_reporting_queries(fake_driver):
+    from src.monitoring import audit_reporting
+
+    conn = audit_store._get_pool().acquire()
+    conn.results = [[(4,)], [(12.5,)]]
+    audit_store._get_pool().release(conn)
+
+    assert audit_reporting.refresh_stage_runs() == 4
+    assert audit_reporting.stage_percentile("silver", 95) == 12.5
+
+    (refresh_sql, refresh_params), (pct_sql, pct_params) = conn.executed
+    assert "audit.refresh_stage_runs" in refresh_sql and refresh_params == {"full": False}
+    assert "FROM audit.stage_runs" in pct_sql
+    assert pct_params == {"fraction": 0.95, "stage": "silver", "days": 30}
+
+    with pytest.raises(ValueError):
+        audit_reporting.stage_percentile("silver", 95, field="metrics")
+
+
+# TESTE 10: Spool compartilhado entre processos: append/replay sob lock de arquivo
+def test_audit_emitter_spool_file_lock(fake_driver, tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    from src.monitoring.audit_emitter import AuditEmitter
+
+    spool = tmp_path / "audit_spool.jsonl"
+    emitter = AuditEmitter(batch_size=100, flush_interval=60, spool_path=str(spool))
+    try:
+        # outro descritor (como outro processo) não pega o lock enquanto o spool está em uso
+        with emitter._spool_guard():
+            with open(f"{spool}.lock", "a") as other:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        # outro processo já reprocessou o spool: nada a fazer
+        emitter._spill([("dag_run", {"dag_id": "dag", "run_id": "run_1", "status": "success"})])
+        spool.unlink()
+        assert emitter.replay_spool() == 0
+
+        emitter._spill([("dag_run", {"dag_id": "dag", "run_id": "run_2", "status": "success"})])
+        assert emitter.replay_spool() == 1
+        assert not spool.exists()
+    finally:
+        emitter.close()
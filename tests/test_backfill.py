@@ -0,0 +1,136 @@
+# Bibliotecas
+import os
+import json
+import pandas as pd
+import pytest
+
+# Script
+from src.backfill import date_range, run_backfill
+from src.monitoring import metrics_store
+
+_PAYLOAD = [
+    {"id": "1", "name": "Brew A", "city": "Los Angeles", "state": "CA", "brewery_type": "micro"},
+    {"id": "2", "name": "Brew B", "city": "New York", "state": "NY", "brewery_type": "brewpub"},
+]
+
+# Datalake temporário com banco de métricas próprio
+@pytest.fixture
+def backfill_env(isolated_env, monkeypatch):
+    monkeypatch.setenv("ENV", "TEST")
+    metrics_store.close_db()
+    yield isolated_env
+    metrics_store.close_db()
+
+def _create_bronze(datalake, execution_date: str, payload=None):
+    folder = datalake / "raw" / f"ingestion_date={execution_date}"
+    folder.mkdir(parents=True, exist_ok=True)
+    with open(folder / "page_001.json", "w", encoding="utf-8") as f:
+        json.dump(_PAYLOAD if payload is None else payload, f)
+    return folder
+
+# Teste 1: intervalo de datas inclusivo
+def test_date_range():
+    assert date_range("2026-01-30", "2026-02-02") == ["2026-01-30", "2026-01-31", "2026-02-01", "2026-02-02"]
+    with pytest.raises(ValueError):
+        date_range("2026-02-02", "2026-01-30")
+
+# Teste 2: datas isoladas (uma falha não derruba as outras) e retomada só do que falhou
+def test_backfill_resume_after_failure(backfill_env):
+    datalake = backfill_env["datalake"]
+    _create_bronze(datalake, "2026-01-01")
+    bad = _create_bronze(datalake, "2026-01-02")
+    (bad / "page_002.json").write_text("{invalido", encoding="utf-8")
+    # 2026-01-03 sem Bronze
+
+    report = run_backfill("2026-01-01", "2026-01-03", workers=0)
+
+    assert report["success"] is False
+    assert report["dates_succeeded"] == 1
+    assert list(report["failed_dates"]) == ["2026-01-02"]
+    assert report["dates_no_input"] == 1
+    assert os.path.exists(datalake / "gold" / "processing_date=2026-01-01" / "breweries_by_state.parquet")
+    assert os.path.exists(report["report_file"])
+
+    # corrige a data com erro: a retomada roda só ela
+    (bad / "page_002.json").unlink()
+    report = run_backfill("2026-01-01", "2026-01-03", workers=0)
+
+    assert report["success"] is True
+    assert report["dates_resumed"] == 1
+    assert report["dates_processed"] == 1
+    assert report["totals"]["gold_records_gold"] == 2
+
+    # métricas agregadas do backfill no banco de métricas
+    rows = metrics_store.fetch_all(
+        "SELECT metric_name, metric_value FROM pipeline_metrics WHERE layer = 'backfill' AND metric_name = 'dates_failed'"
+    )
+    assert sorted(v for _, v in rows) == [0.0, 1.0]
+
+# Teste 3: pool de processos (spawn) com --force reprocessando todas as datas
+def test_backfill_process_pool(backfill_env):
+    datalake = backfill_env["datalake"]
+    for d in ("2026-03-01", "2026-03-02", "2026-03-03"):
+        _create_bronze(datalake, d)
+
+    report = run_backfill("2026-03-01", "2026-03-03", workers=2, force=True)
+
+    assert report["success"] is True, report["failed_dates"]
+    assert report["dates_succeeded"] == 3
+    assert report["stages_skipped_unchanged"] == 0
+    for d in ("2026-03-01", "2026-03-02", "2026-03-03"):
+        df = pd.read_parquet(datalake / "silver" / f"processing_date={d}" / "breweries.parquet")
+        assert len(df) == 2
+
+# Teste 4: --force em uma data alterada não mexe nas datas que compartilham os arquivos (hard-link)
+def test_backfill_force_keeps_other_dates(backfill_env):
+    datalake = backfill_env["datalake"]
+    dates = ("2026-04-01", "2026-04-02", "2026-04-03")
+    for d in dates:
+        _create_bronze(datalake, d)
+
+    report = run_backfill("2026-04-01", "2026-04-03", workers=0)
+    assert report["success"] is True
+    assert report["stages_skipped_unchanged"] == 4
+
+    changed = _PAYLOAD + [{"id": "3", "name": "Brew C", "city": "Austin", "state": "TX", "brewery_type": "micro"}]
+    _create_bronze(datalake, "2026-04-03", changed)
+    report = run_backfill("2026-04-03", "2026-04-03", workers=0, force=True)
+    assert report["success"] is True
+
+    def _rows(layer, d, name):
+        return len(pd.read_parquet(datalake / layer / f"processing_date={d}" / name))
+
+    assert _rows("silver", "2026-04-03", "breweries.parquet") == 3
+    for d in dates[:2]:
+        assert _rows("silver", d, "breweries.parquet") == 2
+        assert _rows("gold", d, "breweries_by_state.parquet") == 2
+    assert _rows("gold", "2026-04-03", "breweries_by_state.parquet") == 3
+
+    # execution_date das métricas do backfill é uma data (fim do intervalo)
+    rows = metrics_store.fetch_all(
+        "SELECT execution_date, metric_text FROM pipeline_metrics WHERE layer = 'backfill' AND metric_name = 'backfill_start_date'"
+    )
+    assert sorted(rows) == [("2026-04-03", "2026-04-01"), ("2026-04-03", "2026-04-03")]
+
+# Teste 5: --force no mesmo intervalo reprocessa datas já concluídas (não retoma)
+def test_backfill_force_same_range_reprocesses(backfill_env):
+    datalake = backfill_env["datalake"]
+    for d in ("2026-05-01", "2026-05-02"):
+        _create_bronze(datalake, d)
+
+    report = run_backfill("2026-05-01", "2026-05-02", workers=0)
+    assert report["dates_succeeded"] == 2
+
+    changed = _PAYLOAD + [{"id": "3", "name": "Brew C", "city": "Austin", "state": "TX", "brewery_type": "micro"}]
+    _create_bronze(datalake, "2026-05-02", changed)
+    report = run_backfill("2026-05-01", "2026-05-02", workers=0, force=True)
+
+    assert report["success"] is True
+    assert report["dates_resumed"] == 0
+    assert report["dates_processed"] == 2
+    df = pd.read_parquet(datalake / "silver" / "processing_date=2026-05-02" / "breweries.parquet")
+    assert len(df) == 3
+
+    # sem --force a mesma chamada só retoma
+    report = run_backfill("2026-05-01", "2026-05-02", workers=0)
+    assert report["dates_resumed"] == 2 and report["dates_processed"] == 0
@@ -0,0 +1,44 @@
+# Bibliotecas
+import ast
+from pathlib import Path
+
+# Script
+from src.monitoring import parse_benchmark
+
+DAG_FILE = Path(__file__).resolve().parents[1] / "dags" / "brewery_pipeline_dag.py"
+
+# Nós executados no parse do arquivo (fora do corpo das funções)
+def _parse_time_nodes(tree):
+    stack = list(tree.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        yield node
+        stack.extend(ast.iter_child_nodes(node))
+
+
+# TESTE 1: Parse da DAG não importa src/requests nem consulta Variables
+def test_dag_has_no_parse_time_imports_or_variable_lookups():
+    tree = ast.parse(DAG_FILE.read_text(encoding="utf-8"))
+
+    imported, calls = set(), []
+    for node in _parse_time_nodes(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imported.add(node.module.split(".")[0])
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            if isinstance(node.func.value, ast.Name):
+                calls.append(f"{node.func.value.id}.{node.func.attr}")
+
+    assert not imported & {"src", "requests", "pandas", "pyarrow", "psycopg2", "dotenv"}
+    assert "Variable.get" not in calls
+
+
+# TESTE 2: Módulos de monitoramento usados pela DAG importam sem dependências pesadas
+def test_monitoring_modules_import_without_heavy_dependencies():
+    for name in parse_benchmark.DEFAULT_MODULES:
+        result = parse_benchmark.measure_module(name, repeat=1)
+        assert "error" not in result, result
+        assert result["heavy"] == [], result
@@ -0,0 +1,76 @@
+# Bibliotecas
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from unittest.mock import patch
+
+# Scripts
+from src.quality.data_contract import validate_data_contract, check_key
+from src.transformation.gold_transform import transform_to_gold
+
+EXECUTION_DATE = "2026-02-17"
+
+# Silver com um registro sem brewery_type (fica fora de state x brewery_type, entra no total do estado)
+_SILVER = [
+    {"id": "1", "name": "brew a", "brewery_type": "micro", "city": "los angeles", "state": "ca", "latitude": 34.0},
+    {"id": "2", "name": "brew b", "brewery_type": "micro", "city": "los angeles", "state": "ca", "latitude": 34.1},
+    {"id": "3", "name": "brew c", "brewery_type": None, "city": "new york", "state": "ny", "latitude": None},
+]
+
+@pytest.fixture
+def partition(isolated_env, monkeypatch):
+    monkeypatch.setenv("ENV", "TEST")
+    silver_dir = isolated_env["datalake"] / "silver" / f"processing_date={EXECUTION_DATE}"
+    silver_dir.mkdir(parents=True)
+    pd.DataFrame(_SILVER).to_parquet(silver_dir / "breweries.parquet", index=False)
+
+    with patch("src.transformation.gold_transform.init_db"), patch("src.transformation.gold_transform.save_metrics_dict"):
+        gold = transform_to_gold(execution_date=EXECUTION_DATE)
+    assert gold["success"] is True
+
+    with patch("src.quality.data_contract.init_db"), patch("src.quality.data_contract.save_metrics_dict") as mock_save:
+        yield {"silver_dir": silver_dir, "gold_dir": isolated_env["datalake"] / "gold" / f"processing_date={EXECUTION_DATE}", "metrics": mock_save}
+
+# TESTE 1: saídas geradas pela própria Gold respeitam o contrato
+def test_contract_passes_on_pipeline_outputs(partition):
+    result = validate_data_contract(EXECUTION_DATE)
+
+    assert result["success"] is True, result["violations"]
+    assert result["silver_rows"] == 3
+    assert partition["metrics"].call_args.args[2] == "contract"
+    assert partition["metrics"].call_args.args[3]["violations"] == 0
+
+# TESTE 2: rollup Gold que não bate com a Silver e chave duplicada na Silver
+def test_contract_detects_reconciliation_and_key_violations(partition):
+    state_file = partition["gold_dir"] / "breweries_by_state.parquet"
+    df_state = pd.read_parquet(state_file)
+    df_state.loc[df_state["state"] == "ca", "breweries_per_state"] = 5
+    df_state.to_parquet(state_file, index=False)
+
+    silver = pd.DataFrame(_SILVER + [dict(_SILVER[0])])
+    silver.to_parquet(partition["silver_dir"] / "breweries.parquet", index=False)
+
+    violations = validate_data_contract(EXECUTION_DATE)["violations"]
+
+    assert any(v.startswith("silver: 1 chaves duplicadas") for v in violations)
+    assert any(v.startswith("gold.breweries_by_state: soma de breweries_per_state = 6") for v in violations)
+
+# TESTE 3: schema errado e tabela ausente
+def test_contract_detects_schema_violations(partition):
+    os.remove(partition["gold_dir"] / "breweries_by_type.parquet")
+    table = pq.read_table(partition["gold_dir"] / "breweries_by_state.parquet")
+    pq.write_table(table.set_column(1, "breweries_per_state", pa.array(["2", "1"])), partition["gold_dir"] / "breweries_by_state.parquet")
+
+    violations = validate_data_contract(EXECUTION_DATE)["violations"]
+
+    assert "gold: tabela ausente: breweries_by_type" in violations
+    assert any("coluna breweries_per_state com tipo string" in v for v in violations)
+
+# TESTE 4: chave composta
+def test_check_key_composite():
+    table = pa.table({"city": ["a", "a", "b"], "state": ["x", "x", None]})
+    violations = check_key(table, ["city", "state"], "t")
+    assert "t: 1 valores nulos na chave state" in violations
+    assert "t: 1 chaves duplicadas em (city, state)" in violations
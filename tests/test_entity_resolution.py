@@ -0,0 +1,51 @@
+# Bibliotecas
+import pandas as pd
+
+# Entity resolution
+from src.transformation.entity_resolution import detect_fuzzy_duplicates, normalize_name, geohash
+
+
+# TESTE 1: Normalização remove pontuação e termos genéricos
+def test_normalize_name():
+    assert normalize_name("The Bruery Brewing Co.") == "bruery"
+    assert normalize_name("Brewing Company") == "brewing company"
+
+
+# TESTE 2: Geohash conhecido
+def test_geohash():
+    assert geohash(57.64911, 10.40744, 6) == "u4pruy"
+
+
+# TESTE 3: Detecta quase duplicados só dentro do mesmo bloco (state + city)
+def test_detect_fuzzy_duplicates_clusters():
+    df = pd.DataFrame([
+        {"id": "a1", "name": "Stone Brewing Co", "city": "escondido", "state": "california"},
+        {"id": "a2", "name": "Stone Brewing Company", "city": "escondido", "state": "california"},
+        {"id": "a3", "name": "Lost Abbey", "city": "escondido", "state": "california"},
+        # mesmo nome, outra cidade: não pode casar (bloco diferente)
+        {"id": "b1", "name": "Stone Brewing", "city": "richmond", "state": "virginia"},
+        # sem cidade: cai no bloco de geohash
+        {"id": "c1", "name": "Hill Farmstead", "city": None, "state": "vermont", "latitude": 44.64, "longitude": -72.29},
+        {"id": "c2", "name": "Hill Farmstead Brewery", "city": None, "state": "vermont", "latitude": 44.64, "longitude": -72.29},
+    ])
+
+    clusters, stats = detect_fuzzy_duplicates(df, threshold=0.8)
+
+    assert stats["clusters"] == 2
+    assert stats["records_in_clusters"] == 4
+    assert sorted(clusters["cluster_id"].unique()) == ["a1", "c1"]
+    assert set(clusters[clusters["cluster_id"] == "a1"]["id"]) == {"a1", "a2"}
+    # candidatos: 3 pares no bloco de escondido + 1 no bloco geohash
+    assert stats["candidate_pairs"] == 4
+
+
+# TESTE 4: Sem duplicados retorna tabela vazia com colunas
+def test_detect_fuzzy_duplicates_empty():
+    df = pd.DataFrame([
+        {"id": "1", "name": "Alpha", "city": "x", "state": "y"},
+        {"id": "2", "name": "Omega", "city": "x", "state": "y"},
+    ])
+    clusters, stats = detect_fuzzy_duplicates(df)
+    assert clusters.empty
+    assert "cluster_id" in clusters.columns
+    assert stats["matched_pairs"] == 0
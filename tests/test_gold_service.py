@@ -0,0 +1,158 @@
+# Bibliotecas
+import json
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
+import pytest
+from pathlib import Path
+
+# Serving Gold
+from src.serving.gold_service import GoldService, make_http_server
+
+# Cria uma partição Gold fake com os 4 arquivos esperados (e o marcador, se completa)
+def _create_fake_gold(datalake: Path, processing_date: str, ca_micro: int = 2, complete: bool = True):
+    gold_dir = datalake / "gold" / f"processing_date={processing_date}"
+    gold_dir.mkdir(parents=True, exist_ok=True)
+
+    pd.DataFrame({
+        "state": ["california", "california", "new york"],
+        "brewery_type": ["micro", "brewpub", "micro"],
+        "breweries_per_state_type": [ca_micro, 1, 1],
+    }).to_parquet(gold_dir / "breweries_by_state_type.parquet", index=False)
+    pd.DataFrame({
+        "state": ["california", "new york"],
+        "breweries_per_state": [ca_micro + 1, 1],
+    }).to_parquet(gold_dir / "breweries_by_state.parquet", index=False)
+    pd.DataFrame({
+        "brewery_type": ["micro", "brewpub"],
+        "brewery_per_type": [ca_micro + 1, 1],
+    }).to_parquet(gold_dir / "breweries_by_type.parquet", index=False)
+    pd.DataFrame({
+        "city": ["los angeles", "san diego", "new york"],
+        "state": ["california", "california", "new york"],
+        "brewery_per_city_state": [ca_micro, 1, 1],
+    }).to_parquet(gold_dir / "breweries_by_city_state.parquet", index=False)
+    if complete:
+        (gold_dir / "_SUCCESS").write_text(json.dumps({"ca_micro": ca_micro}), encoding="utf-8")
+
+
+# TESTE 1: Consultas e contadores de cache
+def test_gold_service_lookups_and_cache(isolated_env):
+    _create_fake_gold(isolated_env["datalake"], "2026-01-01")
+    service = GoldService(datalake_root=str(isolated_env["datalake"]), reload_interval=3600)
+
+    assert service.breweries_in_state("California") == {"micro": 2, "brewpub": 1}
+    assert service.breweries_in_state("California", "micro") == 2
+    assert service.breweries_in_state("California", "micro") == 2
+    assert service.top_states(1) == [["california", 3]]
+    assert service.top_cities(5, state="new york") == [["new york", "new york", 1]]
+
+    stats = service.stats()
+    assert stats["processing_date"] == "2026-01-01"
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+# TESTE 2: Cache limitado e hot-reload de partição nova
+def test_gold_service_bounded_cache_and_reload(isolated_env):
+    datalake = isolated_env["datalake"]
+    _create_fake_gold(datalake, "2026-01-01")
+    service = GoldService(datalake_root=str(datalake), cache_size=2, reload_interval=0)
+
+    service.top_states(1)
+    service.top_types(1)
+    service.top_cities(1)
+    assert service.stats()["cache_size"] == 2
+
+    _create_fake_gold(datalake, "2026-01-02", ca_micro=10)
+    assert service.breweries_in_state("california", "micro") == 10
+    assert service.stats()["processing_date"] == "2026-01-02"
+    assert service.stats()["reloads"] == 2
+
+
+# TESTE 3: Endpoint HTTP local
+def test_gold_service_http(isolated_env):
+    _create_fake_gold(isolated_env["datalake"], "2026-01-01")
+    service = GoldService(datalake_root=str(isolated_env["datalake"]), reload_interval=3600)
+    server = make_http_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/state/california?type=micro") as resp:
+            assert json.loads(resp.read()) == 2
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/top/states?k=1") as resp:
+            assert json.loads(resp.read()) == [["california", 3]]
+
+        # k inválido, negativo ou grande demais: 400 (sem derrubar a conexão)
+        for bad_k in ("abc", "-1", "0", "100000"):
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/top/cities?k={bad_k}")
+            assert exc.value.code == 400
+            assert "k" in json.loads(exc.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# TESTE 4: Partição sem marcador (Gold ainda gravando) é ignorada; recargas concorrentes carregam uma vez
+def test_gold_service_requires_marker_and_serializes_reload(isolated_env, monkeypatch):
+    from src.serving import gold_service
+
+    datalake = isolated_env["datalake"]
+    _create_fake_gold(datalake, "2026-01-01")
+    _create_fake_gold(datalake, "2026-01-02", ca_micro=10, complete=False)
+    service = GoldService(datalake_root=str(datalake), reload_interval=3600)
+    assert service.breweries_in_state("california", "micro") == 2
+
+    (datalake / "gold" / "processing_date=2026-01-02" / "_SUCCESS").write_text("{}", encoding="utf-8")
+    loads = []
+    original_load = gold_service.GoldSnapshot.load
+
+    def slow_load(processing_date, folder):
+        loads.append(processing_date)
+        threading.Event().wait(0.05)
+        return original_load(processing_date, folder)
+
+    monkeypatch.setattr(gold_service.GoldSnapshot, "load", slow_load)
+    threads = [threading.Thread(target=service.reload) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == ["2026-01-02"]
+    assert service.breweries_in_state("california", "micro") == 10
+
+
+# TESTE 5: A mesma data regravada pela Gold (rerun/backfill --force) é recarregada
+def test_gold_service_reloads_rewritten_partition(isolated_env):
+    datalake = isolated_env["datalake"]
+    _create_fake_gold(datalake, "2026-01-01")
+    service = GoldService(datalake_root=str(datalake), reload_interval=0)
+    assert service.breweries_in_state("california", "micro") == 2
+    assert service.reload() is False
+
+    _create_fake_gold(datalake, "2026-01-01", ca_micro=10)
+    assert service.breweries_in_state("california", "micro") == 10
+    assert service.stats()["reloads"] == 2
+
+
+# TESTE 6: API Python valida k como o endpoint HTTP
+def test_gold_service_python_api_validates_k(isolated_env, monkeypatch):
+    monkeypatch.setenv("GOLD_SERVING_MAX_K", "50")
+    _create_fake_gold(isolated_env["datalake"], "2026-01-01")
+    service = GoldService(datalake_root=str(isolated_env["datalake"]), reload_interval=3600)
+
+    for bad_k in (0, -1, 51, "x"):
+        with pytest.raises(ValueError):
+            service.top_states(bad_k)
+        with pytest.raises(ValueError):
+            service.top_cities(bad_k, state="california")
+    with pytest.raises(ValueError):
+        service.top_types(-1)
+
+    assert service.top_states("1") == [["california", 3]]
+    assert service.stats()["cache_size"] == 1
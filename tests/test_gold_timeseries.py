@@ -0,0 +1,121 @@
+# Bibliotecas
+import pandas as pd
+from pathlib import Path
+from unittest.mock import patch
+
+# Script Gold (séries temporais)
+from src.transformation.gold_timeseries import build_gold_timeseries
+
+# Cria uma partição Silver fake para a data informada
+def _create_fake_silver(datalake: Path, processing_date: str, rows: list):
+    silver_dir = datalake / "silver" / f"processing_date={processing_date}"
+    silver_dir.mkdir(parents=True, exist_ok=True)
+    df = pd.DataFrame(rows)
+    df.to_parquet(silver_dir / "breweries.parquet", index=False)
+    return df
+
+
+DAY_1 = [
+    {"id": "1", "name": "a", "state": "CA", "brewery_type": "micro", "city": "la"},
+    {"id": "2", "name": "b", "state": "CA", "brewery_type": "brewpub", "city": "la"},
+    {"id": "3", "name": "c", "state": "NY", "brewery_type": "micro", "city": "ny"},
+]
+
+DAY_2 = [
+    {"id": "1", "name": "a", "state": "CA", "brewery_type": "micro", "city": "la"},
+    {"id": "4", "name": "d", "state": "CA", "brewery_type": "micro", "city": "sf"},
+    {"id": "3", "name": "c", "state": "NY", "brewery_type": "micro", "city": "ny"},
+]
+
+# TESTE 1: Séries são geradas para todas as partições Silver
+@patch("src.transformation.gold_timeseries.init_db")
+@patch("src.transformation.gold_timeseries.save_metrics_dict")
+@patch("src.transformation.gold_timeseries.generate_run_id", return_value="run_test")
+def test_timeseries_builds_all_dates(mock_run_id, mock_save_metrics, mock_init_db, isolated_env):
+    datalake: Path = isolated_env["datalake"]
+    _create_fake_silver(datalake, "2026-01-01", DAY_1)
+    _create_fake_silver(datalake, "2026-01-02", DAY_2)
+
+    result = build_gold_timeseries(execution_date="2026-01-02")
+
+    assert result["success"] is True
+    assert result["dates_new"] == ["2026-01-01", "2026-01-02"]
+
+    df_type = pd.read_parquet(result["output_files"]["breweries_daily_by_state_type.parquet"])
+    ca_micro = df_type[(df_type["processing_date"] == "2026-01-02") & (df_type["state"] == "CA") & (df_type["brewery_type"] == "micro")]
+    assert int(ca_micro["breweries"].iloc[0]) == 2
+
+    df_state = pd.read_parquet(result["output_files"]["breweries_daily_by_state.parquet"])
+    ca_day2 = df_state[(df_state["processing_date"] == "2026-01-02") & (df_state["state"] == "CA")].iloc[0]
+    assert int(ca_day2["opened"]) == 1
+    assert int(ca_day2["closed"]) == 1
+
+    mock_save_metrics.assert_called_once()
+
+
+# TESTE 2: Execução seguinte processa apenas as datas novas
+@patch("src.transformation.gold_timeseries.init_db")
+@patch("src.transformation.gold_timeseries.save_metrics_dict")
+@patch("src.transformation.gold_timeseries.generate_run_id", return_value="run_test")
+def test_timeseries_is_incremental(mock_run_id, mock_save_metrics, mock_init_db, isolated_env):
+    datalake: Path = isolated_env["datalake"]
+    _create_fake_silver(datalake, "2026-01-01", DAY_1)
+    first = build_gold_timeseries(execution_date="2026-01-01")
+    assert first["dates_new"] == ["2026-01-01"]
+
+    _create_fake_silver(datalake, "2026-01-02", DAY_2)
+    second = build_gold_timeseries(execution_date="2026-01-02")
+
+    assert second["success"] is True
+    assert second["dates_new"] == ["2026-01-02"]
+    # lê só a data nova + o dia anterior (para aberturas/fechamentos)
+    assert second["partitions_read"] == 2
+    assert second["series_dates"] == 2
+
+    third = build_gold_timeseries(execution_date="2026-01-02")
+    assert third["success"] is True
+    assert third["dates_new"] == []
+    assert third["partitions_read"] == 0
+
+
+# TESTE 3: Falha quando não há partições Silver
+@patch("src.transformation.gold_timeseries.init_db")
+@patch("src.transformation.gold_timeseries.save_metrics_dict")
+def test_timeseries_fails_without_silver(mock_save_metrics, mock_init_db, isolated_env):
+    result = build_gold_timeseries(execution_date="2026-01-01")
+
+    assert result["success"] is False
+    assert "Nenhuma partição Silver" in result["error"]
+    mock_save_metrics.assert_not_called()
+
+
+# TESTE 4: Partição Silver reprocessada é recalculada (e o dia seguinte, que compara com ela)
+@patch("src.transformation.gold_timeseries.init_db")
+@patch("src.transformation.gold_timeseries.save_metrics_dict")
+@patch("src.transformation.gold_timeseries.generate_run_id", return_value="run_test")
+def test_timeseries_recomputes_changed_silver(mock_run_id, mock_save_metrics, mock_init_db, isolated_env):
+    datalake: Path = isolated_env["datalake"]
+    _create_fake_silver(datalake, "2026-01-01", DAY_1)
+    _create_fake_silver(datalake, "2026-01-02", DAY_2)
+    _create_fake_silver(datalake, "2026-01-03", DAY_2)
+    build_gold_timeseries(execution_date="2026-01-03")
+
+    # reprocessamento da Silver de 2026-01-01 (ex.: backfill --force)
+    _create_fake_silver(datalake, "2026-01-01", DAY_1 + [
+        {"id": "5", "name": "e", "state": "NY", "brewery_type": "micro", "city": "ny"},
+    ])
+    result = build_gold_timeseries(execution_date="2026-01-03")
+
+    assert result["success"] is True
+    assert result["dates_new"] == []
+    assert result["dates_changed"] == ["2026-01-01"]
+    assert result["dates_recomputed"] == ["2026-01-01", "2026-01-02"]
+
+    df_state = pd.read_parquet(result["output_files"]["breweries_daily_by_state.parquet"])
+    ny = df_state[df_state["state"] == "NY"].set_index("processing_date")
+    assert int(ny.loc["2026-01-01", "breweries"]) == 2
+    assert int(ny.loc["2026-01-02", "closed"]) == 1
+
+    # nada mudou desde o último cálculo
+    again = build_gold_timeseries(execution_date="2026-01-03")
+    assert again["dates_changed"] == [] and again["partitions_read"] == 0
@@ -106,3 +106,99 @@ def test_gold_records_received_matches(mock_run_id, mock_save_metrics, mock_init
 
     # Run_id deve existir (mockado)
     assert result["run_id"] == "run_test"
+
+
+# TESTE 4: Formato arrow_bundle grava um único arquivo com todas as tabelas
+@patch("src.transformation.gold_transform.init_db")
+@patch("src.transformation.gold_transform.save_metrics_dict")
+@patch("src.transformation.gold_transform.generate_run_id", return_value="run_test")
+def test_gold_arrow_bundle_output(mock_run_id, mock_save_metrics, mock_init_db, isolated_env, execution_date, monkeypatch):
+    from src.transformation.gold_bundle import read_gold_bundle
+
+    monkeypatch.setenv("GOLD_OUTPUT_FORMAT", "both")
+    datalake: Path = isolated_env["datalake"]
+    _create_fake_silver(datalake, execution_date)
+    result = transform_to_gold(execution_date=execution_date)
+
+    assert result["success"] is True
+    assert "gold_bundle.arrow" in result["output_files"]
+    assert "breweries_by_state.parquet" in result["output_files"]
+
+    tables = read_gold_bundle(result["output_files"]["gold_bundle.arrow"])
+    assert set(tables) == {
+        "breweries_by_state_type", "breweries_by_state",
+        "breweries_by_type", "breweries_by_city_state",
+    }
+    df_parquet = pd.read_parquet(result["output_files"]["breweries_by_state_type.parquet"])
+    assert tables["breweries_by_state_type"].num_rows == len(df_parquet)
+
+
+# TESTE 5: Silver inalterada reaproveita a Gold anterior; com configuração diferente reprocessa
+@patch("src.transformation.gold_transform.init_db")
+@patch("src.transformation.gold_transform.save_metrics_dict")
+@patch("src.transformation.gold_transform.generate_run_id", return_value="run_test")
+def test_gold_skips_unchanged_silver(mock_run_id, mock_save_metrics, mock_init_db, isolated_env, execution_date, monkeypatch):
+    datalake: Path = isolated_env["datalake"]
+    _create_fake_silver(datalake, execution_date)
+    first = transform_to_gold(execution_date=execution_date)
+    assert first["success"] is True
+
+    # mesma Silver em outra data (hard-link, como a Silver pulada faz)
+    next_silver = datalake / "silver" / "processing_date=2099-01-02"
+    next_silver.mkdir(parents=True)
+    os.link(datalake / "silver" / f"processing_date={execution_date}" / "breweries.parquet", next_silver / "breweries.parquet")
+
+    second = transform_to_gold(execution_date="2099-01-02")
+    assert second["success"] is True
+    assert second["skipped"] is True
+    assert second["records_gold"] == first["records_gold"]
+    assert set(second["output_files"]) == set(first["output_files"])
+    assert "processing_date=2099-01-02" in second["output_file"]
+    assert os.path.samefile(second["output_file"], first["output_file"])
+
+    monkeypatch.setenv("GOLD_OUTPUT_FORMAT", "both")
+    third = transform_to_gold(execution_date="2099-01-02")
+    assert third["success"] is True
+    assert "skipped" not in third
+    assert "gold_bundle.arrow" in third["output_files"]
+
+
+# TESTE 6: Troca de formato remove as saídas antigas do outro formato; marcador gravado por último
+@patch("src.transformation.gold_transform.init_db")
+@patch("src.transformation.gold_transform.save_metrics_dict")
+@patch("src.transformation.gold_transform.generate_run_id", return_value="run_test")
+def test_gold_format_switch_removes_stale_outputs(mock_run_id, mock_save_metrics, mock_init_db, isolated_env, execution_date, monkeypatch):
+    datalake: Path = isolated_env["datalake"]
+    _create_fake_silver(datalake, execution_date)
+    gold_dir = datalake / "gold" / f"processing_date={execution_date}"
+
+    monkeypatch.setenv("GOLD_OUTPUT_FORMAT", "both")
+    assert transform_to_gold(execution_date=execution_date)["success"] is True
+    assert (gold_dir / "gold_bundle.arrow").exists()
+
+    monkeypatch.setenv("GOLD_OUTPUT_FORMAT", "parquet")
+    assert transform_to_gold(execution_date=execution_date)["success"] is True
+    assert sorted(os.listdir(gold_dir)) == [
+        "_SUCCESS", "breweries_by_city_state.parquet", "breweries_by_state.parquet",
+        "breweries_by_state_type.parquet", "breweries_by_type.parquet",
+    ]
+
+    monkeypatch.setenv("GOLD_OUTPUT_FORMAT", "arrow_bundle")
+    assert transform_to_gold(execution_date=execution_date)["success"] is True
+    assert sorted(os.listdir(gold_dir)) == ["_SUCCESS", "gold_bundle.arrow"]
+
+
+# TESTE 7: Agregação direto na tabela Arrow (pipeline em processo) igual à do pandas
+def test_gold_arrow_aggregation_matches_pandas():
+    import pyarrow as pa
+    from src.transformation.gold_transform import _aggregate, _aggregate_arrow
+
+    df = pd.DataFrame({
+        "state": ["ca", "ny", "ca", "tx", None, "ny", "tx", "ca"],
+        "brewery_type": ["micro", "micro", "brewpub", "micro", "micro", None, "large", "micro"],
+        "city": ["la", "nyc", "sd", "austin", "x", "nyc", None, "la"],
+    })
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for city_top_k in (0, 2):
+        for expected, got in zip(_aggregate(table.to_pandas(), city_top_k), _aggregate_arrow(table, city_top_k)):
+            pd.testing.assert_frame_equal(expected.reset_index(drop=True), got.reset_index(drop=True))
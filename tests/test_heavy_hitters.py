@@ -0,0 +1,53 @@
+# Bibliotecas
+import random
+import pandas as pd
+from collections import Counter
+
+# Operadores top-k
+from src.transformation.heavy_hitters import ExactTopK, SpaceSaving, top_k_from_batches
+
+# TESTE 1: Top-k exato com merge de partições bate com groupby + sort
+def test_exact_topk_merge_matches_groupby():
+    part_1 = pd.DataFrame({"city": ["a", "a", "b", "c"], "state": ["x", "x", "x", "y"]})
+    part_2 = pd.DataFrame({"city": ["b", "b", "a", "d"], "state": ["x", "x", "x", "y"]})
+
+    left = ExactTopK(2).update_batch(part_1, ["city", "state"])
+    right = ExactTopK(2).update_batch(part_2, ["city", "state"])
+    top = left.merge(right).top()
+
+    expected = (
+        pd.concat([part_1, part_2]).groupby(["city", "state"]).size()
+        .sort_values(ascending=False).head(2)
+    )
+    assert [(key, count) for key, count in top] == list(expected.items())
+    assert left.total == 8
+
+
+# TESTE 2: Space-Saving encontra os heavy hitters com erro limitado
+def test_space_saving_heavy_hitters():
+    rng = random.Random(42)
+    stream = ["hot_1"] * 300 + ["hot_2"] * 200 + [f"cold_{rng.randint(0, 500)}" for _ in range(500)]
+    rng.shuffle(stream)
+
+    summary = SpaceSaving(capacity=20)
+    for item in stream[:500]:
+        summary.update(item)
+    other = SpaceSaving(capacity=20)
+    for item in stream[500:]:
+        other.update(item)
+    summary.merge(other)
+
+    real = Counter(stream)
+    top = summary.top(2)
+    assert [key for key, _, _ in top] == ["hot_1", "hot_2"]
+    for key, count, error in top:
+        # contagem superestimada em no máximo `error`
+        assert count - error <= real[key] <= count
+
+
+# TESTE 3: Atalho por lotes (exato e aproximado)
+def test_top_k_from_batches():
+    batches = [pd.DataFrame({"state": ["ca", "ca", "ny"]}), pd.DataFrame({"state": ["ca", "tx"]})]
+
+    assert top_k_from_batches(batches, "state", k=1) == [("ca", 3)]
+    assert top_k_from_batches(batches, "state", k=1, approximate=True)[0][:2] == ("ca", 3)
@@ -106,3 +106,29 @@ def test_ingestion_returns_records(mock_run_id, mock_save_metrics, mock_init_db,
 
     assert result["success"] is True
     assert result["total_records"] > 0
+
+# Teste 4: Manifesto das páginas (impressão digital da entrada da Silver)
+@patch("src.ingestion.extract_api.requests.get")
+@patch("src.ingestion.extract_api.init_db")
+@patch("src.ingestion.extract_api.save_metrics_dict")
+@patch("src.ingestion.extract_api.generate_run_id", return_value="run_test")
+def test_ingestion_writes_manifest(mock_run_id, mock_save_metrics, mock_init_db, mock_get, isolated_env, monkeypatch, execution_date):
+    from src.transformation.stage_fingerprint import MANIFEST_FILE, bronze_input_hash
+
+    _set_test_env(monkeypatch, isolated_env)
+
+    mock_get.side_effect = [
+        _mock_response([{"id": "1", "name": "A"}]),
+        _mock_response([]),
+    ]
+
+    result = extract_breweries(per_page=5, max_pages=10, execution_date=execution_date)
+
+    assert result["manifest_hash"]
+    assert os.path.exists(os.path.join(result["output_folder"], MANIFEST_FILE))
+    assert bronze_input_hash(result["output_folder"]) == result["manifest_hash"]
+
+    # página alterada fora da ingestão: o manifesto deixa de valer e os arquivos são relidos
+    with open(os.path.join(result["output_folder"], "page_001.json"), "w", encoding="utf-8") as f:
+        json.dump([{"id": "1", "name": "B", "extra": True}], f)
+    assert bronze_input_hash(result["output_folder"]) != result["manifest_hash"]
@@ -0,0 +1,90 @@
+# Bibliotecas
+import json
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+# Scripts
+from src.monitoring.memory_usage import MemoryTracker, exceeds_budget
+from src.transformation.silver_transform import transform_to_silver
+from src.transformation.gold_transform import transform_to_gold
+
+EXECUTION_DATE = "2026-02-17"
+
+# 4 páginas com ids repetidos entre páginas, nomes/tipos nulos e uma coluna que só existe em uma página
+def _create_fake_bronze(datalake):
+    bronze_dir = datalake / "raw" / f"ingestion_date={EXECUTION_DATE}"
+    bronze_dir.mkdir(parents=True)
+    names = ["Brew A", "  brew   B ", None, "Cerveja C", "Brew A Co"]
+    for page in range(4):
+        payload = []
+        for i in range(25):
+            record = {
+                "id": str((page * 25 + i) % 70),
+                "name": names[i % len(names)],
+                "city": ["Los Angeles", "New York", None][i % 3],
+                "state": ["CA", "NY", "CA", None][i % 4],
+                "brewery_type": ["micro", "brewpub", None, "weird"][(i + page) % 4],
+                "latitude": ["34.0", None, "x"][i % 3],
+            }
+            if page == 2:
+                record["country"] = "US"
+            payload.append(record)
+        with open(bronze_dir / f"page_{page + 1:03}.json", "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+def _run(isolated_env, monkeypatch, budget_mb: str):
+    monkeypatch.setenv("ENV", "TEST")
+    monkeypatch.setenv("SKIP_IF_UNCHANGED", "false")
+    monkeypatch.setenv("STAGE_MEMORY_BUDGET_MB", budget_mb)
+    with patch("src.transformation.silver_transform.init_db"), patch("src.transformation.silver_transform.save_metrics_dict") as silver_metrics, \
+            patch("src.transformation.gold_transform.init_db"), patch("src.transformation.gold_transform.save_metrics_dict"):
+        silver = transform_to_silver(execution_date=EXECUTION_DATE)
+        gold = transform_to_gold(execution_date=EXECUTION_DATE)
+    assert silver["success"] is True and gold["success"] is True
+    return silver, gold, silver_metrics.call_args.args[3]
+
+@pytest.fixture
+def in_memory(isolated_env, monkeypatch):
+    _create_fake_bronze(isolated_env["datalake"])
+    silver, gold, _ = _run(isolated_env, monkeypatch, "")
+    return {
+        "silver": silver,
+        "silver_df": pd.read_parquet(silver["output_file"]),
+        "gold": {name: pd.read_parquet(path) for name, path in gold["output_files"].items()},
+    }
+
+# Teste 1: acima do orçamento, Silver e Gold em lotes geram as mesmas saídas e indicadores
+def test_chunked_path_matches_in_memory(in_memory, isolated_env, monkeypatch):
+    silver, gold, metrics = _run(isolated_env, monkeypatch, "0.002")
+
+    assert silver["memory_mode"] == "chunked" and gold["memory_mode"] == "chunked"
+    assert silver["spans"]["batch_transform"]["count"] > 1
+    assert not (isolated_env["datalake"] / "silver" / f"processing_date={EXECUTION_DATE}" / "_spill").exists()
+
+    pd.testing.assert_frame_equal(pd.read_parquet(silver["output_file"]), in_memory["silver_df"])
+    for name, expected in in_memory["gold"].items():
+        pd.testing.assert_frame_equal(pd.read_parquet(gold["output_files"][name]), expected)
+    for key in ("records", "null_name", "null_brewery_type", "null_city_state", "duplicate_id",
+                "invalid_brewery_type", "fuzzy_duplicate_clusters", "schema_extra_cols"):
+        assert silver[key] == in_memory["silver"][key], key
+
+    assert metrics["memory_mode"] == "chunked"
+    assert metrics["records_received_bronze"] == 100
+
+# Teste 2: uso de memória no resultado; sem orçamento nada é processado em lotes
+def test_memory_report_and_budget(in_memory, monkeypatch):
+    silver = in_memory["silver"]
+    assert silver["memory_mode"] == "in_memory"
+    assert silver["peak_rss_mb"] > 0
+    assert silver["frame_peak_mb"] > 0
+
+    monkeypatch.setenv("STAGE_MEMORY_BUDGET_MB", "")
+    assert exceeds_budget(10 ** 12)[0] is False
+    monkeypatch.setenv("STAGE_MEMORY_BUDGET_MB", "1")
+    monkeypatch.setenv("MEMORY_EXPANSION_FACTOR", "4")
+    assert exceeds_budget(300 * 1024) == (True, 4 * 300 * 1024)
+
+    tracker = MemoryTracker()
+    tracker.observe(pd.DataFrame({"a": range(1000)}))
+    assert tracker.report()["frame_peak_mb"] > 0
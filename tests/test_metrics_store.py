@@ -0,0 +1,308 @@
+# Bibliotecas
+import os
+import json
+import sqlite3
+import threading
+import pytest
+
+# Script
+from src.monitoring import metrics_store
+
+# Aponta o banco de métricas para um arquivo temporário
+@pytest.fixture
+def metrics_db(isolated_env, monkeypatch):
+    db_path = isolated_env["datalake"] / "metrics" / "metrics.db"
+    metrics_store.close_db()
+    monkeypatch.setattr(metrics_store, "DB_PATH", str(db_path))
+    yield db_path
+    metrics_store.close_db()
+
+def _count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM pipeline_metrics").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# TESTE 1: Dict inteiro gravado em uma transação, com a conexão reaproveitada
+def test_save_metrics_dict_batches_rows(metrics_db):
+    metrics_store.init_db()
+    conn = metrics_store._get_connection()
+
+    metrics_store.save_metrics_dict("run_1", "2026-01-01", "silver", {"a": 1, "b": 2.5, "c": "x"})
+    metrics_store.save_metric("run_1", "2026-01-01", "silver", "d", 4)
+
+    assert metrics_store._get_connection() is conn
+    assert _count_rows(metrics_db) == 4
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+# TESTE 2: Escritas concorrentes de várias threads não perdem linhas
+def test_concurrent_writers(metrics_db):
+    def writer(n):
+        for i in range(20):
+            metrics_store.save_metrics_dict(f"run_{n}", "2026-01-01", "gold", {"m1": i, "m2": i})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _count_rows(metrics_db) == 4 * 20 * 2
+
+
+# TESTE 3: Cliente assíncrono grava em lote e manda para o spool quando o banco falha
+def test_metrics_client_flush_and_spool(metrics_db, monkeypatch):
+    from src.monitoring.metrics_client import MetricsClient
+
+    client = MetricsClient(batch_size=100, flush_interval=60)
+    try:
+        for i in range(10):
+            client.emit("run_1", "2026-01-01", "bronze", "page_latency_ms", float(i))
+        assert client.flush(timeout=5) is True
+        assert _count_rows(metrics_db) == 10
+
+        # Banco indisponível: lote vai para o spool
+        def locked(rows):
+            raise sqlite3.OperationalError("database is locked")
+
+        original = metrics_store.save_metric_rows
+        monkeypatch.setattr(metrics_store, "save_metric_rows", locked)
+        client.emit_dict("run_1", "2026-01-01", "silver", {"a": 1, "b": 2})
+        assert client.flush(timeout=5) is True
+        assert client.points_spilled == 2
+
+        # Banco volta: próximo flush grava o lote novo e reprocessa o spool
+        monkeypatch.setattr(metrics_store, "save_metric_rows", original)
+        client.emit("run_1", "2026-01-01", "gold", "c", 3)
+        assert client.flush(timeout=5) is True
+        assert _count_rows(metrics_db) == 13
+    finally:
+        client.close()
+
+
+# TESTE 4: save_metrics_dict só enfileira quando METRICS_ASYNC=true
+def test_save_metrics_dict_async_mode(metrics_db, monkeypatch):
+    from src.monitoring import metrics_client
+
+    monkeypatch.setenv("METRICS_ASYNC", "true")
+    monkeypatch.setattr(metrics_client, "_client", None)
+
+    metrics_store.save_metrics_dict("run_1", "2026-01-01", "silver", {"a": 1, "b": 2})
+    assert metrics_client.flush_metrics(timeout=5) is True
+    assert _count_rows(metrics_db) == 2
+    metrics_client._client.close()
+
+
+# TESTE 5: Schema tipado (numérico, texto, duração) e migração da tabela antiga
+def test_typed_schema_and_migration(metrics_db):
+    metrics_db.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(metrics_db)
+    conn.execute("""
+        CREATE TABLE pipeline_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, execution_date TEXT,
+            layer TEXT, metric_name TEXT, metric_value REAL, created_at TEXT
+        )
+    """)
+    conn.execute("INSERT INTO pipeline_metrics (run_id, execution_date, layer, metric_name, metric_value) VALUES ('old', '2026-01-01', 'bronze', 'ingestion_duration', '0:00:12.5')")
+    conn.commit()
+    conn.close()
+
+    metrics_store.save_metrics_dict("run_1", "2026-01-02", "silver", {
+        "records": 10, "schema_changed": True, "schema_missing_cols": "a,b",
+        "transform_duration": "0:01:02.000000",
+    })
+
+    rows = dict(
+        (name, (mtype, value, text, duration))
+        for name, mtype, value, text, duration in metrics_store.fetch_all(
+            "SELECT metric_name, metric_type, metric_value, metric_text, metric_duration_seconds FROM pipeline_metrics"
+        )
+    )
+    assert rows["ingestion_duration"] == ("duration", None, "0:00:12.5", 12.5)
+    assert rows["records"] == ("numeric", 10.0, None, None)
+    assert rows["schema_changed"] == ("bool", 1.0, None, None)
+    assert rows["schema_missing_cols"] == ("text", None, "a,b", None)
+    assert rows["transform_duration"][3] == 62.0
+
+
+# TESTE 6: Consultas latest/range/percentil e rollups diários incrementais
+def test_metrics_query_and_rollups(metrics_db):
+    from src.monitoring import metrics_query
+
+    for day, values in [("2026-01-01", [1, 2, 3]), ("2026-01-02", [10, 20])]:
+        for i, v in enumerate(values):
+            metrics_store.save_metrics_dict(f"run_{day}_{i}", day, "bronze", {"api_latency_ms": v})
+
+    assert metrics_query.latest_metric("bronze", "api_latency_ms")["value"] == 20
+    assert len(metrics_query.metric_range("bronze", "api_latency_ms", "2026-01-02", "2026-01-02")) == 2
+    assert metrics_query.metric_percentile("bronze", "api_latency_ms", 50) == 3
+    assert metrics_query.metric_percentile("bronze", "api_latency_ms", 50, last_n=2) == 15
+
+    assert metrics_query.refresh_daily_rollups() == 2
+    assert metrics_query.refresh_daily_rollups() == 0
+
+    metrics_store.save_metrics_dict("run_x", "2026-01-02", "bronze", {"api_latency_ms": 30})
+    assert metrics_query.refresh_daily_rollups() == 1
+
+    rollups = metrics_query.daily_rollups("bronze", "api_latency_ms")
+    assert [r["count"] for r in rollups] == [3, 3]
+    assert rollups[1]["max"] == 30
+    assert rollups[0]["avg"] == 2
+
+
+# TESTE 7: Retenção agrega o bruto antigo no tier horário e as consultas continuam vendo o dado
+def test_metrics_retention_tiers(metrics_db):
+    from datetime import datetime, timedelta
+    from src.monitoring import metrics_query, metrics_retention
+
+    hour_40d = (datetime.now() - timedelta(days=40)).replace(minute=0, second=0, microsecond=0)
+    hour_200d = datetime.now() - timedelta(days=200)
+    metrics_store.save_metric_rows([
+        ("old_1", "2026-01-02", "silver", "transform_duration", "0:00:10", hour_40d.isoformat()),
+        ("old_2", "2026-01-02", "silver", "transform_duration", "0:00:20", (hour_40d + timedelta(minutes=30)).isoformat()),
+        ("old_3", "2026-01-01", "silver", "transform_duration", "0:00:40", hour_200d.isoformat()),
+    ])
+    metrics_store.save_metrics_dict("new", "2026-01-03", "silver", {"transform_duration": "0:00:30"})
+
+    result = metrics_retention.run_maintenance(raw_days=30, hourly_days=100)
+
+    assert result["raw_rows_deleted"] == 3
+    assert result["hourly_rows_deleted"] == 1
+    assert metrics_store.fetch_all("SELECT COUNT(*) FROM pipeline_metrics")[0][0] == 1
+
+    series = metrics_query.metric_range("silver", "transform_duration")
+    assert [(r["execution_date"], r["tier"], r["value"]) for r in series] == [
+        ("2026-01-01", "daily", 40.0),
+        ("2026-01-02", "hourly", 15.0),
+        ("2026-01-03", "raw", 30.0),
+    ]
+
+    # tier horário expirado: continua visível via rollup diário
+    metrics_retention.run_maintenance(raw_days=30, hourly_days=30)
+    series = metrics_query.metric_range("silver", "transform_duration", end_date="2026-01-02")
+    assert [(r["tier"], r["value"]) for r in series] == [("daily", 40.0), ("daily", 15.0)]
+
+
+# TESTE 8: Gate de regressão compara a execução atual com mediana/MAD das anteriores
+def test_perf_regression_flags_slow_stage(metrics_db):
+    from src.monitoring import perf_regression
+
+    for i, seconds in enumerate([10, 11, 9, 10, 12, 10]):
+        metrics_store.save_metrics_dict(f"run_{i}", f"2026-01-0{i + 1}", "silver", {
+            "transform_duration": f"0:00:{seconds:02d}", "records_per_second": 1000 / seconds,
+        })
+        metrics_store.save_metrics_dict(f"run_{i}", f"2026-01-0{i + 1}", "gold", {"transform_duration": "0:00:05"})
+    # execução atual já gravada no banco: não pode entrar na própria baseline
+    metrics_store.save_metrics_dict("run_now", "2026-01-07", "silver", {"transform_duration": "0:00:30"})
+
+    current = perf_regression.current_values(
+        silver={"transform_duration": "0:00:30", "records": 1000},
+        gold={"duration": "0:00:05.2", "records_received": 1000},
+    )
+    result = perf_regression.check_regressions(current, exclude_run_ids={"silver": "run_now"})
+
+    assert result["slowed_stages"] == ["silver"]
+    assert {(r["metric"], r["median"]) for r in result["regressions"]} == {
+        ("transform_duration", 10.0), ("records_per_second", 100.0),
+    }
+    assert "gold.transform_duration" not in [f"{r['stage']}.{r['metric']}" for r in result["regressions"]]
+    assert any(s.startswith("bronze.") for s in result["skipped"])
+
+
+# TESTE 9: Spool reprocessado duas vezes não duplica pontos; registro com erro permanente vai para a quarentena
+def test_metrics_spool_dedupe_and_quarantine(metrics_db, monkeypatch):
+    from src.monitoring.metrics_client import MetricsClient
+
+    client = MetricsClient(batch_size=100, flush_interval=60)
+    client.max_attempts = 2
+    spool = client.spool_path
+    try:
+        client._spill([("run_1", "2026-01-01", "silver", "a", 1, "2026-01-01T00:00:00", "uid-a"),
+                       ("run_1", "2026-01-01", "silver", "b", 2, "2026-01-01T00:00:00", "uid-b")])
+        with open(spool, encoding="utf-8") as f:
+            spooled = f.read()
+
+        # o mesmo spool reprocessado por dois processos: o point_uid evita a duplicata
+        assert client.replay_spool() == 2
+        with open(spool, "w", encoding="utf-8") as f:
+            f.write(spooled)
+        client.replay_spool()
+        assert _count_rows(metrics_db) == 2
+
+        # ponto que nunca grava (erro não transitório): quarentena após max_attempts
+        original = metrics_store.save_metric_rows
+
+        def reject_bad(batch):
+            if any(row[3] == "bad" for row in batch):
+                raise sqlite3.IntegrityError("valor inválido")
+            original(batch)
+
+        monkeypatch.setattr(metrics_store, "save_metric_rows", reject_bad)
+        client._spill([("run_2", "2026-01-02", "gold", "bad", 1, "2026-01-02T00:00:00", "uid-bad"),
+                       ("run_2", "2026-01-02", "gold", "ok", 1, "2026-01-02T00:00:00", "uid-ok")])
+        assert client.replay_spool() == 1
+        assert os.path.exists(f"{spool}.replaying")
+        assert client.replay_spool() == 0
+        assert not os.path.exists(f"{spool}.replaying")
+        assert client.quarantined == 1
+        with open(f"{spool}.quarantine", encoding="utf-8") as f:
+            quarantined = [json.loads(line) for line in f]
+        assert quarantined[0]["row"][3] == "bad" and quarantined[0]["attempts"] == 2
+        assert _count_rows(metrics_db) == 3
+    finally:
+        client.close()
+
+
+# TESTE 10: Linha nova depois do downsampling: rollup diário é mesclado e os tiers são escolhidos por bucket
+def test_rollup_merge_after_downsample(metrics_db):
+    from datetime import datetime, timedelta
+    from src.monitoring import metrics_query, metrics_retention
+
+    hour_40d = (datetime.now() - timedelta(days=40)).replace(minute=0, second=0, microsecond=0)
+    metrics_store.save_metric_rows([
+        ("old_1", "2026-01-02", "silver", "transform_duration", "0:00:10", hour_40d.isoformat()),
+        ("old_2", "2026-01-02", "silver", "transform_duration", "0:00:20", (hour_40d + timedelta(minutes=30)).isoformat()),
+    ])
+    metrics_retention.run_maintenance(raw_days=30, hourly_days=100)
+
+    # reprocessamento tardio da mesma data
+    metrics_store.save_metrics_dict("late", "2026-01-02", "silver", {"transform_duration": "0:01:00"})
+    assert metrics_query.refresh_daily_rollups() == 1
+    rollup, = metrics_query.daily_rollups("silver", "transform_duration")
+    assert (rollup["count"], rollup["min"], rollup["max"], rollup["avg"]) == (3, 10.0, 60.0, 30.0)
+
+    # bruto e horário cobrem pontos diferentes: os dois aparecem
+    series = metrics_query.metric_range("silver", "transform_duration")
+    assert [(r["tier"], r["value"]) for r in series] == [("raw", 60.0), ("hourly", 15.0)]
+
+    # tier horário expirado: o rollup diário cobre só os pontos que saíram do horário
+    metrics_retention.run_maintenance(raw_days=30, hourly_days=30)
+    series = metrics_query.metric_range("silver", "transform_duration")
+    assert [(r["tier"], r["value"]) for r in series] == [("raw", 60.0), ("daily", 15.0)]
+
+
+# TESTE 11: Baseline de performance só com execuções da DAG (runner/backfill têm run_id com prefixo)
+def test_perf_baseline_ignores_runner_and_backfill(metrics_db, monkeypatch):
+    from src.monitoring import perf_regression
+
+    monkeypatch.delenv("PIPELINE_RUN_SOURCE", raising=False)
+    assert not metrics_store.generate_run_id().startswith(metrics_store.NON_DAG_RUN_SOURCES)
+    with metrics_store.metrics_run_source("backfill"):
+        assert metrics_store.generate_run_id().startswith("backfill_")
+    assert "PIPELINE_RUN_SOURCE" not in os.environ
+
+    for i in range(5):
+        metrics_store.save_metrics_dict(f"2026010{i + 1}_000000", f"2026-01-0{i + 1}", "silver", {"peak_rss_mb": 100})
+    # execuções mais recentes fora da DAG, com pico de RSS bem maior
+    for i in range(5):
+        metrics_store.save_metrics_dict(f"runner_2026011{i}_000000", f"2026-01-1{i}", "silver", {"peak_rss_mb": 900})
+        metrics_store.save_metrics_dict(f"backfill_2026011{i}_000000", f"2026-01-1{i}", "silver", {"peak_rss_mb": 500})
+
+    baseline = perf_regression.rolling_baseline("silver", "peak_rss_mb", last_n=5)
+    assert baseline == {"median": 100, "mad": 0, "samples": 5}
+
+    result = perf_regression.check_regressions({("silver", "peak_rss_mb"): 400})
+    assert result["slowed_stages"] == ["silver"]
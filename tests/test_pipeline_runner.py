@@ -0,0 +1,123 @@
+# Bibliotecas
+import os
+import json
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+# Script
+from src.pipeline_runner import BackgroundWriter, run_pipeline
+
+# Simula resposta da API
+def _mock_response(data):
+    class MockResp:
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return data
+    return MockResp()
+
+_PAGE = [
+    {"id": "1", "name": "Brew A", "city": "Los Angeles", "state": "CA", "brewery_type": "micro", "latitude": "34.0", "longitude": "-118.2"},
+    {"id": "2", "name": "Brew B", "city": "New York", "state": "NY", "brewery_type": "brewpub", "latitude": "40.7", "longitude": "-74.0"},
+    {"id": "3", "name": "Brew C", "city": "Los Angeles", "state": "CA", "brewery_type": "micro", "latitude": "34.1", "longitude": "-118.3"},
+]
+
+# Sem banco de métricas nos testes
+@pytest.fixture
+def no_metrics(isolated_env, monkeypatch):
+    monkeypatch.setenv("URL_API", "https://fake-api")
+    monkeypatch.setenv("ENV", "TEST")
+    targets = [
+        f"src.{module}.{name}"
+        for module in ("ingestion.extract_api", "transformation.silver_transform", "transformation.gold_transform", "pipeline_runner")
+        for name in ("init_db", "save_metrics_dict")
+    ]
+    patchers = [patch(target) for target in targets]
+    for p in patchers:
+        p.start()
+    yield isolated_env
+    for p in patchers:
+        p.stop()
+
+# Teste 1: Bronze -> Silver -> Gold em memória, com as mesmas saídas em disco da DAG
+@patch("src.ingestion.extract_api.requests.get")
+def test_run_pipeline_in_memory(mock_get, no_metrics):
+    mock_get.side_effect = [_mock_response(_PAGE), _mock_response([])]
+    datalake = no_metrics["datalake"]
+
+    # a Gold recebe a tabela Arrow da Silver: não relê o parquet
+    with patch("src.transformation.gold_transform.pd.read_parquet", side_effect=AssertionError("releu o parquet")):
+        result = run_pipeline("2026-02-17", per_page=5, max_pages=10)
+
+    assert result["success"] is True, result.get("error")
+    assert result["write_errors"] == []
+    assert result["stages"]["bronze"]["total_records"] == 3
+    assert result["stages"]["silver"]["records"] == 3
+    assert "table" not in result["stages"]["silver"]
+    assert result["stages"]["gold"]["records_received"] == 3
+    # métricas das etapas gravadas antes das gravações em background: o runner registra o resultado delas
+    for stage in ("silver", "gold"):
+        assert result["stages"][stage]["writes_pending"] is False
+        assert result["stages"][stage]["writes_committed"] is True
+        # execução fora da DAG: run_id com a origem (fica fora das baselines de performance)
+        assert result["stages"][stage]["run_id"].startswith("runner_")
+
+    # gravações em background concluídas no fim da execução
+    with open(datalake / "raw" / "ingestion_date=2026-02-17" / "page_001.json", "r", encoding="utf-8") as f:
+        assert len(json.load(f)) == 3
+    assert result["stages"]["bronze"]["manifest_hash"]
+    assert len(pd.read_parquet(result["stages"]["silver"]["output_file"])) == 3
+    by_state = pd.read_parquet(result["stages"]["gold"]["output_files"]["breweries_by_state.parquet"])
+    assert dict(zip(by_state["state"], by_state["breweries_per_state"])) == {"ca": 2, "ny": 1}
+
+# Teste 2: from_stage="gold" lê a Silver do disco
+def test_run_pipeline_from_gold(no_metrics):
+    silver_dir = no_metrics["datalake"] / "silver" / "processing_date=2026-02-17"
+    silver_dir.mkdir(parents=True)
+    pd.DataFrame(_PAGE).to_parquet(silver_dir / "breweries.parquet", index=False)
+
+    result = run_pipeline("2026-02-17", from_stage="gold")
+
+    assert result["success"] is True
+    assert list(result["stages"]) == ["gold"]
+    assert os.path.exists(result["stages"]["gold"]["output_file"])
+
+# Teste 3: erro de gravação em background aparece no resultado
+def test_background_writer_reports_errors(tmp_path):
+    def _fail():
+        raise OSError("disco cheio")
+
+    with BackgroundWriter(max_workers=2) as writer:
+        writer.submit((tmp_path / "ok.txt").write_text, "ok")
+        writer.submit(_fail)
+        errors = writer.wait()
+
+    assert errors == ["disco cheio"]
+    assert (tmp_path / "ok.txt").read_text() == "ok"
+    assert run_pipeline(from_stage="platinum")["success"] is False
+
+# Teste 4: falha na gravação em background da Gold marca a etapa como falha e grava writes_committed=False
+@patch("src.ingestion.extract_api.requests.get")
+def test_run_pipeline_background_write_failure(mock_get, no_metrics):
+    import src.pipeline_runner as runner
+
+    mock_get.side_effect = [_mock_response(_PAGE), _mock_response([])]
+
+    def _fail(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    with patch("src.transformation.gold_transform.write_parquet_atomic", side_effect=_fail):
+        result = run_pipeline("2026-02-17", per_page=5, max_pages=10)
+
+    assert result["success"] is False
+    assert result["stages"]["silver"]["writes_committed"] is True
+    assert result["stages"]["gold"]["success"] is False
+    assert result["stages"]["gold"]["writes_committed"] is False
+    assert "disco cheio" in result["stages"]["gold"]["error"]
+    # sem marcador: a partição não é servida
+    assert not os.path.exists(no_metrics["datalake"] / "gold" / "processing_date=2026-02-17" / "_SUCCESS")
+
+    calls = {c.args[2]: c.args[3] for c in runner.save_metrics_dict.call_args_list}
+    assert calls["gold"] == {"writes_committed": False, "write_errors": 4}
+    assert calls["silver"] == {"writes_committed": True, "write_errors": 0}
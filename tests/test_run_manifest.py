@@ -0,0 +1,69 @@
+# Bibliotecas
+import os
+import json
+import time
+import numpy as np
+
+# Script
+from src.monitoring import run_manifest
+from src.monitoring.perf_regression import current_values
+
+_SILVER_RESULT = {
+    "success": True,
+    "records": 120,
+    "output_file": "/datalake/silver/processing_date=2026-02-17/breweries.parquet",
+    "null_name": np.float64(0.5),
+    "schema_changed": True,
+    "schema_missing_cols": ["phone"],
+    "schema_extra_cols": [],
+    "transform_duration": "0:00:02.500000",
+    "run_id": "20260217_150000",
+}
+
+# TESTE 1: XCom recebe só o resumo; o resultado completo fica no manifesto
+def test_publish_stage_result_writes_manifest_and_slim_summary(isolated_env):
+    summary = run_manifest.publish_stage_result(
+        "brewery_datalake_pipeline", "scheduled__2026-02-17T15:00:00+00:00", "silver", _SILVER_RESULT
+    )
+
+    assert "schema_missing_cols" not in summary
+    assert "output_file" not in summary
+    assert summary["records"] == 120
+    assert summary["null_name"] == 0.5
+    assert os.path.dirname(summary["manifest"]).startswith(str(isolated_env["datalake"] / "_manifests"))
+    assert ":" not in os.path.basename(os.path.dirname(summary["manifest"]))
+    json.dumps(summary)  # serializável no XCom
+
+    with open(summary["manifest"], "r", encoding="utf-8") as f:
+        assert json.load(f)["schema_missing_cols"] == ["phone"]
+
+# TESTE 2: campos do resumo não leem o arquivo; os demais carregam o manifesto sob demanda
+def test_lazy_result_loads_manifest_on_demand(isolated_env):
+    summary = run_manifest.publish_stage_result("dag", "run_1", "silver", _SILVER_RESULT)
+    lazy = run_manifest.lazy_result(summary)
+
+    assert bool(lazy) is True
+    assert lazy.get("records") == 120
+    assert current_values(silver=lazy)[("silver", "records_per_second")] == 48.0
+    assert lazy.loaded is False
+
+    assert lazy.get("schema_missing_cols") == ["phone"]
+    assert lazy.get("inexistente", "padrao") == "padrao"
+    assert lazy.loaded is True
+    assert lazy.to_dict()["output_file"].endswith("breweries.parquet")
+
+    # XComs antigos (dict completo) e ausentes continuam funcionando
+    assert run_manifest.lazy_result({"success": True, "records": 1})["records"] == 1
+    assert run_manifest.lazy_result(None) is None
+
+# TESTE 3: retenção remove apenas os manifestos antigos
+def test_purge_run_manifests(isolated_env):
+    old = run_manifest.publish_stage_result("dag", "run_old", "gold", {"success": True})
+    new = run_manifest.publish_stage_result("dag", "run_new", "gold", {"success": True})
+    old_folder = os.path.dirname(old["manifest"])
+    past = time.time() - 40 * 86400
+    os.utime(old_folder, (past, past))
+
+    assert run_manifest.purge_run_manifests(retention_days=30) == 1
+    assert not os.path.exists(old_folder)
+    assert os.path.exists(new["manifest"])
@@ -164,3 +164,60 @@ def test_transform_id(mock_save_metrics, mock_init_db, isolated_env, monkeypatch
     df = pd.read_parquet(result["output_file"])
     assert df["id"].duplicated().sum() == 0
 
+
+# Teste 7: Bronze inalterada em outra data reaproveita a Silver anterior (hard-link) sem reprocessar
+@patch("src.transformation.silver_transform.init_db")
+@patch("src.transformation.silver_transform.save_metrics_dict")
+def test_transform_skips_unchanged_bronze(mock_save_metrics, mock_init_db, isolated_env, monkeypatch, execution_date):
+    _set_test_env(monkeypatch, isolated_env, execution_date)
+    datalake = isolated_env["datalake"]
+    _create_fake_bronze(datalake, execution_date)
+    first = transform_to_silver(execution_date=execution_date)
+    assert first["success"] is True
+    assert "skipped" not in first
+
+    _create_fake_bronze(datalake, "2099-01-02")
+    second = transform_to_silver(execution_date="2099-01-02")
+
+    assert second["success"] is True
+    assert second["skipped"] is True
+    assert second["reused_from"] == execution_date
+    assert second["records"] == first["records"]
+    assert "processing_date=2099-01-02" in second["output_file"]
+    assert os.path.samefile(second["output_file"], first["output_file"])
+    # sem métricas de qualidade/performance na execução pulada
+    assert mock_save_metrics.call_args.args[3] == {"skipped_unchanged": True}
+
+    # Bronze alterada: processa normalmente
+    changed_dir = datalake / "raw" / "ingestion_date=2099-01-03"
+    changed_dir.mkdir(parents=True)
+    with open(changed_dir / "page_001.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": "9", "name": "Brew Z", "city": "Austin", "state": "TX", "brewery_type": "micro"}], f)
+    third = transform_to_silver(execution_date="2099-01-03")
+    assert third["success"] is True
+    assert "skipped" not in third
+    assert third["records"] == 1
+
+# Teste 8: reprocessar uma data reaproveitada não altera a partição de origem (hard-link)
+@patch("src.transformation.silver_transform.init_db")
+@patch("src.transformation.silver_transform.save_metrics_dict")
+def test_transform_rerun_reused_keeps_source(mock_save_metrics, mock_init_db, isolated_env, monkeypatch, execution_date):
+    _set_test_env(monkeypatch, isolated_env, execution_date)
+    datalake = isolated_env["datalake"]
+    _create_fake_bronze(datalake, execution_date)
+    first = transform_to_silver(execution_date=execution_date)
+    _create_fake_bronze(datalake, "2099-01-02")
+    second = transform_to_silver(execution_date="2099-01-02")
+    assert second["skipped"] is True
+    assert os.path.samefile(second["output_file"], first["output_file"])
+
+    # Bronze da data reaproveitada muda: a Silver dela é regravada
+    with open(datalake / "raw" / "ingestion_date=2099-01-02" / "page_001.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": str(i), "name": f"Brew {i}", "city": "Austin", "state": "TX", "brewery_type": "micro"} for i in range(3)], f)
+    third = transform_to_silver(execution_date="2099-01-02")
+    assert third["success"] is True
+    assert "skipped" not in third
+
+    assert len(pd.read_parquet(third["output_file"])) == 3
+    assert len(pd.read_parquet(first["output_file"])) == 2
+    assert not os.path.samefile(third["output_file"], first["output_file"])
@@ -0,0 +1,67 @@
+# Bibliotecas
+import os
+import json
+from unittest.mock import patch
+
+# Scripts
+from src.monitoring.stage_profiler import StageProfiler, profiling_enabled
+from src.transformation.silver_transform import transform_to_silver
+from src.transformation.gold_transform import transform_to_gold
+
+EXECUTION_DATE = "2026-02-17"
+
+_PAGE = [
+    {"id": "1", "name": "Brew A", "city": "Los Angeles", "state": "CA", "brewery_type": "micro"},
+    {"id": "2", "name": "Brew B", "city": "New York", "state": "NY", "brewery_type": "brewpub"},
+]
+
+def _create_fake_bronze(datalake):
+    bronze_dir = datalake / "raw" / f"ingestion_date={EXECUTION_DATE}"
+    bronze_dir.mkdir(parents=True)
+    with open(bronze_dir / "page_001.json", "w", encoding="utf-8") as f:
+        json.dump(_PAGE, f)
+
+# Teste 1: PROFILE_STAGES escolhe as etapas; desligado por padrão
+def test_profiling_enabled_by_stage(monkeypatch):
+    monkeypatch.delenv("PROFILE_STAGES", raising=False)
+    assert profiling_enabled("silver") is False
+    assert StageProfiler("silver").start().stop() == {}
+
+    monkeypatch.setenv("PROFILE_STAGES", "silver, gold")
+    assert profiling_enabled("silver") is True
+    assert profiling_enabled("bronze") is False
+
+    monkeypatch.setenv("PROFILE_STAGES", "all")
+    assert profiling_enabled("bronze") is True
+
+# Teste 2: Silver perfilada grava relatórios ao lado dos logs e o resumo nas métricas
+@patch("src.transformation.gold_transform.init_db")
+@patch("src.transformation.gold_transform.save_metrics_dict")
+@patch("src.transformation.silver_transform.init_db")
+@patch("src.transformation.silver_transform.save_metrics_dict")
+def test_silver_profile_reports_and_metrics(mock_silver_metrics, _silver_db, mock_gold_metrics, _gold_db, isolated_env, monkeypatch):
+    monkeypatch.setenv("ENV", "TEST")
+    monkeypatch.setenv("PROFILE_STAGES", "silver")
+    _create_fake_bronze(isolated_env["datalake"])
+
+    silver = transform_to_silver(execution_date=EXECUTION_DATE)
+    gold = transform_to_gold(execution_date=EXECUTION_DATE)
+
+    assert silver["success"] is True
+    profile = silver["profile"]
+    assert profile["profile_cpu_seconds"] > 0
+    assert profile["profile_tracemalloc_peak_mb"] > 0
+    assert profile["profile_top_function"]
+    for path in profile["files"].values():
+        assert os.path.exists(path)
+        assert path.startswith(str(isolated_env["logs"] / "profiles" / "silver"))
+    with open(profile["files"]["memory_report"], "r", encoding="utf-8") as f:
+        assert f.readline().startswith("tracemalloc pico:")
+
+    silver_metrics = mock_silver_metrics.call_args.args[3]
+    assert silver_metrics["profile_cpu_seconds"] == profile["profile_cpu_seconds"]
+    assert "profile_top_alloc_site" in silver_metrics
+
+    # Gold fora de PROFILE_STAGES: sem profiling
+    assert gold["profile"] is None
+    assert not any(k.startswith("profile_") for k in mock_gold_metrics.call_args.args[3])
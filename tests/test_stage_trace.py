@@ -0,0 +1,85 @@
+# Bibliotecas
+import json
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+# Scripts
+from src.monitoring.stage_trace import StageTrace
+from src.transformation.silver_transform import transform_to_silver
+from src.transformation.gold_transform import transform_to_gold
+
+EXECUTION_DATE = "2026-02-17"
+
+_PAGE = [
+    {"id": "1", "name": "Brew A", "city": "Los Angeles", "state": "CA", "brewery_type": "micro"},
+    {"id": "2", "name": "Brew B", "city": "New York", "state": "NY", "brewery_type": "brewpub"},
+]
+
+# Teste 1: spans agregados por nome e arquivo no formato Chrome Trace Event
+def test_stage_trace_summary_and_chrome_file(isolated_env):
+    trace = StageTrace("silver", EXECUTION_DATE, enabled=True)
+    for page in (1, 2):
+        with trace.span("read_json", page=page, bytes=100) as span:
+            span["rows"] = 10
+    with pytest.raises(ValueError):
+        with trace.span("write_parquet"):
+            raise ValueError("falha")
+
+    summary = trace.summary()
+    assert summary["read_json"]["count"] == 2
+    assert summary["read_json"]["rows"] == 20
+    assert summary["read_json"]["bytes"] == 200
+    assert summary["write_parquet"]["count"] == 1
+    assert trace.metrics()["span_read_json_rows"] == 20
+
+    path = trace.write("run_test")
+    assert path.startswith(str(isolated_env["logs"] / "traces" / "silver"))
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    events = payload["traceEvents"]
+    assert [e["name"] for e in events] == ["read_json", "read_json", "write_parquet"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+    assert events[2]["args"]["error"] == "ValueError"
+    assert payload["otherData"]["run_id"] == "run_test"
+
+# Teste 2: desligado não registra nada nem grava arquivo
+def test_stage_trace_disabled(isolated_env, monkeypatch):
+    monkeypatch.setenv("TRACE_SPANS", "false")
+    trace = StageTrace("gold", EXECUTION_DATE)
+    with trace.span("aggregate") as span:
+        span["rows"] = 5
+
+    assert trace.summary() == {}
+    assert trace.write() is None
+
+# Teste 3: Silver e Gold gravam spans nas métricas da etapa, no resultado e no trace
+@patch("src.transformation.gold_transform.init_db")
+@patch("src.transformation.gold_transform.save_metrics_dict")
+@patch("src.transformation.silver_transform.init_db")
+@patch("src.transformation.silver_transform.save_metrics_dict")
+def test_stages_record_spans(mock_silver_metrics, _silver_db, mock_gold_metrics, _gold_db, isolated_env, monkeypatch):
+    monkeypatch.setenv("ENV", "TEST")
+    bronze_dir = isolated_env["datalake"] / "raw" / f"ingestion_date={EXECUTION_DATE}"
+    bronze_dir.mkdir(parents=True)
+    with open(bronze_dir / "page_001.json", "w", encoding="utf-8") as f:
+        json.dump(_PAGE, f)
+
+    silver = transform_to_silver(execution_date=EXECUTION_DATE)
+    gold = transform_to_gold(execution_date=EXECUTION_DATE)
+
+    assert silver["success"] is True and gold["success"] is True
+    assert {"read_json", "build_dataframe", "normalize", "clean", "write_parquet"} <= set(silver["spans"])
+    assert silver["spans"]["read_json"]["rows"] == 2
+    assert silver["spans"]["write_parquet"]["bytes"] > 0
+    assert {"read_parquet", "aggregate", "write_outputs"} <= set(gold["spans"])
+
+    silver_metrics = mock_silver_metrics.call_args.args[3]
+    assert silver_metrics["span_read_json_rows"] == 2
+    assert "span_normalize_seconds" in silver_metrics
+    assert "span_aggregate_seconds" in mock_gold_metrics.call_args.args[3]
+
+    with open(gold["trace_file"], "r", encoding="utf-8") as f:
+        names = {e["name"] for e in json.load(f)["traceEvents"]}
+    assert "aggregate" in names
+    assert len(pd.read_parquet(silver["output_file"])) == 2
@@ -0,0 +1,100 @@
+# Bibliotecas
+import json
+import logging
+import pytest
+
+# Script
+from src.utils_log import configurar_logger, print_log, bind_log_context, flush_logs
+
+@pytest.fixture
+def fresh_logger():
+    names = []
+
+    def _make(log_folder, name):
+        names.append(name)
+        return configurar_logger(str(log_folder), f"_{name}.txt", name)
+
+    yield _make
+    for name in names:
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+def _log_lines(log_folder, name):
+    log_file = next(log_folder.glob(f"*_{name}.txt"))
+    return log_file.read_text(encoding="utf-8").splitlines()
+
+# Teste 1: backend queue grava JSON lines com contexto e amostra mensagens por página
+def test_queue_backend_json_lines_and_page_sampling(isolated_env, monkeypatch, fresh_logger):
+    monkeypatch.setenv("LOG_BACKEND", "queue")
+    monkeypatch.setenv("LOG_PAGE_SAMPLE_EVERY", "5")
+    logger = fresh_logger(isolated_env["logs"], "QueueTest")
+    bind_log_context(logger, stage="bronze", run_id="run_1")
+
+    for page in range(1, 13):
+        print_log(logger, f"Buscando página {page}...", "info", page=page)
+    print_log(logger, "Timeout na página 7.", "error", page=7)
+    print_log(logger, "Ingestão finalizada!", "success")
+    assert flush_logs() is True
+
+    entries = [json.loads(line) for line in _log_lines(isolated_env["logs"], "QueueTest")]
+    pages = [e["page"] for e in entries if e["message"].startswith("Buscando")]
+    assert pages == [1, 5, 10]
+    assert [e["suppressed"] for e in entries if e.get("page") in (5, 10) and e["level"] == "INFO"] == [3, 4]
+    error = next(e for e in entries if e["level"] == "ERROR")
+    assert error["page"] == 7 and error["stage"] == "bronze" and error["run_id"] == "run_1"
+    assert entries[-1]["level"] == "SUCCESS"
+
+# Teste 2: backend padrão continua em texto; LOG_LEVEL descarta antes de criar o registro
+def test_sync_backend_text_and_level_filter(isolated_env, monkeypatch, fresh_logger):
+    monkeypatch.delenv("LOG_BACKEND", raising=False)
+    monkeypatch.setenv("LOG_LEVEL", "WARNING")
+    logger = fresh_logger(isolated_env["logs"], "SyncTest")
+
+    print_log(logger, "mensagem info", "info", page=1)
+    print_log(logger, "mensagem de erro", "error")
+
+    lines = _log_lines(isolated_env["logs"], "SyncTest")
+    assert len(lines) == 1
+    assert lines[0].endswith(" - ERROR - mensagem de erro")
+
+# Teste 3: LOG_LEVEL inválido não derruba a configuração (usa DEBUG e avisa)
+def test_invalid_log_level_falls_back_to_debug(isolated_env, monkeypatch, fresh_logger):
+    monkeypatch.delenv("LOG_BACKEND", raising=False)
+    monkeypatch.setenv("LOG_LEVEL", "verbose")
+    logger = fresh_logger(isolated_env["logs"], "BadLevelTest")
+
+    assert logger.level == logging.DEBUG
+    lines = _log_lines(isolated_env["logs"], "BadLevelTest")
+    assert any("LOG_LEVEL inválido (VERBOSE)" in line for line in lines)
+
+# Teste 4: processo filho (fork) usa fila e QueueHandler novos, mantendo o contexto
+def test_forked_child_gets_fresh_queue(isolated_env, monkeypatch, fresh_logger):
+    from src import utils_log
+
+    monkeypatch.setenv("LOG_BACKEND", "queue")
+    logger = fresh_logger(isolated_env["logs"], "ForkTest")
+    bind_log_context(logger, run_id="run_parent")
+    parent_handler = utils_log._queue_handler(logger)
+    pid, parent_listener, parent_queue = utils_log._listeners["ForkTest"]
+
+    # simula o filho: a entrada do listener é de outro pid e a fila herdada tem um registro do pai
+    parent_listener.stop()
+    parent_queue.put_nowait(logging.makeLogRecord({"msg": "registro do pai", "levelno": logging.INFO}))
+    utils_log._listeners["ForkTest"] = (pid + 1, parent_listener, parent_queue)
+
+    logger = fresh_logger(isolated_env["logs"], "ForkTest")
+    child_handler = utils_log._queue_handler(logger)
+    child_pid, _, child_queue = utils_log._listeners["ForkTest"]
+
+    assert child_pid == pid
+    assert child_queue is not parent_queue and child_handler is not parent_handler
+    assert logger.handlers.count(child_handler) == 1 and parent_handler not in logger.handlers
+
+    print_log(logger, "registro do filho", "error")
+    assert flush_logs() is True
+    entries = [json.loads(line) for line in _log_lines(isolated_env["logs"], "ForkTest")]
+    messages = [e["message"] for e in entries]
+    assert "registro do filho" in messages and "registro do pai" not in messages
+    assert entries[-1]["run_id"] == "run_parent"